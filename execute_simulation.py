@@ -1,15 +1,38 @@
 """Main file to execute the simulation of the world"""
-import sandbox
+import argparse
+
+from sandbox import scenarios
 
 
 if __name__ == "__main__":
-    world = sandbox.World(max_x_size=20, max_y_size=20)
-    initial_bacteria = [sandbox.PotassiumBacteria(x_position=4, y_position=4),
-                        sandbox.PhosphorusBacteria(x_position=9, y_position=9),
-                        sandbox.NitrogenBacteria(x_position=14, y_position=15),
-                        sandbox.NitrogenBacteria(x_position=2, y_position=2),
-                        sandbox.NitrogenBacteria(x_position=8, y_position=7)
-                        ]
-    simulate_world = sandbox.SimulateWorld(world=world, end_time=1000,
-                                           initial_bacteria=initial_bacteria)
-    simulate_world.execute()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--headless', action='store_true',
+                        help='Run without opening a window or plotting, never imports pygame')
+    parser.add_argument('--fps', type=float, default=60,
+                        help='Max number of frames drawn per second')
+    parser.add_argument('--every-n-ticks', type=int, default=None,
+                        help='Draw a frame every that many ticks instead of by wall time')
+    parser.add_argument('--telemetry-port', type=int, default=None,
+                        help='Publish the statistics of every tick on this localhost port, '
+                             'follow them with python -m sandbox.telemetry')
+    parser.add_argument('--fast-forward', action='store_true',
+                        help='Jump over the ticks where nothing lives until the next spawn')
+    parser.add_argument('--stop-when-stable', type=int, default=None, metavar='TICKS',
+                        help='End the run once the average plant populations over that many '
+                             'ticks moved by less than 1%%, or once nothing lives anymore')
+    args = parser.parse_args()
+
+    params = {'fast_forward': args.fast_forward}
+    if args.stop_when_stable is not None:
+        params.update(stop_when='stable', stable_window=args.stop_when_stable,
+                      stable_names=('plants.GrassPlant', 'plants.TreePlant'))
+    simulate_world = scenarios.default_scenario(params)
+    if args.telemetry_port is not None:
+        from sandbox import telemetry  # pylint: disable=import-outside-toplevel
+        # Serves from the start of the run, see TelemetryPublisher.on_start
+        simulate_world.add_observer(telemetry.TelemetryPublisher(port=args.telemetry_port))
+    if args.headless:
+        world = simulate_world.run()
+        print(world.stats.get_totals())
+    else:
+        simulate_world.execute(fps=args.fps, every_n_ticks=args.every_n_ticks)
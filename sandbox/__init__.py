@@ -1,7 +1,12 @@
 """Init file for sandbox."""
+from sandbox.bacteria_engine import BacteriaEngine
+from sandbox.cohort_engine import CohortEngine
 from sandbox.display_world import plot_bacteria
 from sandbox.simulate_bacteria import NitrogenBacteria
 from sandbox.simulate_bacteria import PotassiumBacteria
 from sandbox.simulate_bacteria import PhosphorusBacteria
 from sandbox.simulate_world import World
 from sandbox.simulate_world import SimulateWorld
+from sandbox.simulate_world import SimulationOptions
+from sandbox.species import define_species
+from sandbox.species import load_species
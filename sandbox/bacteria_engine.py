@@ -0,0 +1,273 @@
+"""Vectorized engine simulating all the bacteria of a world as parallel arrays."""
+import numpy
+
+from sandbox import simulate_bacteria
+from sandbox import species
+from sandbox import utils
+
+BACTERIA_TYPES = (simulate_bacteria.NitrogenBacteria,
+                  simulate_bacteria.PhosphorusBacteria,
+                  simulate_bacteria.PotassiumBacteria)
+
+
+class BacteriaEngine:
+    """Structure of arrays holding every bacteria of a world.
+
+    Each bacteria is a row across the ``type_code``, ``x_position``, ``y_position``,
+    ``current_lifetime``, ``max_lifetime`` and ``reproduction_rate`` arrays, kept in the same
+    order the object engine keeps ``world.global_bacteria`` in. A tick applies the same rules as
+    ``sandbox.simulate_bacteria.Bacteria.execute_tick`` to all rows at once, so for the same seed
+    both engines end up with the same bacteria and nutrients.
+
+    :param tuple|None bacteria_types: The bacteria classes this engine can simulate, their
+        index is the type code, every registered bacteria species by default
+    """
+    # The arrays holding a row per bacteria
+    COLUMNS = ('type_code', 'x_position', 'y_position', 'current_lifetime', 'max_lifetime',
+               'reproduction_rate')
+
+    def __init__(self, bacteria_types=None):
+        self.bacteria_types = tuple(bacteria_types or species.get_species('bacteria'))
+        self._type_codes = {bacteria_type: code
+                            for code, bacteria_type in enumerate(self.bacteria_types)}
+        prototypes = [bacteria_type(0, 0) for bacteria_type in self.bacteria_types]
+        self.death_concentrations = numpy.array(
+            [prototype.DEATH_CONCENTRATION for prototype in prototypes], dtype=numpy.float64)
+        self.death_deposits = numpy.array(
+            [prototype.DEATH_DEPOSIT for prototype in prototypes], dtype=numpy.float64)
+        self.nutrients = [prototype.NUTRIENT for prototype in prototypes]
+        # Species can share a nutrient, each layer gets a code of its own
+        layers = list(dict.fromkeys(self.nutrients))
+        self._layer_codes = numpy.array([layers.index(layer) for layer in self.nutrients],
+                                        dtype=numpy.int64)
+        self.dispersals = numpy.array([prototype.DISPERSAL for prototype in prototypes],
+                                      dtype=numpy.int64)
+        self._default_max_lifetimes = [prototype.max_lifetime for prototype in prototypes]
+        self._default_reproduction_rates = [prototype.reproduction_rate
+                                            for prototype in prototypes]
+
+        self.type_code = numpy.zeros(0, dtype=numpy.int64)
+        self.x_position = numpy.zeros(0, dtype=numpy.int64)
+        self.y_position = numpy.zeros(0, dtype=numpy.int64)
+        self.current_lifetime = numpy.zeros(0, dtype=numpy.int64)
+        self.max_lifetime = numpy.zeros(0, dtype=numpy.int64)
+        self.reproduction_rate = numpy.zeros(0, dtype=numpy.int64)
+
+    def __len__(self):
+        return len(self.type_code)
+
+    def add(self, type_code, x_position, y_position, current_lifetime=None, max_lifetime=None,
+            reproduction_rate=None):
+        """Append bacteria given as arrays to the engine.
+
+        :param numpy.ndarray type_code: The type codes of the new bacteria
+        :param numpy.ndarray x_position: The x positions of the new bacteria
+        :param numpy.ndarray y_position: The y positions of the new bacteria
+        :param numpy.ndarray|None current_lifetime: The ages of the new bacteria, 0 by default
+        :param numpy.ndarray|None max_lifetime: The max lifetimes of the new bacteria, the
+            default of their type by default
+        :param numpy.ndarray|None reproduction_rate: The reproduction rates of the new bacteria,
+            the default of their type by default
+        """
+        type_code = numpy.asarray(type_code, dtype=numpy.int64)
+        if current_lifetime is None:
+            current_lifetime = numpy.zeros(len(type_code), dtype=numpy.int64)
+        if max_lifetime is None:
+            max_lifetime = numpy.array(self._default_max_lifetimes, dtype=numpy.int64)[type_code]
+        if reproduction_rate is None:
+            reproduction_rate = numpy.array(self._default_reproduction_rates,
+                                            dtype=numpy.int64)[type_code]
+        self.type_code = numpy.concatenate([self.type_code, type_code])
+        self.x_position = numpy.concatenate(
+            [self.x_position, numpy.asarray(x_position, dtype=numpy.int64)])
+        self.y_position = numpy.concatenate(
+            [self.y_position, numpy.asarray(y_position, dtype=numpy.int64)])
+        self.current_lifetime = numpy.concatenate(
+            [self.current_lifetime, numpy.asarray(current_lifetime, dtype=numpy.int64)])
+        self.max_lifetime = numpy.concatenate(
+            [self.max_lifetime, numpy.asarray(max_lifetime, dtype=numpy.int64)])
+        self.reproduction_rate = numpy.concatenate(
+            [self.reproduction_rate, numpy.asarray(reproduction_rate, dtype=numpy.int64)])
+
+    def absorb(self, bacteria):
+        """Move bacteria objects into the engine, emptying the given list.
+
+        :param sandbox.entity_store.EntityStore bacteria: The bacteria objects
+        """
+        if not bacteria:
+            return
+        self.add([self._type_codes[type(single)] for single in bacteria],
+                 [single.x_position for single in bacteria],
+                 [single.y_position for single in bacteria],
+                 [single.current_lifetime for single in bacteria],
+                 [single.max_lifetime for single in bacteria],
+                 [single.reproduction_rate for single in bacteria])
+        bacteria.clear()
+
+    def count_by_type(self):
+        """Count the living bacteria of each type.
+
+        :rtype: dict
+        """
+        counts = numpy.bincount(self.type_code, minlength=len(self.bacteria_types))
+        return {bacteria_type.__name__: int(count)
+                for bacteria_type, count in zip(self.bacteria_types, counts) if count}
+
+    def count_by_cell(self, shape):
+        """Count the living bacteria of each kind in every piece of land.
+
+        :param tuple shape: The x and y size of the world
+        :rtype: dict
+        """
+        counts = {}
+        for type_code, bacteria_type in enumerate(self.bacteria_types):
+            of_type = self.type_code == type_code
+            counts[bacteria_type.KIND] = numpy.zeros(shape, dtype=numpy.int64)
+            numpy.add.at(counts[bacteria_type.KIND],
+                         (self.x_position[of_type], self.y_position[of_type]), 1)
+        return counts
+
+    def execute_tick(self, world):
+        """Run one tick for every bacteria in the world.
+
+        Bacteria objects appended to ``world.global_bacteria`` since the last tick, e.g. spawned
+        by dying grass, are absorbed into the engine first.
+
+        :param sandbox.simulate_world.World world: The world object
+        """
+        self.absorb(world.global_bacteria)
+        if not len(self):
+            return
+
+        self.current_lifetime += 1
+        lifetime_death = self.current_lifetime > self.max_lifetime
+        concentration_death = ~lifetime_death & self._check_death(world, lifetime_death)
+        dead = lifetime_death | concentration_death
+        world.instrumentation.count('deaths.lifetime', int(numpy.count_nonzero(lifetime_death)))
+        world.instrumentation.count('deaths.concentration',
+                                    int(numpy.count_nonzero(concentration_death)))
+        self._die(world, dead)
+        # Like the object engine, bacteria killed by the concentration still reproduce
+        reproducing = ~lifetime_death & (
+            self.current_lifetime % self.reproduction_rate == 0)
+
+        child_type_code = self.type_code[reproducing]
+        child_x_position, child_y_position = self._get_child_positions(
+            world, child_type_code, self.x_position[reproducing], self.y_position[reproducing])
+
+        alive = ~dead
+        for column in self.COLUMNS:
+            setattr(self, column, getattr(self, column)[alive])
+        self.add(child_type_code, child_x_position, child_y_position)
+        world.instrumentation.count('births', len(child_type_code))
+        births = numpy.bincount(child_type_code, minlength=len(self.bacteria_types))
+        for type_code, (bacteria_type, count) in enumerate(zip(self.bacteria_types,
+                                                               births.tolist())):
+            if count:
+                world.stats.bacteria_born(bacteria_type.__name__, count)
+                of_type = child_type_code == type_code
+                world.occupancy.add_many(bacteria_type.KIND, child_x_position[of_type],
+                                         child_y_position[of_type])
+
+    def _get_child_positions(self, world, child_type_code, x_position, y_position):
+        """Place the children of some bacteria around their parents.
+
+        Every dispersal distance draws from its own span of the movement stream, so drawing
+        the children of each distance in order draws the same numbers as the object engine.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param numpy.ndarray child_type_code: The type codes of the children
+        :param numpy.ndarray x_position: The x positions of their parents
+        :param numpy.ndarray y_position: The y positions of their parents
+        :return: The x positions and the y positions of the children
+        :rtype: tuple
+        """
+        distances = self.dispersals[child_type_code]
+        child_x_position = numpy.empty(len(child_type_code), dtype=numpy.int64)
+        child_y_position = numpy.empty(len(child_type_code), dtype=numpy.int64)
+        for distance in numpy.unique(distances).tolist():
+            of_distance = distances == distance
+            child_x_position[of_distance], child_y_position[of_distance] = \
+                utils.get_new_positions(x_position[of_distance], y_position[of_distance],
+                                        world.max_x_size, world.max_y_size, distance,
+                                        rng=world.rng.movement)
+        return child_x_position, child_y_position
+
+    def _check_death(self, world, lifetime_death):
+        """Find the bacteria killed by the concentration of their nutrient.
+
+        The object engine checks bacteria one by one, and every bacteria dying before another
+        in the same piece of land deposits nutrient for it if they make the same nutrient,
+        whatever their types. A bacteria dies if the starting nutrient plus the deposits of the
+        earlier deaths is too high, so starting from the lifetime deaths the deaths are found
+        again with the deposits of the last ones until no more bacteria die.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param numpy.ndarray lifetime_death: Mask of the bacteria dying of old age
+        :rtype: numpy.ndarray
+        """
+        order, start_index = self._group_by_nutrient(world)
+        nutrient = self._get_nutrients(world)[order]
+        deposits = self.death_deposits[self.type_code][order]
+        death_concentrations = self.death_concentrations[self.type_code][order]
+        lifetime_death = lifetime_death[order]
+        dead = lifetime_death
+        while True:
+            deposited = numpy.where(dead, deposits, 0.0)
+            earlier_deposits = numpy.cumsum(deposited) - deposited
+            earlier_deposits -= earlier_deposits[start_index]
+            killed = nutrient + earlier_deposits > death_concentrations
+            if numpy.array_equal(lifetime_death | killed, dead):
+                break
+            dead = lifetime_death | killed
+
+        concentration_death = numpy.empty(len(self), dtype=bool)
+        concentration_death[order] = killed
+        return concentration_death
+
+    def _get_nutrients(self, world):
+        """Read the nutrient of every bacteria in its piece of land.
+
+        :param sandbox.simulate_world.World world: The world object
+        :rtype: numpy.ndarray
+        """
+        nutrient = numpy.empty(len(self), dtype=numpy.float64)
+        for type_code, layer in enumerate(self.nutrients):
+            of_type = self.type_code == type_code
+            nutrient[of_type] = getattr(world, layer)[self.x_position[of_type],
+                                                      self.y_position[of_type]]
+        return nutrient
+
+    def _group_by_nutrient(self, world):
+        """Group the bacteria making the same nutrient in the same piece of land.
+
+        :param sandbox.simulate_world.World world: The world object
+        :return: The order sorting the bacteria by group, keeping their order within a group,
+            and for each of them in that order the index of the first of its group
+        :rtype: tuple
+        """
+        cell = self.x_position * world.max_y_size + self.y_position
+        group = self._layer_codes[self.type_code] * world.max_x_size * world.max_y_size + cell
+        order = numpy.argsort(group, kind='stable')
+        sorted_group = group[order]
+        group_start = numpy.ones(len(order), dtype=bool)
+        group_start[1:] = sorted_group[1:] != sorted_group[:-1]
+        return order, numpy.maximum.accumulate(
+            numpy.where(group_start, numpy.arange(len(order)), 0))
+
+    def _die(self, world, dead):
+        """Deposit the nutrient of the dead bacteria into their land.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param numpy.ndarray dead: Mask of the dying bacteria
+        """
+        for type_code, layer in enumerate(self.nutrients):
+            dying = dead & (self.type_code == type_code)
+            dying_count = int(numpy.count_nonzero(dying))
+            if not dying_count:
+                continue
+            position = (self.x_position[dying], self.y_position[dying])
+            numpy.add.at(getattr(world, layer), position, self.death_deposits[type_code])
+            world.occupancy.add_many(self.bacteria_types[type_code].KIND, *position, count=-1)
+            world.stats.add_to_layer(layer, dying_count * self.death_deposits[type_code].item())
+            world.stats.bacteria_died(self.bacteria_types[type_code].__name__, dying_count)
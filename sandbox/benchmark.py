@@ -0,0 +1,290 @@
+"""Benchmark the tick throughput and memory use of headless simulations.
+
+Run the matrix of world sizes and initial populations and store the results with::
+
+    python -m sandbox.benchmark run --output bench.json
+
+and flag the regressions of a new run against a stored baseline with::
+
+    python -m sandbox.benchmark compare baseline.json bench.json --threshold 0.1
+
+Every case runs in a fresh process, so its peak RSS is not polluted by the other cases.
+"""
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+from sandbox import bacteria_engine
+from sandbox import cohort_engine
+from sandbox import instrumentation
+from sandbox import seeding
+from sandbox import simulate_bacteria
+from sandbox import simulate_plants
+from sandbox import simulate_world
+from sandbox import species
+
+DEFAULT_SIZES = (20, 100, 500, 1000)
+DEFAULT_BACTERIA = (5, 1000, 100000)
+DEFAULT_PLANTS = (0, 1000)
+DEFAULT_ENGINES = ('object', 'vectorized', 'cohort')
+DEFAULT_TICKS = 20
+# Reported even when a case does not run them, the other phases as they run
+PHASES = ('tick_plants', 'tick_bacteria', 'spawn_plants', 'compact_entities')
+MEMORY_SAMPLE_SIZE = 10000
+
+
+def build_simulation(size, bacteria, plants, engine, seed=0):
+    """Build a world seeded with random bacteria and plants.
+
+    :param int size: The x and y size of the world
+    :param int bacteria: The number of initial bacteria
+    :param int plants: The number of initial plants, half grass and half trees
+    :param str engine: The bacteria engine, ``object``, ``vectorized`` or ``cohort``
+    :param int seed: The seed of the world
+    :rtype: sandbox.simulate_world.SimulateWorld
+    """
+    world = simulate_world.World(max_x_size=size, max_y_size=size, seed=seed)
+    options = simulate_world.SimulationOptions(vectorized_bacteria=engine == 'vectorized',
+                                               cohort_bacteria=engine == 'cohort')
+    simulation = simulate_world.SimulateWorld(world=world, end_time=0, options=options)
+    spawning = world.rng.spawning
+    types = species.get_species('bacteria')
+    type_codes = spawning.randints(0, len(types) - 1, bacteria)
+    x_positions = spawning.randints(0, size - 1, bacteria)
+    y_positions = spawning.randints(0, size - 1, bacteria)
+    for type_code, bacteria_type in enumerate(types):
+        selected = type_codes == type_code
+        seeding.seed_entities(world, bacteria_type, x_positions[selected], y_positions[selected])
+    x_positions, y_positions = seeding.random_positions(world, plants)
+    seeding.seed_entities(world, simulate_plants.GrassPlant, x_positions[0::2], y_positions[0::2])
+    seeding.seed_entities(world, simulate_plants.TreePlant, x_positions[1::2], y_positions[1::2])
+    simulation.compact_entities()
+    return simulation
+
+
+def get_peak_rss():
+    """Get the peak resident set size of this process.
+
+    :rtype: int
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_case(case):
+    """Run one benchmark case, meant to run in a fresh process.
+
+    :param dict case: The ``size``, ``bacteria``, ``plants``, ``engine`` and ``ticks`` of the case
+    :return: The case with its ticks per second, seconds per phase and peak RSS
+    :rtype: dict
+    """
+    start_rss = get_peak_rss()
+    start = time.perf_counter()
+    simulation = build_simulation(case['size'], case['bacteria'], case['plants'], case['engine'])
+    setup_seconds = time.perf_counter() - start
+
+    phase_seconds = collections.defaultdict(float, dict.fromkeys(PHASES, 0.0))
+
+    def add_phase_seconds(record):
+        for phase, phase_time in record['phases'].items():
+            phase_seconds[phase] += phase_time
+
+    simulation.world.set_instrumentation(
+        instrumentation.Instrumentation(sinks=[add_phase_seconds], keep_records=0))
+    start = time.perf_counter()
+    simulation.run(ticks=case['ticks'])
+    seconds = time.perf_counter() - start
+
+    result = dict(case)
+    result.update({
+        'setup_seconds': setup_seconds,
+        'seconds': seconds,
+        'ticks_per_second': case['ticks'] / seconds if seconds else float('inf'),
+        'phase_seconds': dict(phase_seconds),
+        'start_rss_bytes': start_rss,
+        'peak_rss_bytes': get_peak_rss(),
+        'final_bacteria': sum(simulation.world.stats.get_bacteria_counts().values()),
+        'final_plants': sum(simulation.world.stats.plants.values()),
+    })
+    return result
+
+
+def _measure_allocation(build, count):
+    """Measure the bytes allocated per item by a builder.
+
+    :param callable build: Called with the index of each item, returns the item
+    :param int count: The number of items to build
+    :rtype: float
+    """
+    items = [None] * count
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for index in range(count):
+        items[index] = build(index)
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return allocated / count
+
+
+def measure_memory(count=MEMORY_SAMPLE_SIZE):
+    """Measure the bytes used per bacteria, plant and piece of land.
+
+    :param int count: The number of items measured
+    :rtype: dict
+    """
+    size = int(count ** 0.5)
+    engine = bacteria_engine.BacteriaEngine()
+    engine_bytes = sum(getattr(engine, column).itemsize for column in engine.COLUMNS)
+    cohorts = cohort_engine.CohortEngine(size, size).cohorts
+    return {
+        'bacteria_object_bytes': _measure_allocation(
+            lambda index: simulate_bacteria.NitrogenBacteria(index % size, index // size), count),
+        'bacteria_vectorized_bytes': engine_bytes,
+        'cohort_cell_bytes': sum(cohort.nbytes for cohort in cohorts) / (size * size),
+        'grass_bytes': _measure_allocation(
+            lambda index: simulate_plants.GrassPlant(index % size, index // size), count),
+        'tree_bytes': _measure_allocation(
+            lambda index: simulate_plants.TreePlant(index % size, index // size), count),
+        'beings_bytes': _measure_allocation(lambda index: simulate_world.Beings(), count),
+        'land_cell_bytes': _measure_allocation(
+            lambda index: simulate_world.World(size, size), 1) / (size * size),
+    }
+
+
+def iter_cases(sizes, bacteria, plants, engines, ticks):
+    """Iterate over the matrix of benchmark cases.
+
+    :param list[int] sizes: The world sizes
+    :param list[int] bacteria: The initial bacteria counts
+    :param list[int] plants: The initial plant counts
+    :param list[str] engines: The bacteria engines
+    :param int ticks: The number of ticks per case
+    :rtype: collections.abc.Iterator[dict]
+    """
+    for size, bacteria_count, plant_count, engine in itertools.product(
+            sizes, bacteria, plants, engines):
+        yield {'size': size, 'bacteria': bacteria_count, 'plants': plant_count,
+               'engine': engine, 'ticks': ticks}
+
+
+def run_benchmarks(cases):
+    """Run every case in its own fresh process, one after the other.
+
+    :param list[dict] cases: The benchmark cases
+    :return: The environment, the memory per entity and the result of every case
+    :rtype: dict
+    """
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for case in cases:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_case, case).result()
+        print('size:{size} bacteria:{bacteria} plants:{plants} engine:{engine} '
+              'ticks/s:{ticks_per_second:.2f} peak_rss:{peak_rss_bytes}'.format(**result))
+        results.append(result)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        memory = pool.submit(measure_memory).result()
+    return {'environment': {'python': platform.python_version(), 'numpy': numpy.__version__,
+                            'platform': platform.platform(), 'time': time.time()},
+            'memory': memory,
+            'results': results}
+
+
+def _case_key(result):
+    """Get the key identifying the case of a result.
+
+    :param dict result: The result of a case
+    :rtype: tuple
+    """
+    return tuple(result[name] for name in ('size', 'bacteria', 'plants', 'engine', 'ticks'))
+
+
+def compare(baseline, current, threshold=0.1):
+    """Find the regressions of a benchmark run against a baseline.
+
+    :param dict baseline: The baseline benchmark results
+    :param dict current: The new benchmark results
+    :param float threshold: The relative change flagged as a regression
+    :return: A description of every regression
+    :rtype: list[str]
+    """
+    regressions = []
+    baseline_results = {_case_key(result): result for result in baseline['results']}
+    for result in current['results']:
+        old = baseline_results.get(_case_key(result))
+        if old is None:
+            continue
+        if result['ticks_per_second'] < old['ticks_per_second'] * (1 - threshold):
+            regressions.append('{}: ticks/s {:.2f} -> {:.2f}'.format(
+                _case_key(result), old['ticks_per_second'], result['ticks_per_second']))
+        old_rss = old['peak_rss_bytes'] - old['start_rss_bytes']
+        new_rss = result['peak_rss_bytes'] - result['start_rss_bytes']
+        if new_rss > old_rss * (1 + threshold) and new_rss - old_rss > 1024 * 1024:
+            regressions.append('{}: rss {} -> {}'.format(_case_key(result), old_rss, new_rss))
+    for name, value in current['memory'].items():
+        old_value = baseline['memory'].get(name)
+        if old_value and value > old_value * (1 + threshold):
+            regressions.append('{}: {:.1f} -> {:.1f}'.format(name, old_value, value))
+    return regressions
+
+
+def _parse_list(text, cast=int):
+    """Parse a comma separated command line list.
+
+    :param str text: The command line list
+    :param callable cast: Cast each value
+    :rtype: list
+    """
+    return [cast(value) for value in text.split(',')]
+
+
+def main():
+    """Run the benchmarks or compare two benchmark runs."""
+    parser = argparse.ArgumentParser(description='Benchmark headless simulations.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='Run the benchmark matrix')
+    run_parser.add_argument('--output', default='bench.json', help='The results file')
+    run_parser.add_argument('--sizes', type=_parse_list, default=DEFAULT_SIZES)
+    run_parser.add_argument('--bacteria', type=_parse_list, default=DEFAULT_BACTERIA)
+    run_parser.add_argument('--plants', type=_parse_list, default=DEFAULT_PLANTS)
+    run_parser.add_argument('--engines', type=lambda text: _parse_list(text, str),
+                            default=DEFAULT_ENGINES)
+    run_parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS)
+    compare_parser = commands.add_parser('compare', help='Flag regressions against a baseline')
+    compare_parser.add_argument('baseline', help='The baseline results file')
+    compare_parser.add_argument('current', help='The new results file')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='The relative change flagged as a regression')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_benchmarks(list(iter_cases(args.sizes, args.bacteria, args.plants,
+                                                 args.engines, args.ticks)))
+        print(json.dumps(results['memory']))
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.current, encoding='utf-8') as current_file:
+        current = json.load(current_file)
+    regressions = compare(baseline, current, threshold=args.threshold)
+    for regression in regressions:
+        print('REGRESSION {}'.format(regression))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Checkpoint the full state of a simulation to a compact binary file and resume from it.
+
+A checkpoint file starts with ``MAGIC``, the length of a JSON header as a little endian uint64
+and the header itself. The header holds the scalar state of the world, e.g. its time and the
+state of its random streams, and the dtype, shape and offset of every column. The columns are
+raw arrays aligned to ``ALIGNMENT`` bytes: one per layer of the world, one per attribute
+of the plants and bacteria and one per type of bacteria for the cohorts of a
+``sandbox.cohort_engine.CohortEngine``, so loading can memory-map them instead of unpickling
+objects.
+"""
+import json
+import os
+import struct
+
+import numpy
+
+from sandbox import bacteria_engine
+from sandbox import cohort_engine
+from sandbox import observers
+from sandbox import scheduler
+from sandbox import simulate_world
+from sandbox import species
+
+MAGIC = b'SBXCKPT1'
+# Version 2 added the reproduction_rate columns
+VERSION = 2
+ALIGNMENT = 64
+ENTITY_COLUMNS = ('type_code', 'x_position', 'y_position', 'current_lifetime', 'max_lifetime',
+                  'reproduction_rate')
+ENTITY_DTYPES = (numpy.uint8, numpy.int32, numpy.int32, numpy.int32, numpy.int32, numpy.int32)
+# An event of a scheduled lifecycle, the entity given by its store and its index in the store
+EVENT_COLUMNS = ('tick', 'store', 'index', 'base')
+
+
+def _get_entity_columns(entities, type_names):
+    """Split entities into one array per attribute.
+
+    :param sandbox.entity_store.EntityStore entities: The entities
+    :param list[str] type_names: The names of the types of entities, extended with new ones
+    :rtype: dict
+    """
+    type_codes = []
+    for entity in entities:
+        name = type(entity).__name__
+        if name not in type_names:
+            type_names.append(name)
+        type_codes.append(type_names.index(name))
+    columns = {'type_code': numpy.array(type_codes, dtype=numpy.uint8)}
+    for column, dtype in zip(ENTITY_COLUMNS[1:], ENTITY_DTYPES[1:]):
+        columns[column] = numpy.fromiter((getattr(entity, column) for entity in entities),
+                                         dtype=dtype, count=len(entities))
+    return columns
+
+
+def _add_scheduler_columns(world, columns):
+    """Split the state of the lifecycle scheduler of a world into arrays.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param dict columns: The columns of the checkpoint, extended with the ones of the scheduler
+    :return: The scalar state of the scheduler, None if it has not started
+    :rtype: dict|None
+    """
+    lifecycle_scheduler = world.lifecycle_scheduler
+    if lifecycle_scheduler is None or not lifecycle_scheduler.started:
+        return None
+    indexes = {}
+    for store, entities in enumerate((world.global_plants, world.global_bacteria)):
+        for index, entity in enumerate(entities):
+            indexes[entity] = (store, index)
+    current_tick, events, changed_cells = lifecycle_scheduler.get_state()
+    events = [(tick,) + indexes[entity] + (base,) for tick, entity, base in events]
+    columns['scheduler.events'] = numpy.array(events, dtype=numpy.int64).reshape(
+        -1, len(EVENT_COLUMNS))
+    columns['scheduler.changed_cells'] = numpy.array(changed_cells, dtype=numpy.int64).reshape(
+        -1, 2)
+    return {'current_tick': current_tick,
+            'bacteria': lifecycle_scheduler.bacteria,
+            'plant_types': [plant_type.__name__ for plant_type in lifecycle_scheduler.plant_types],
+            'wheel_size': lifecycle_scheduler.wheel.size}
+
+
+def _restore_scheduler(world, header, columns, types_by_name):
+    """Give a loaded world the lifecycle scheduler of its checkpoint.
+
+    :param sandbox.simulate_world.World world: The world object, with its entities loaded
+    :param dict header: The scalar state of the scheduler
+    :param dict columns: The columns of the checkpoint
+    :param dict types_by_name: The classes of the entities keyed by their name
+    """
+    world.lifecycle_scheduler = scheduler.LifecycleScheduler(
+        bacteria=header['bacteria'],
+        plant_types=[types_by_name[name] for name in header['plant_types']],
+        wheel_size=header['wheel_size'])
+    # The events point at the entities by their index in the store, in the saved order
+    stores = (list(world.global_plants), list(world.global_bacteria))
+    events = [(tick, stores[store][index], base)
+              for tick, store, index, base in columns['scheduler.events'].tolist()]
+    world.lifecycle_scheduler.restore(
+        world, header['current_tick'], events,
+        [tuple(position) for position in columns['scheduler.changed_cells'].tolist()])
+
+
+def save_checkpoint(world, path):
+    """Write the full state of a world to a checkpoint file.
+
+    The file is written next to the path first and moved over it at the end, so an existing
+    checkpoint is never left half written, even if it is memory-mapped by the running world.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param str path: The path of the checkpoint file
+    """
+    columns = {}
+    for layer in simulate_world.LAYERS:
+        columns['layer.' + layer] = getattr(world, layer)
+    type_names = []
+    for name, entities in (('plants', world.global_plants), ('bacteria', world.global_bacteria)):
+        for column, values in _get_entity_columns(entities, type_names).items():
+            columns['{}.{}'.format(name, column)] = values
+    engine = world.bacteria_engine
+    if isinstance(engine, cohort_engine.CohortEngine):
+        for bacteria_type, cohorts in zip(engine.bacteria_types, engine.cohorts):
+            columns['cohorts.' + bacteria_type.__name__] = cohorts
+    elif engine is not None:
+        for column in ENTITY_COLUMNS:
+            columns['engine.' + column] = getattr(engine, column)
+
+    header = {'version': VERSION,
+              'time': world.time,
+              'max_x_size': world.max_x_size,
+              'max_y_size': world.max_y_size,
+              'rng': world.rng.get_state(),
+              'type_names': type_names,
+              'engine_types': None if engine is None else
+                              [bacteria_type.__name__ for bacteria_type in engine.bacteria_types],
+              'cohort_engine': isinstance(engine, cohort_engine.CohortEngine),
+              'scheduler': _add_scheduler_columns(world, columns),
+              'columns': {}}
+    # The offsets depend on the header length, lay them out until it settles
+    while True:
+        header_length = len(json.dumps(header).encode())
+        data_offset = len(MAGIC) + 8 + header_length
+        offset = data_offset
+        for name, values in columns.items():
+            offset += -offset % ALIGNMENT
+            header['columns'][name] = {'dtype': values.dtype.str, 'shape': list(values.shape),
+                                       'offset': offset}
+            offset += values.nbytes
+        if len(json.dumps(header).encode()) == header_length:
+            break
+
+    temporary_path = '{}.tmp'.format(path)
+    with open(temporary_path, 'wb') as checkpoint_file:
+        checkpoint_file.write(MAGIC)
+        checkpoint_file.write(struct.pack('<Q', header_length))
+        checkpoint_file.write(json.dumps(header).encode())
+        for name, values in columns.items():
+            checkpoint_file.write(b'\0' * (header['columns'][name]['offset'] -
+                                           checkpoint_file.tell()))
+            checkpoint_file.write(numpy.ascontiguousarray(values).tobytes())
+    os.replace(temporary_path, path)
+
+
+def read_header(path):
+    """Read the header of a checkpoint file.
+
+    :param str path: The path of the checkpoint file
+    :rtype: dict
+    :raises ValueError: If the file is not a checkpoint
+    """
+    with open(path, 'rb') as checkpoint_file:
+        if checkpoint_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a checkpoint file'.format(path))
+        header_length, = struct.unpack('<Q', checkpoint_file.read(8))
+        header = json.loads(checkpoint_file.read(header_length).decode())
+    if header['version'] != VERSION:
+        raise ValueError('Unsupported checkpoint version {}'.format(header['version']))
+    return header
+
+
+def load_checkpoint(path, entity_types=None):
+    """Load a world from a checkpoint file.
+
+    The layers are memory-mapped copy on write, so resuming a large world does not read them
+    until they are used and never modifies the file.
+
+    :param str path: The path of the checkpoint file
+    :param tuple|None entity_types: The classes of the plants and bacteria in the checkpoint,
+        every registered species by default
+    :rtype: sandbox.simulate_world.World
+    """
+    header = read_header(path)
+    columns = {}
+    for name, column in header['columns'].items():
+        if numpy.prod(column['shape']):
+            columns[name] = numpy.memmap(path, dtype=numpy.dtype(column['dtype']), mode='c',
+                                         offset=column['offset'], shape=tuple(column['shape']))
+        else:
+            columns[name] = numpy.zeros(column['shape'], dtype=numpy.dtype(column['dtype']))
+
+    world = simulate_world.World(header['max_x_size'], header['max_y_size'],
+                                 seed=header['rng']['seed'])
+    world.time = header['time']
+    world.rng.set_state(header['rng'])
+    for layer in simulate_world.LAYERS:
+        setattr(world, layer, columns['layer.' + layer])
+
+    types_by_name = {entity_type.__name__: entity_type
+                     for entity_type in entity_types or species.get_species()}
+    entity_classes = [types_by_name[name] for name in header['type_names']]
+    for name, entities in (('plants', world.global_plants), ('bacteria', world.global_bacteria)):
+        attributes = [columns['{}.{}'.format(name, column)].tolist()
+                      for column in ENTITY_COLUMNS]
+        for (type_code, x_position, y_position, current_lifetime, max_lifetime,
+             reproduction_rate) in zip(*attributes):
+            entity = entity_classes[type_code](x_position, y_position)
+            entity.current_lifetime = current_lifetime
+            if max_lifetime != entity.max_lifetime:
+                entity.max_lifetime = max_lifetime
+            if reproduction_rate != entity.reproduction_rate:
+                entity.reproduction_rate = reproduction_rate
+            entities.append(entity)
+            if name == 'plants':
+                world.get_beings(x_position, y_position)[entity.KIND].append(entity)
+        entities.compact()
+
+    if header['engine_types'] is not None and header.get('cohort_engine'):
+        engine = world.bacteria_engine = cohort_engine.CohortEngine(
+            header['max_x_size'], header['max_y_size'],
+            [types_by_name[name] for name in header['engine_types']])
+        engine.cohorts = [numpy.array(columns['cohorts.' + name])
+                          for name in header['engine_types']]
+    elif header['engine_types'] is not None:
+        engine = world.bacteria_engine = bacteria_engine.BacteriaEngine(
+            [types_by_name[name] for name in header['engine_types']])
+        engine.add(*(columns['engine.' + column] for column in ENTITY_COLUMNS))
+    if header.get('scheduler') is not None:
+        _restore_scheduler(world, header['scheduler'], columns, types_by_name)
+    world.occupancy.rebuild(world)
+    world.stats.recount(world)
+    return world
+
+
+class CheckpointObserver(observers.SimulationObserver):
+    """Periodically checkpoint a running simulation.
+
+    :param str path: The path of the checkpoint file, formatted with the ``time`` of the world
+        so e.g. ``run_{time}.ckpt`` keeps every checkpoint while ``run.ckpt`` only the latest
+    :param int every_n_ticks: Checkpoint every that many ticks, or after fast forwarding past
+        such a tick
+    """
+    def __init__(self, path, every_n_ticks=200):
+        self.path = path
+        self.every_n_ticks = every_n_ticks
+        self._previous_time = None
+
+    def on_tick(self, simulation):
+        """Checkpoint the world if due.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        time = simulation.world.time
+        previous_time, self._previous_time = self._previous_time, time
+        if previous_time is None:
+            due = not time % self.every_n_ticks
+        else:
+            due = time // self.every_n_ticks > previous_time // self.every_n_ticks
+        if due:
+            simulation.sync_lifetimes()
+            save_checkpoint(simulation.world, self.path.format(time=time))
@@ -0,0 +1,103 @@
+"""Fixed-size square chunks of the world, to skip the regions where nothing lives."""
+import numpy
+
+CHUNK_SIZE = 32
+
+
+class ChunkIndex:
+    """Split a world into square chunks of ``chunk_size`` pieces of land.
+
+    ``changes`` counts, for every chunk, the events which may have changed its land, e.g. a
+    death depositing nutrient. Every reader keeps its own copy to find the chunks which changed
+    since it last looked, see ``get_changed``.
+
+    :param int max_x_size: The x size of the world
+    :param int max_y_size: The y size of the world
+    :param int chunk_size: The x and y size of a chunk
+    """
+    def __init__(self, max_x_size, max_y_size, chunk_size=CHUNK_SIZE):
+        self.max_x_size = max_x_size
+        self.max_y_size = max_y_size
+        self.chunk_size = chunk_size
+        self.shape = (-(-max_x_size // chunk_size), -(-max_y_size // chunk_size))
+        self.changes = numpy.zeros(self.shape, dtype=numpy.int64)
+
+    def get_slices(self, chunk_x, chunk_y):
+        """Get the slices of the layers of the world covered by a chunk.
+
+        :param int chunk_x: The x position of the chunk
+        :param int chunk_y: The y position of the chunk
+        :rtype: tuple
+        """
+        return (slice(chunk_x * self.chunk_size, (chunk_x + 1) * self.chunk_size),
+                slice(chunk_y * self.chunk_size, (chunk_y + 1) * self.chunk_size))
+
+    def iter_slices(self, chunk_mask):
+        """Iterate over the slices of the chunks of a mask, in row major order.
+
+        :param numpy.ndarray chunk_mask: Boolean array of the shape of the chunks
+        :rtype: collections.abc.Iterator[tuple]
+        """
+        for chunk_x, chunk_y in zip(*(positions.tolist()
+                                      for positions in numpy.nonzero(chunk_mask))):
+            yield self.get_slices(chunk_x, chunk_y)
+
+    def get_chunk_mask(self, x_positions, y_positions):
+        """Get the mask of the chunks holding some pieces of land.
+
+        :param numpy.ndarray x_positions: The x positions of the pieces of land
+        :param numpy.ndarray y_positions: The y positions of the pieces of land
+        :rtype: numpy.ndarray
+        """
+        chunk_mask = numpy.zeros(self.shape, dtype=bool)
+        chunk_mask[x_positions // self.chunk_size, y_positions // self.chunk_size] = True
+        return chunk_mask
+
+    def sum_chunks(self, values):
+        """Sum an array of the shape of the world over every chunk.
+
+        :param numpy.ndarray values: Array of shape (max_x_size, max_y_size)
+        :return: Array of the shape of the chunks
+        :rtype: numpy.ndarray
+        """
+        padded = numpy.zeros((self.shape[0] * self.chunk_size, self.shape[1] * self.chunk_size),
+                             dtype=values.dtype)
+        padded[:self.max_x_size, :self.max_y_size] = values
+        return padded.reshape(self.shape[0], self.chunk_size,
+                              self.shape[1], self.chunk_size).sum(axis=(1, 3))
+
+    def mark_changed(self, x_position, y_position):
+        """Record a change in the chunk of a piece of land.
+
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        """
+        self.changes[x_position // self.chunk_size, y_position // self.chunk_size] += 1
+
+    def mark_changed_many(self, x_positions, y_positions):
+        """Record changes in the chunks of many pieces of land.
+
+        :param numpy.ndarray x_positions: The x positions of the pieces of land
+        :param numpy.ndarray y_positions: The y positions of the pieces of land
+        """
+        numpy.add.at(self.changes, (x_positions // self.chunk_size,
+                                    y_positions // self.chunk_size), 1)
+
+    def mark_changed_chunks(self, chunk_mask):
+        """Record a change in every chunk of a mask.
+
+        :param numpy.ndarray chunk_mask: Boolean array of the shape of the chunks
+        """
+        self.changes[chunk_mask] += 1
+
+    def get_changed(self, seen_changes):
+        """Find the chunks which changed since a reader last looked.
+
+        :param numpy.ndarray|None seen_changes: The ``changes`` the reader saw last, None if it
+            never looked
+        :return: The mask of the changed chunks and the changes to keep for the next call
+        :rtype: tuple
+        """
+        if seen_changes is None:
+            return numpy.ones(self.shape, dtype=bool), self.changes.copy()
+        return self.changes != seen_changes, self.changes.copy()
@@ -0,0 +1,240 @@
+"""Engine simulating the bacteria of a world as counts per piece of land, type and age."""
+import numpy
+
+from sandbox import species
+from sandbox import utils
+
+
+def get_dispersal_offsets(distance):
+    """Get the offsets of the pieces of land children can land on around their parent.
+
+    Children land on any of them with the same chance, like ``utils.get_new_position``.
+
+    :param int distance: The dispersal distance of the species
+    :rtype: tuple
+    """
+    offsets = range(-distance, distance + 1)
+    return tuple((x_offset, y_offset) for x_offset in offsets for y_offset in offsets)
+
+
+class CohortEngine:
+    """Populations of bacteria counted per type, age and piece of land.
+
+    Bacteria of the same type and age in the same piece of land behave the same, so they are
+    kept as one cohort: ``cohorts[type_code]`` is an array of shape
+    (max_lifetime + 1, max_x_size, max_y_size) of the number of bacteria of each age. Memory and
+    tick cost scale with the area where bacteria live instead of their number.
+
+    A tick applies the rules of ``sandbox.simulate_bacteria.Bacteria.execute_tick`` to whole
+    cohorts. The oldest bacteria die first and deposit their nutrient, then all the others of
+    their type in that piece of land die if the nutrient is too high. The children are split
+    between the neighbouring pieces of land with a multinomial draw from
+    ``world.rng.dispersal``. Runs are reproducible for the same seed but differ from the
+    other engines, which place every child with its own draw and check deaths one by one.
+
+    :param int max_x_size: The x size of the world
+    :param int max_y_size: The y size of the world
+    :param tuple|None bacteria_types: The bacteria classes this engine can simulate, their
+        index is the type code, every registered bacteria species by default
+    """
+    def __init__(self, max_x_size, max_y_size, bacteria_types=None):
+        self.bacteria_types = tuple(bacteria_types or species.get_species('bacteria'))
+        self._type_codes = {bacteria_type: code
+                            for code, bacteria_type in enumerate(self.bacteria_types)}
+        self.cohorts = [numpy.zeros((bacteria_type.MAX_LIFETIME + 1, max_x_size, max_y_size),
+                                    dtype=numpy.int64)
+                        for bacteria_type in self.bacteria_types]
+
+    def __len__(self):
+        return int(sum(cohorts.sum() for cohorts in self.cohorts))
+
+    def absorb(self, bacteria):
+        """Move bacteria objects into their cohorts, emptying the given list.
+
+        Bacteria given a lifetime of their own join the cohorts of their type.
+
+        :param sandbox.entity_store.EntityStore bacteria: The bacteria objects
+        """
+        if not bacteria:
+            return
+        for single in bacteria:
+            cohorts = self.cohorts[self._type_codes[type(single)]]
+            cohorts[min(single.current_lifetime, len(cohorts) - 1),
+                    single.x_position, single.y_position] += 1
+        bacteria.clear()
+
+    def add(self, type_code, x_position, y_position, current_lifetime=None):
+        """Add bacteria given as arrays to their cohorts, like ``BacteriaEngine.add``.
+
+        :param numpy.ndarray type_code: The type codes of the new bacteria
+        :param numpy.ndarray x_position: The x positions of the new bacteria
+        :param numpy.ndarray y_position: The y positions of the new bacteria
+        :param numpy.ndarray|None current_lifetime: The ages of the new bacteria, 0 by default
+        """
+        type_code = numpy.asarray(type_code, dtype=numpy.int64)
+        x_position = numpy.asarray(x_position, dtype=numpy.int64)
+        y_position = numpy.asarray(y_position, dtype=numpy.int64)
+        if current_lifetime is None:
+            current_lifetime = numpy.zeros(len(type_code), dtype=numpy.int64)
+        current_lifetime = numpy.asarray(current_lifetime, dtype=numpy.int64)
+        for code in numpy.unique(type_code).tolist():
+            selected = type_code == code
+            cohorts = self.cohorts[code]
+            numpy.add.at(cohorts, (numpy.minimum(current_lifetime[selected], len(cohorts) - 1),
+                                   x_position[selected], y_position[selected]), 1)
+
+    def count_by_type(self):
+        """Count the living bacteria of each type.
+
+        :rtype: dict
+        """
+        counts = {}
+        for bacteria_type, cohorts in zip(self.bacteria_types, self.cohorts):
+            count = int(cohorts.sum())
+            if count:
+                counts[bacteria_type.__name__] = count
+        return counts
+
+    def count_by_cell(self, shape):  # pylint: disable=unused-argument
+        """Count the living bacteria of each kind in every piece of land.
+
+        :param tuple shape: The x and y size of the world
+        :rtype: dict
+        """
+        return {bacteria_type.KIND: cohorts.sum(axis=0)
+                for bacteria_type, cohorts in zip(self.bacteria_types, self.cohorts)}
+
+    def execute_tick(self, world):
+        """Run one tick for every cohort in the world.
+
+        Bacteria objects appended to ``world.global_bacteria`` since the last tick, e.g. spawned
+        by dying grass, join their cohorts first. Only the chunks of the world where bacteria of
+        a type live are ticked for that type.
+
+        :param sandbox.simulate_world.World world: The world object
+        """
+        self.absorb(world.global_bacteria)
+        for type_code, bacteria_type in enumerate(self.bacteria_types):
+            active = world.occupancy.get_active_chunks([bacteria_type.KIND])
+            if active.any():
+                self._tick_type(world, bacteria_type, self.cohorts[type_code], active)
+
+    def _tick_type(self, world, bacteria_type, cohorts, active):
+        """Run one tick for the cohorts of one type of bacteria.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param type bacteria_type: The bacteria class
+        :param numpy.ndarray cohorts: The cohorts of the type
+        :param numpy.ndarray active: The mask of the chunks where bacteria of the type live
+        """
+        deaths, (x_position, y_position, children) = self._age_chunks(
+            world, bacteria_type, cohorts, active)
+        # Draw in the order of the whole world, whichever chunks are active
+        order = numpy.argsort(x_position * world.max_y_size + y_position)
+        landed = self._disperse(world, cohorts[0], x_position[order], y_position[order],
+                                children[order], bacteria_type.DISPERSAL)
+        world.chunks.mark_changed_chunks(active)
+        for chunk_x, chunk_y in zip(*(positions.tolist()
+                                      for positions in numpy.nonzero(active | landed))):
+            x_slice, y_slice = world.chunks.get_slices(chunk_x, chunk_y)
+            world.occupancy.set_chunk(bacteria_type.KIND, chunk_x, chunk_y,
+                                      cohorts[:, x_slice, y_slice].sum(axis=0))
+        self._count_tick(world, bacteria_type, deaths, int(children.sum()))
+
+    @staticmethod
+    def _count_tick(world, bacteria_type, deaths, birth_count):
+        """Count the deaths and births of one type of bacteria in a tick.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param type bacteria_type: The bacteria class
+        :param tuple deaths: The numbers of deaths by lifetime and by concentration
+        :param int birth_count: The number of births
+        """
+        lifetime_count, concentration_count = deaths
+        name = bacteria_type.__name__
+        world.stats.add_to_layer(bacteria_type.NUTRIENT, (
+            lifetime_count + concentration_count) * bacteria_type.DEATH_DEPOSIT)
+        world.stats.bacteria_died(name, lifetime_count + concentration_count)
+        world.stats.bacteria_born(name, birth_count)
+        world.instrumentation.count('deaths.lifetime', lifetime_count)
+        world.instrumentation.count('deaths.concentration', concentration_count)
+        world.instrumentation.count('births', birth_count)
+
+    def _age_chunks(self, world, bacteria_type, cohorts, active):
+        """Age the cohorts of one type in the active chunks and find where children are born.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param type bacteria_type: The bacteria class
+        :param numpy.ndarray cohorts: The cohorts of the type
+        :param numpy.ndarray active: The mask of the chunks where bacteria of the type live
+        :return: The numbers of deaths by lifetime and by concentration, and the x positions,
+            the y positions and the numbers of children of the pieces of land with children
+        :rtype: tuple
+        """
+        # Bacteria killed by the concentration still reproduce, like in the object engine
+        reproducing_ages = numpy.arange(len(cohorts)) % bacteria_type.REPRODUCTION_RATE == 0
+        reproducing_ages[0] = False
+        deaths = (0, 0)
+        parents = ([], [], [])
+        for x_slice, y_slice in world.chunks.iter_slices(active):
+            chunk_deaths, children = self._age_chunk(
+                cohorts[:, x_slice, y_slice],
+                getattr(world, bacteria_type.NUTRIENT)[x_slice, y_slice],
+                bacteria_type, reproducing_ages)
+            deaths = (deaths[0] + chunk_deaths[0], deaths[1] + chunk_deaths[1])
+            x_position, y_position = numpy.nonzero(children)
+            parents[0].append(x_position + x_slice.start)
+            parents[1].append(y_position + y_slice.start)
+            parents[2].append(children[x_position, y_position])
+        return deaths, tuple(numpy.concatenate(values) for values in parents)
+
+    @staticmethod
+    def _age_chunk(chunk, chunk_layer, bacteria_type, reproducing_ages):
+        """Age the cohorts of one type in one chunk, killing them in place.
+
+        :param numpy.ndarray chunk: The cohorts of the type in the chunk, modified
+        :param numpy.ndarray chunk_layer: The nutrient layer of the type in the chunk, modified
+        :param type bacteria_type: The bacteria class
+        :param numpy.ndarray reproducing_ages: The mask of the ages at which bacteria reproduce
+        :return: The numbers of deaths by lifetime and by concentration, and the number of
+            children born in each piece of land of the chunk
+        :rtype: tuple
+        """
+        # Everyone ages, the last cohort is past its lifetime
+        lifetime_deaths = chunk[-1].copy()
+        chunk[1:] = chunk[:-1]
+        chunk[0] = 0
+        children = chunk[reproducing_ages].sum(axis=0)
+
+        chunk_layer += lifetime_deaths * bacteria_type.DEATH_DEPOSIT
+        killed = chunk_layer > bacteria_type.DEATH_CONCENTRATION
+        concentration_deaths = numpy.where(killed, chunk.sum(axis=0), 0)
+        chunk[:, killed] = 0
+        chunk_layer += concentration_deaths * bacteria_type.DEATH_DEPOSIT
+        return (int(lifetime_deaths.sum()), int(concentration_deaths.sum())), children
+
+    @staticmethod
+    def _disperse(world, newborns, x_position, y_position, children, distance):
+        """Split the children born in some pieces of land between their neighbours.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param numpy.ndarray newborns: The number of newborns in each piece of land, added to
+        :param numpy.ndarray x_position: The x positions of the parents
+        :param numpy.ndarray y_position: The y positions of the parents
+        :param numpy.ndarray children: The number of children born in each of these pieces
+        :param int distance: The dispersal distance of the species
+        :return: The mask of the chunks where children landed
+        :rtype: numpy.ndarray
+        """
+        landed = numpy.zeros(world.chunks.shape, dtype=bool)
+        if not len(x_position):
+            return landed
+        offsets = get_dispersal_offsets(distance)
+        splits = world.rng.dispersal.multinomial(children, [1 / len(offsets)] * len(offsets))
+        for index, (x_offset, y_offset) in enumerate(offsets):
+            # Offsets past the edge wrap onto the same piece of land, so add with repeats
+            new_x_position = utils.wrap_positions(x_position + x_offset, world.max_x_size)
+            new_y_position = utils.wrap_positions(y_position + y_offset, world.max_y_size)
+            numpy.add.at(newborns, (new_x_position, new_y_position), splits[:, index])
+            landed |= world.chunks.get_chunk_mask(new_x_position, new_y_position)
+        return landed
@@ -1,45 +1,94 @@
 """Methods to help plot the stuff in the world."""
-from sandbox import utils
+import numpy
+
+from sandbox import observers
+
+TREE_COLOR = (139, 69, 19)
 
 
 def plot_bacteria(world):
-    """Plot the bacteria in the world.
+    """Plot the bacteria in the world from its running statistics.
 
     :param sandbox.simulate_world.World world: The world object
     """
     print('*'*100)
     print(world.time)
-    bacteria_count = {}
-
-    for bacteria in world.global_bacteria:
-        if str(bacteria) in bacteria_count:
-            bacteria_count[str(bacteria)] += 1
-        else:
-            bacteria_count[str(bacteria)] = 1
-
-    print(bacteria_count)
-
-    nitrogen = 0
-    phosphorus = 0
-    potassium = 0
-    carbon = 0
-    plant_matter = 0
-    tree_matter = 0
-    grass = 0
-    trees = 0
-    for x_val in range(0, world.max_x_size):
-        for y_val in range(0, world.max_y_size):
-            x_y_key = utils.get_x_y_key(x_val, y_val)
-            nitrogen += world.world_map[x_y_key].nitrogen
-            phosphorus += world.world_map[x_y_key].phosphorus
-            potassium += world.world_map[x_y_key].potassium
-            carbon += world.world_map[x_y_key].carbon
-            plant_matter += world.world_map[x_y_key].plant_matter
-            tree_matter += world.world_map[x_y_key].tree_matter
-            grass += len(world.world_map[x_y_key].beings['grass'])
-            trees += len(world.world_map[x_y_key].beings['tree'])
+    print(world.stats.get_bacteria_counts())
+
+    nitrogen = world.stats.layers['nitrogen']
+    phosphorus = world.stats.layers['phosphorus']
+    potassium = world.stats.layers['potassium']
+    carbon = world.stats.layers['carbon']
+    plant_matter = world.stats.layers['plant_matter']
+    tree_matter = world.stats.layers['tree_matter']
+    grass = world.stats.plants['GrassPlant']
+    trees = world.stats.plants['TreePlant']
     print('nitrogen:{} phosphorus:{} potassium:{} carbon:{}'
           .format(nitrogen, phosphorus, potassium, carbon))
     print('plant_matter:{} tree_matter:{}'
           .format(plant_matter, tree_matter))
     print('grass: {} trees:{}'.format(grass, trees))
+
+
+def get_land_colors(phosphorus, potassium, nitrogen, grass, trees, rng):
+    """Get the colors of the land for every piece of land at once.
+
+    Vectorized equivalent of ``sandbox.simulate_world.SimulateWorld.get_land_color`` working on
+    whole layers, so it can color a live world as well as recorded ones.
+
+    :param numpy.ndarray phosphorus: The phosphorus layer
+    :param numpy.ndarray potassium: The potassium layer
+    :param numpy.ndarray nitrogen: The nitrogen layer
+    :param numpy.ndarray grass: The number of grass plants in each piece of land
+    :param numpy.ndarray trees: The number of trees in each piece of land
+    :param sandbox.world_random.RandomStream rng: Random stream shading the grass
+    :return: Array of shape (x, y, 3) of the RGB colors
+    :rtype: numpy.ndarray
+    """
+    colors = numpy.stack([phosphorus + potassium + nitrogen, nitrogen, potassium], axis=-1)
+
+    grassy = grass >= 5
+    colors[grassy] = 0
+    colors[grassy, 1] = rng.randints(180, 220, int(numpy.count_nonzero(grassy)))
+    colors[trees >= 2] = TREE_COLOR
+
+    return numpy.clip(colors, 0, 255).astype(numpy.uint8)
+
+
+def get_world_colors(world):
+    """Get the colors of the land of a world.
+
+    :param sandbox.simulate_world.World world: The world object
+    :return: Array of shape (x, y, 3) of the RGB colors
+    :rtype: numpy.ndarray
+    """
+    return get_land_colors(world.phosphorus, world.potassium, world.nitrogen,
+                           world.occupancy.get_counts('grass'),
+                           world.occupancy.get_counts('tree'),
+                           world.rng.rendering)
+
+
+def update_world_colors(world, colors, chunk_mask):
+    """Color again only some chunks of the land of a world.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param numpy.ndarray colors: Array of shape (x, y, 3) of the RGB colors, updated in place
+    :param numpy.ndarray chunk_mask: The mask of the chunks to color, see ``world.chunks``
+    """
+    grass = world.occupancy.get_counts('grass')
+    trees = world.occupancy.get_counts('tree')
+    for slices in world.chunks.iter_slices(chunk_mask):
+        colors[slices] = get_land_colors(world.phosphorus[slices], world.potassium[slices],
+                                         world.nitrogen[slices], grass[slices], trees[slices],
+                                         world.rng.rendering)
+
+
+class PlotObserver(observers.SimulationObserver):
+    """Plot the bacteria in the world after every tick."""
+
+    def on_tick(self, simulation):
+        """Plot the bacteria in the world.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        plot_bacteria(simulation.world)
@@ -0,0 +1,594 @@
+"""Split a world into subdomains ticked by worker processes, for worlds too large for one.
+
+The world is cut along x into slabs of whole stripes of ``sandbox.synchronous_tick``, each one
+owned by a worker process holding the plants and bacteria living in it. Every tick is two
+rounds driven by the coordinator:
+
+1. ``compute``: every worker ticks the stripes of its slab against ``StripeWorld`` views, so
+   they all read the state of the world at the start of the tick.
+2. ``apply``: the buffered changes are routed to the workers owning the land they touch and
+   applied in stripe order. Children born across a boundary, including through the toroidal
+   wrap of ``utils.get_new_position``, migrate to the worker owning their piece of land.
+
+The statistics of every stripe are gathered at the coordinator, so a run gives the same world
+and statistics as ``SimulationOptions(synchronous_workers=n)`` whatever the number of workers.
+
+Local workers are forked and share the layers of the world through shared memory, so the
+coordinator sees them while the simulation runs. Workers connected through a socket, e.g. on
+other nodes, are started with::
+
+    python -m sandbox.domains --connect host:port --authkey secret
+
+They only write the rows of their slab plus a halo of rows on each side, see ``get_halo_size``,
+exchanged with their neighbours after every tick, and send their layers back when the
+simulation is closed.
+
+The plants and bacteria live on the workers while the simulation runs, the observers of a run
+see the layers and statistics of the world but none of its plants and bacteria.
+"""
+import argparse
+import multiprocessing
+import multiprocessing.connection
+from multiprocessing import shared_memory
+
+import numpy
+
+from sandbox import simulate_world
+from sandbox import species
+from sandbox import synchronous_tick
+
+
+def get_halo_size(simulation):
+    """Get the rows of the neighbouring slabs kept by socket workers, the furthest a child lands.
+
+    Covers the registered species, the ones living in the world or spawned by the spawn schedule
+    of the simulation, and the bacteria spawned by their deaths.
+
+    :param sandbox.simulate_world.SimulateWorld simulation: The simulation
+    :rtype: int
+    """
+    world = simulation.world
+    entity_types = set(species.get_species())
+    entity_types.update(type(entity) for entity in world.global_plants)
+    entity_types.update(type(entity) for entity in world.global_bacteria)
+    entity_types.update(window.entity_type for window in simulation.spawn_schedule.windows)
+    entity_types.update(spawn_type for entity_type in list(entity_types)
+                        for spawn_type in getattr(entity_type, 'DEATH_SPAWN_TYPES', ()))
+    return max(entity_type.DISPERSAL for entity_type in entity_types)
+
+
+def split_slabs(max_x_size, stripe_height, processes):
+    """Split the rows of a world into slabs of whole stripes, one per process.
+
+    :param int max_x_size: The x size of the world
+    :param int stripe_height: The number of rows of a stripe
+    :param int processes: The number of processes, at most the number of stripes are used
+    :return: The first row of every slab followed by the x size of the world
+    :rtype: numpy.ndarray
+    """
+    stripes = -(-max_x_size // stripe_height)
+    processes = max(1, min(processes, stripes))
+    bounds = [min(slab * stripes // processes * stripe_height, max_x_size)
+              for slab in range(processes + 1)]
+    return numpy.array(bounds)
+
+
+class DomainWorker:
+    """The slab of a world owned by one worker process.
+
+    :param dict spec: The slab sent by the coordinator, see ``DomainSimulation``
+    """
+    def __init__(self, spec):
+        self.index = spec['index']
+        self.bounds = spec['bounds']
+        self.x_start, self.x_end = self.bounds[self.index], self.bounds[self.index + 1]
+        self.halo_size = spec['halo_size']
+        self.striped_tick = synchronous_tick.StripedTick(stripe_height=spec['stripe_height'])
+        world = self.world = simulate_world.World(spec['max_x_size'], spec['max_y_size'],
+                                                  seed=spec['seed'],
+                                                  chunk_size=spec['chunk_size'])
+        world.time = spec['time']
+        self._shared_memory = []
+        if spec['shared_layers']:
+            for layer, (name, dtype) in spec['shared_layers'].items():
+                block = shared_memory.SharedMemory(name=name)
+                self._shared_memory.append(block)
+                setattr(world, layer, numpy.ndarray((world.max_x_size, world.max_y_size),
+                                                    dtype=dtype, buffer=block.buf))
+            self.halo_rows = None
+        else:
+            rows = numpy.arange(self.x_start - self.halo_size, self.x_end + self.halo_size)
+            self._set_rows(rows % world.max_x_size, spec['layer_rows'], halo_only=False)
+            self.halo_rows = numpy.setdiff1d(rows % world.max_x_size,
+                                             numpy.arange(self.x_start, self.x_end))
+        for plant in spec['plants']:
+            self._add_plant(plant)
+        for bacteria in spec['bacteria']:
+            self._add_bacteria(bacteria)
+        world.global_plants.compact()
+        world.global_bacteria.compact()
+        self._own_parts = []
+
+    def get_owners(self, x_positions):
+        """Find the workers owning some rows.
+
+        :param numpy.ndarray x_positions: The rows
+        :rtype: numpy.ndarray
+        """
+        return numpy.searchsorted(self.bounds, x_positions, side='right') - 1
+
+    def _add_plant(self, plant):
+        """Add a plant to the slab.
+
+        :param sandbox.simulate_plants.Plant plant: The plant
+        """
+        self.world.global_plants.append(plant)
+        self.world.get_beings(plant.x_position, plant.y_position)[plant.KIND].append(plant)
+        self.world.occupancy.add(plant.KIND, plant.x_position, plant.y_position)
+
+    def _add_bacteria(self, bacteria):
+        """Add a bacteria to the slab.
+
+        :param sandbox.simulate_bacteria.Bacteria bacteria: The bacteria
+        """
+        self.world.global_bacteria.append(bacteria)
+        self.world.occupancy.add(bacteria.KIND, bacteria.x_position, bacteria.y_position)
+
+    def _set_rows(self, rows, values, halo_only=True):
+        """Write rows of every layer.
+
+        :param numpy.ndarray rows: The rows
+        :param dict values: The values of the rows, keyed by layer
+        :param bool halo_only: Only write the rows of the halo of the slab
+        """
+        if halo_only:
+            keep = numpy.isin(rows, self.halo_rows)
+            rows = rows[keep]
+            values = {layer: layer_values[keep] for layer, layer_values in values.items()}
+        for layer, layer_values in values.items():
+            getattr(self.world, layer)[rows] = layer_values
+
+    def get_border(self):
+        """Get the rows of the slab in the halos of its neighbours.
+
+        :return: The rows and their values, keyed by layer
+        :rtype: tuple
+        """
+        rows = numpy.unique(numpy.clip(numpy.r_[
+            self.x_start:self.x_start + self.halo_size, self.x_end - self.halo_size:self.x_end],
+                                       self.x_start, self.x_end - 1))
+        return rows, {layer: getattr(self.world, layer)[rows]
+                      for layer in simulate_world.LAYERS}
+
+    def compute(self, time, borders):
+        """Tick the stripes of the slab, buffering their changes.
+
+        :param int time: The time of the world
+        :param list[tuple] borders: The borders of the neighbouring slabs, for socket workers
+        :return: The changes to the land of the other workers keyed by their index, and the
+            statistics of every stripe
+        :rtype: tuple
+        """
+        self.world.time = time
+        for rows, values in borders:
+            self._set_rows(rows, values)
+        parts = {}
+        counts = []
+        for stripe, (plants, bacteria) in enumerate(self.striped_tick.split(self.world)):
+            if not plants and not bacteria:
+                continue
+            stripe_world = self.striped_tick.tick_stripe(self.world, stripe, plants, bacteria)
+            counts.append((stripe, stripe_world.stats, stripe_world.instrumentation.counters))
+            for owner, part in self._split(stripe, stripe_world).items():
+                if owner == self.index:
+                    self._own_parts.append(part)
+                else:
+                    parts.setdefault(owner, []).append(part)
+        return parts, counts
+
+    def _split(self, stripe, stripe_world):
+        """Split the buffered changes of a stripe by the worker owning their land.
+
+        :param int stripe: The index of the stripe
+        :param sandbox.synchronous_tick.StripeWorld stripe_world: The ticked stripe
+        :rtype: dict
+        """
+        parts = {}
+
+        def get_part(owner):
+            part = parts.get(owner)
+            if part is None:
+                part = parts[owner] = {'stripe': stripe, 'layers': {}, 'plants': [],
+                                       'bacteria': [], 'plant_deaths': [], 'bacteria_deaths': [],
+                                       'beings': [], 'occupancy': []}
+            return part
+
+        for layer in simulate_world.LAYERS:
+            buffered = getattr(stripe_world, layer)
+            if not buffered.deltas:
+                continue
+            x_positions = numpy.array(buffered.x_positions)
+            y_positions = numpy.array(buffered.y_positions)
+            deltas = numpy.array(buffered.deltas, dtype=getattr(self.world, layer).dtype)
+            owners = self.get_owners(x_positions)
+            for owner in numpy.unique(owners).tolist():
+                keep = owners == owner
+                get_part(owner)['layers'][layer] = (x_positions[keep], y_positions[keep],
+                                                    deltas[keep])
+        # Only the entities of the slab are ticked, so they all die here
+        if stripe_world.global_plants.deaths or stripe_world.global_bacteria.deaths:
+            part = get_part(self.index)
+            part['plant_deaths'] = stripe_world.global_plants.deaths
+            part['bacteria_deaths'] = stripe_world.global_bacteria.deaths
+        for name in ('plants', 'bacteria'):
+            for entity in getattr(stripe_world, 'global_' + name).births:
+                get_part(self.get_owners(entity.x_position).item())[name].append(entity)
+        for operation in stripe_world.beings_operations:
+            get_part(self.get_owners(operation[0][0]).item())['beings'].append(operation)
+        for operation in stripe_world.occupancy.operations:
+            get_part(self.get_owners(operation[1]).item())['occupancy'].append(operation)
+        return parts
+
+    def apply(self, parts, spawned_plants, spawned_bacteria):
+        """Apply the changes of the tick to the slab, in stripe order.
+
+        :param list[dict] parts: The changes to the land of the slab made by the other workers
+        :param list[sandbox.simulate_plants.Plant] spawned_plants: New plants of the slab
+        :param list[sandbox.simulate_bacteria.Bacteria] spawned_bacteria: New bacteria of the
+            slab
+        :return: The border of the slab for socket workers, None for shared layers
+        :rtype: tuple|None
+        """
+        world = self.world
+        for part in sorted(self._own_parts + parts, key=lambda part: part['stripe']):
+            for layer, (x_positions, y_positions, deltas) in part['layers'].items():
+                numpy.add.at(getattr(world, layer), (x_positions, y_positions), deltas)
+                world.chunks.mark_changed_many(x_positions, y_positions)
+            for name, deaths in (('plants', 'plant_deaths'), ('bacteria', 'bacteria_deaths')):
+                store = getattr(world, 'global_' + name)
+                for entity in part[deaths]:
+                    store.remove(entity)
+                store.extend(part[name])
+            for (x_position, y_position, kind), arrives, entity in part['beings']:
+                beings = world.get_beings(x_position, y_position)[kind]
+                if arrives:
+                    beings.append(entity)
+                else:
+                    beings.remove(entity)
+            for kind, x_position, y_position, count in part['occupancy']:
+                if count < 0:
+                    world.occupancy.remove(kind, x_position, y_position, -count)
+                else:
+                    world.occupancy.add(kind, x_position, y_position, count)
+        self._own_parts = []
+        for plant in spawned_plants:
+            self._add_plant(plant)
+        for bacteria in spawned_bacteria:
+            self._add_bacteria(bacteria)
+        world.global_plants.compact()
+        world.global_bacteria.compact()
+        return None if self.halo_rows is None else self.get_border()
+
+    def gather(self):
+        """Get the plants, the bacteria and, for socket workers, the layers of the slab.
+
+        :rtype: tuple
+        """
+        layer_rows = None
+        if self.halo_rows is not None:
+            layer_rows = {layer: getattr(self.world, layer)[self.x_start:self.x_end]
+                          for layer in simulate_world.LAYERS}
+        return list(self.world.global_plants), list(self.world.global_bacteria), layer_rows
+
+    def close(self):
+        """Detach from the shared layers."""
+        self.world = None
+        for block in self._shared_memory:
+            block.close()
+        self._shared_memory = []
+
+
+def serve(connection):
+    """Run a worker, answering the commands of its coordinator until it closes.
+
+    :param multiprocessing.connection.Connection connection: The connection to the coordinator
+    """
+    worker = None
+    while True:
+        command, arguments = connection.recv()
+        if command == 'init':
+            worker = DomainWorker(*arguments)
+        elif command == 'close':
+            worker.close()
+            connection.close()
+            return
+        else:
+            connection.send(getattr(worker, command)(*arguments))
+
+
+def connect(address, authkey):
+    """Run a worker connected to its coordinator through a socket.
+
+    :param tuple address: The host and port the coordinator listens on
+    :param bytes authkey: The key authenticating the coordinator and the workers
+    """
+    serve(multiprocessing.connection.Client(address, authkey=authkey))
+
+
+class DomainSimulation:
+    """Run a synchronous simulation with its world split between worker processes.
+
+    The plants and bacteria move to the workers until ``close``, which gathers them back into
+    the world, so the simulation can go on in a single process afterwards. Use it as a context
+    manager::
+
+        with domains.DomainSimulation(simulation, processes=4) as distributed:
+            distributed.run(ticks=1000)
+
+    :param sandbox.simulate_world.SimulateWorld simulation: The simulation to distribute
+    :param int processes: The number of worker processes, at most one per stripe
+    :param str transport: ``'pipe'`` to fork local workers sharing the layers through shared
+        memory, ``'socket'`` to listen on ``address`` for workers exchanging halos
+    :param tuple address: The host and port to listen on for the socket transport, a free port
+        of the local host by default
+    :param bytes|None authkey: The key authenticating the socket workers, the one of the
+        current process by default
+    :param bool spawn_workers: Fork the socket workers locally instead of waiting for workers
+        started with ``python -m sandbox.domains``
+    :param int|None stripe_height: The number of rows of a stripe, the chunk size by default
+    :raises ValueError: If the simulation has a bacteria engine or scheduled lifecycles,
+        checkpoints, fast forwards or stops early, if the transport is unknown or if the halo of
+        the socket workers is wider than their slabs
+    """
+    def __init__(self, simulation, processes=2, transport='pipe', address=('localhost', 0),
+                 authkey=None, spawn_workers=True, stripe_height=None):
+        world = self.world = simulation.world
+        if world.bacteria_engine is not None:
+            raise ValueError('Domains only simulate bacteria objects, not a {}'.format(
+                type(world.bacteria_engine).__name__))
+        if simulation.scheduler is not None or world.lifecycle_scheduler is not None:
+            raise ValueError('Domains and scheduled lifecycles do not mix')
+        # The workers hold the plants and bacteria, the world looks empty to these options
+        options = simulation.options
+        if options.fast_forward or options.stop_when is not None or options.checkpoint_path:
+            raise ValueError('Domains do not checkpoint, fast forward or stop early')
+        if transport not in ('pipe', 'socket'):
+            raise ValueError('Unknown transport {}'.format(transport))
+        self.simulation = simulation
+        self.stripe_height = stripe_height or world.chunks.chunk_size
+        self.bounds = split_slabs(world.max_x_size, self.stripe_height, processes)
+        self.halo_size = get_halo_size(simulation)
+        if transport == 'socket' and len(self.bounds) > 2 and \
+           self.halo_size > numpy.diff(self.bounds).min():
+            raise ValueError('The halo of {} rows is wider than a slab'.format(self.halo_size))
+        self.processes = []
+        self.connections = []
+        self._shared_memory = []
+        self._listener = None
+        if transport == 'pipe':
+            shared_layers = self._share_layers()
+            for _ in range(len(self.bounds) - 1):
+                connection, worker_connection = multiprocessing.Pipe()
+                self._start_worker(serve, worker_connection)
+                worker_connection.close()
+                self.connections.append(connection)
+        else:
+            shared_layers = None
+            authkey = authkey or multiprocessing.current_process().authkey
+            self._listener = multiprocessing.connection.Listener(address, authkey=authkey)
+            for _ in range(len(self.bounds) - 1):
+                if spawn_workers:
+                    self._start_worker(connect, self._listener.address, authkey)
+                self.connections.append(self._listener.accept())
+        self._distribute(shared_layers)
+        self._borders = [[] for _ in self.connections]
+
+    @property
+    def address(self):
+        """The host and port the socket workers connect to, None for the pipe transport.
+
+        :rtype: tuple|None
+        """
+        return None if self._listener is None else self._listener.address
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _start_worker(self, target, *arguments):
+        """Fork a local worker.
+
+        :param callable target: Run by the worker
+        :param arguments: The arguments of the target
+        """
+        process = multiprocessing.Process(target=target, args=arguments, daemon=True)
+        process.start()
+        self.processes.append(process)
+
+    def _share_layers(self):
+        """Move the layers of the world into shared memory.
+
+        :return: The name and dtype of the shared memory of every layer
+        :rtype: dict
+        """
+        shared_layers = {}
+        for layer in simulate_world.LAYERS:
+            values = getattr(self.world, layer)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            self._shared_memory.append(block)
+            shared = numpy.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+            shared[...] = values
+            setattr(self.world, layer, shared)
+            shared_layers[layer] = (block.name, values.dtype.str)
+        return shared_layers
+
+    def _distribute(self, shared_layers):
+        """Send every worker its slab, moving the plants and bacteria out of the world.
+
+        :param dict|None shared_layers: The shared memory of the layers, None to send the rows
+        """
+        world = self.world
+        slabs = [([], []) for _ in self.connections]
+        owners = numpy.searchsorted(self.bounds, numpy.arange(world.max_x_size),
+                                    side='right') - 1
+        for index, entities in enumerate((world.global_plants, world.global_bacteria)):
+            for entity in entities:
+                slabs[owners[entity.x_position]][index].append(entity)
+        for index, (connection, (plants, bacteria)) in enumerate(zip(self.connections, slabs)):
+            layer_rows = None
+            if shared_layers is None:
+                rows = numpy.arange(self.bounds[index] - self.halo_size,
+                                    self.bounds[index + 1] + self.halo_size) % world.max_x_size
+                layer_rows = {layer: getattr(world, layer)[rows]
+                              for layer in simulate_world.LAYERS}
+            connection.send(('init', ({'index': index, 'bounds': self.bounds,
+                                       'stripe_height': self.stripe_height,
+                                       'halo_size': self.halo_size,
+                                       'max_x_size': world.max_x_size,
+                                       'max_y_size': world.max_y_size,
+                                       'seed': world.rng.seed,
+                                       'chunk_size': world.chunks.chunk_size,
+                                       'time': world.time,
+                                       'shared_layers': shared_layers,
+                                       'layer_rows': layer_rows,
+                                       'plants': plants,
+                                       'bacteria': bacteria},)))
+        world.global_plants.clear()
+        world.global_bacteria.clear()
+        world.beings = {}
+        world.occupancy.rebuild(world)
+
+    def _broadcast(self, command, arguments_per_worker):
+        """Send a command to every worker and wait for their answers.
+
+        :param str command: The name of the method of ``DomainWorker`` to call
+        :param list[tuple] arguments_per_worker: The arguments of every worker
+        :rtype: list
+        """
+        for connection, arguments in zip(self.connections, arguments_per_worker):
+            connection.send((command, arguments))
+        return [connection.recv() for connection in self.connections]
+
+    def run(self, ticks=None, observers=()):
+        """Run the simulation, notifying the observers like ``SimulateWorld.run``.
+
+        :param int|None ticks: Number of ticks to run, by default until the ``end_time`` of the
+            simulation
+        :param list[sandbox.observers.SimulationObserver] observers: Observers to notify on top
+            of the ones attached to the simulation for this run only
+        :rtype: sandbox.simulate_world.World
+        """
+        simulation = self.simulation
+        end_time = simulation.end_time if ticks is None else self.world.time + ticks
+        run_observers = simulation.observers + list(observers)
+        started = []
+        try:
+            for observer in run_observers:
+                observer.on_start(simulation)
+                started.append(observer)
+            instrumentation = self.world.instrumentation
+            observer_phases = ['observer.' + observer.__class__.__name__
+                               for observer in run_observers]
+            while self.world.time < end_time:
+                self.execute_tick()
+                self.world.time += 1
+                for observer, phase in zip(run_observers, observer_phases):
+                    with instrumentation.phase(phase):
+                        observer.on_tick(simulation)
+                instrumentation.end_tick(self.world.time)
+        finally:
+            for observer in started:
+                observer.on_end(simulation)
+        return self.world
+
+    def execute_tick(self):
+        """Run one tick of the simulation over the workers."""
+        world = self.world
+        instrumentation = world.instrumentation
+        with instrumentation.phase('domains.compute'):
+            results = self._broadcast('compute', [(world.time, borders)
+                                                  for borders in self._borders])
+        inboxes = [[] for _ in self.connections]
+        counts = []
+        for parts, stripe_counts in results:
+            for owner, owner_parts in parts.items():
+                inboxes[owner].extend(owner_parts)
+            counts.extend(stripe_counts)
+        for _, stats, counters in sorted(counts, key=lambda count: count[0]):
+            synchronous_tick.apply_counts(world, stats, counters)
+
+        with instrumentation.phase('spawn_plants'):
+            self.simulation.spawn_plants()
+            spawned_plants = [[] for _ in self.connections]
+            spawned_bacteria = [[] for _ in self.connections]
+            for spawned, store in ((spawned_plants, world.global_plants),
+                                   (spawned_bacteria, world.global_bacteria)):
+                for entity in store.get_births():
+                    spawned[numpy.searchsorted(self.bounds, entity.x_position, side='right') - 1
+                            ].append(entity)
+                    if store is world.global_plants:
+                        world.get_beings(entity.x_position, entity.y_position)[
+                            entity.KIND].remove(entity)
+                    world.occupancy.remove(entity.KIND, entity.x_position, entity.y_position)
+                store.clear()
+
+        with instrumentation.phase('domains.apply'):
+            borders = self._broadcast('apply', list(zip(inboxes, spawned_plants,
+                                                        spawned_bacteria)))
+        if borders[0] is not None:
+            workers = len(self.connections)
+            self._borders = [[borders[neighbour] for neighbour in
+                              {(index - 1) % workers, (index + 1) % workers} - {index}]
+                             for index in range(workers)]
+
+    def close(self):
+        """Gather the plants, bacteria and layers back into the world and stop the workers."""
+        if not self.connections:
+            return
+        world = self.world
+        for index, (plants, bacteria, layer_rows) in enumerate(
+                self._broadcast('gather', [()] * len(self.connections))):
+            for plant in plants:
+                world.global_plants.append(plant)
+                world.get_beings(plant.x_position, plant.y_position)[plant.KIND].append(plant)
+            world.global_bacteria.extend(bacteria)
+            if layer_rows is not None:
+                for layer, values in layer_rows.items():
+                    getattr(world, layer)[self.bounds[index]:self.bounds[index + 1]] = values
+        world.global_plants.compact()
+        world.global_bacteria.compact()
+        world.occupancy.rebuild(world)
+        world.chunks.mark_changed_chunks(numpy.ones(world.chunks.shape, dtype=bool))
+
+        for connection in self.connections:
+            connection.send(('close', ()))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        for layer in simulate_world.LAYERS:
+            setattr(world, layer, numpy.array(getattr(world, layer)))
+        for block in self._shared_memory:
+            block.close()
+            block.unlink()
+        self._shared_memory = []
+
+
+def main():
+    """Run a worker connected to the coordinator of a ``DomainSimulation``."""
+    parser = argparse.ArgumentParser(description='Run a worker of a world split into domains.')
+    parser.add_argument('--connect', required=True, help='The host:port of the coordinator')
+    parser.add_argument('--authkey', required=True, help='The key shared with the coordinator')
+    args = parser.parse_args()
+    host, port = args.connect.rsplit(':', 1)
+    connect((host, int(port)), args.authkey.encode())
+
+
+if __name__ == '__main__':
+    main()
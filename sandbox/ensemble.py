@@ -0,0 +1,201 @@
+"""Run ensembles of headless simulations over many seeds and parameters in parallel.
+
+Run the default scenario over a few seeds and world sizes with::
+
+    python -m sandbox.ensemble --seeds 8 --param max_x_size=20,40 --ticks 300
+
+or over traits and spawn windows of the species, see ``sandbox.scenarios.default_scenario``::
+
+    python -m sandbox.ensemble --param NitrogenBacteria.death_concentration=80,120 \
+        --param GrassPlant.spawn_count=5,10
+"""
+import argparse
+import concurrent.futures
+import itertools
+import os
+
+import numpy
+
+from sandbox import scenarios
+from sandbox import world_stats
+
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+
+def iter_parameter_grid(parameter_grid):
+    """Iterate over every combination of a grid of parameters.
+
+    :param dict parameter_grid: The possible values of each parameter, keyed by its name
+    :rtype: collections.abc.Iterator[dict]
+    """
+    names = sorted(parameter_grid)
+    for values in itertools.product(*(parameter_grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def run_single(scenario_factory, params, seed, ticks=None):
+    """Run one headless simulation and summarize it.
+
+    Runs in the worker processes, so the factory has to be picklable, e.g. a module level
+    function. It has to seed the world of the simulation with the given seed.
+
+    :param callable scenario_factory: Called with the params and the seed, returns a
+        ``sandbox.simulate_world.SimulateWorld``
+    :param dict params: The parameters of this run
+    :param int seed: The seed of this run
+    :param int|None ticks: Number of ticks to run, by default until the ``end_time``
+    :return: The params, the seed, the recorded ticks and the series of every statistic
+    :rtype: dict
+    """
+    simulation = scenario_factory(params, seed)
+    history = world_stats.StatsHistory()
+    simulation.run(ticks=ticks, observers=[history])
+    return {'params': params, 'seed': seed, 'ticks': history.ticks, 'series': history.series}
+
+
+def run_ensemble(scenario_factory, parameter_grid, seeds, ticks=None, max_workers=None,
+                 max_in_flight=None):
+    """Run a scenario for every combination of parameters and seeds over a process pool.
+
+    At most ``max_in_flight`` runs are submitted at once, so the memory used by pending results
+    stays bounded however large the ensemble is. Summaries are yielded as runs complete.
+
+    :param callable scenario_factory: Called with the params and the seed of each run, returns
+        a ``sandbox.simulate_world.SimulateWorld``
+    :param dict parameter_grid: The possible values of each parameter, keyed by its name
+    :param list[int] seeds: The seeds to run every combination of parameters with
+    :param int|None ticks: Number of ticks to run, by default until the ``end_time``
+    :param int|None max_workers: Number of worker processes, all the cores by default
+    :param int|None max_in_flight: Max number of runs submitted at once, twice the number of
+        workers by default
+    :rtype: collections.abc.Iterator[dict]
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * max_workers
+    runs = ((params, seed) for params in iter_parameter_grid(parameter_grid) for seed in seeds)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        for params, seed in runs:
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            in_flight.add(executor.submit(run_single, scenario_factory, params, seed, ticks))
+        for future in concurrent.futures.as_completed(in_flight):
+            yield future.result()
+
+
+class EnsembleAggregator:
+    """Merge run summaries into per-tick means and quantiles for each set of parameters.
+
+    :param tuple quantiles: The quantiles to compute
+    """
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self.quantiles = quantiles
+        self._runs = {}
+
+    def add(self, summary):
+        """Merge the summary of one run.
+
+        Predicates in the params, e.g. a ``stop_when`` object, come back as a copy per run, so
+        runs are grouped by their name instead, see ``sandbox.scenarios.STOP_CONDITIONS``.
+
+        :param dict summary: The summary returned by ``run_single``
+        """
+        key = tuple(sorted((name, getattr(value, '__qualname__', type(value).__qualname__))
+                           if callable(value) else (name, value)
+                           for name, value in summary['params'].items()))
+        self._runs.setdefault(key, []).append(summary)
+
+    def get_results(self):
+        """Aggregate the merged runs.
+
+        Runs of the same parameters are lined up on the ticks recorded by any of them and cut
+        to the one ending first. A run fast forwarded over a tick recorded by another keeps its
+        statistics of the tick before, which stay the same until the end of the jump.
+
+        :return: One entry per set of parameters with its params, seeds, ticks and for every
+            statistic its per-tick ``mean`` and quantiles keyed by the quantile
+        :rtype: list[dict]
+        """
+        results = []
+        for key, summaries in sorted(self._runs.items(), key=lambda item: repr(item[0])):
+            ticks = numpy.unique(numpy.concatenate(
+                [numpy.array(summary['ticks'], dtype=numpy.int64) for summary in summaries]))
+            if all(summary['ticks'] for summary in summaries):
+                ticks = ticks[ticks <= min(summary['ticks'][-1] for summary in summaries)]
+            else:
+                ticks = ticks[:0]
+            # The index of the last tick recorded by every run at each of the ticks
+            recorded = [numpy.maximum(numpy.searchsorted(summary['ticks'], ticks,
+                                                         side='right') - 1, 0)
+                        for summary in summaries]
+            names = sorted(set().union(*(summary['series'] for summary in summaries)))
+            statistics = {}
+            for name in names:
+                values = numpy.array(
+                    [numpy.array(summary['series'][name], dtype=numpy.float64)[indexes]
+                     if name in summary['series'] else numpy.zeros(len(ticks))
+                     for summary, indexes in zip(summaries, recorded)], dtype=numpy.float64)
+                statistics[name] = {'mean': values.mean(axis=0)}
+                for quantile, quantile_values in zip(
+                        self.quantiles, numpy.quantile(values, self.quantiles, axis=0)):
+                    statistics[name][quantile] = quantile_values
+            results.append({'params': dict(key),
+                            'seeds': [summary['seed'] for summary in summaries],
+                            'ticks': ticks.tolist(),
+                            'statistics': statistics})
+        return results
+
+
+def _parse_param(text):
+    """Parse a ``name=value,value`` command line parameter.
+
+    :param str text: The command line parameter
+    :rtype: tuple
+    """
+    name, values = text.split('=', 1)
+    parsed = []
+    for value in values.split(','):
+        for value_type in (int, float):
+            try:
+                parsed.append(value_type(value))
+                break
+            except ValueError:
+                pass
+        else:
+            parsed.append(value)
+    return name, parsed
+
+
+def main():
+    """Run the default scenario as an ensemble and print the final means and quantiles."""
+    parser = argparse.ArgumentParser(description='Run ensembles of headless simulations.')
+    parser.add_argument('--seeds', type=int, default=4, help='Number of seeds per parameters')
+    parser.add_argument('--param', action='append', default=[], type=_parse_param,
+                        help='A parameter of the default scenario as name=value,value')
+    parser.add_argument('--ticks', type=int, default=None, help='Number of ticks per run')
+    parser.add_argument('--workers', type=int, default=None, help='Number of processes')
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help='Max number of runs submitted at once')
+    args = parser.parse_args()
+
+    aggregator = EnsembleAggregator()
+    for summary in run_ensemble(scenarios.default_scenario, dict(args.param),
+                                range(args.seeds), ticks=args.ticks, max_workers=args.workers,
+                                max_in_flight=args.max_in_flight):
+        print('done params:{} seed:{}'.format(summary['params'], summary['seed']))
+        aggregator.add(summary)
+    for result in aggregator.get_results():
+        print('*' * 100)
+        print(result['params'])
+        for name, statistic in sorted(result['statistics'].items()):
+            print('{}: {}'.format(name, ' '.join(
+                '{}={:.2f}'.format(quantile, values[-1])
+                for quantile, values in statistic.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Container for the living entities of a world with O(1) removal."""
+import itertools
+
+from sandbox import instrumentation as sandbox_instrumentation
+
+
+class EntityStore:
+    """Ordered collection of entities with O(1) removal and deferred births.
+
+    Removing an entity leaves a tombstone in its slot and appending one gives it the next slot
+    as a birth, so neither moves the slots a tick is iterating over. ``compact`` drops the
+    tombstones once at the end of the tick, keeping the order entities were added in. Every
+    entity remembers its slot in ``store_slot``, births included.
+
+    :param list|None entities: The initial entities
+    :param sandbox.instrumentation.Instrumentation|None instrumentation: Counts the operations
+    :param sandbox.spatial.SpatialIndex|None index: Index told of every entity added and removed
+    """
+    def __init__(self, entities=None, instrumentation=None, index=None):
+        self.instrumentation = instrumentation or sandbox_instrumentation.NULL_INSTRUMENTATION
+        self.index = index
+        self._slots = []
+        self._first_birth = 0
+        self._tombstones = 0
+        if entities:
+            self.extend(entities)
+            self.compact()
+
+    def __len__(self):
+        return len(self._slots) - self._tombstones
+
+    def __bool__(self):
+        return bool(len(self))
+
+    def __iter__(self):
+        """Iterate over the living entities.
+
+        Entities appended while iterating are not visited, entities removed while iterating are
+        skipped if they were not visited yet. Do not compact while iterating.
+        """
+        for entity in itertools.islice(self._slots, len(self._slots)):
+            if entity is not None:
+                yield entity
+
+    def __contains__(self, entity):
+        slot = getattr(entity, 'store_slot', None)
+        return slot is not None and slot < len(self._slots) and self._slots[slot] is entity
+
+    def append(self, entity):
+        """Add an entity as a birth, in the next slot.
+
+        :param Any entity: The entity
+        """
+        entity.store_slot = len(self._slots)
+        self._slots.append(entity)
+        if self.index is not None:
+            self.index.add(entity)
+        self.instrumentation.count('store.append')
+
+    def extend(self, entities):
+        """Add entities as births.
+
+        :param list entities: The entities
+        """
+        for entity in entities:
+            self.append(entity)
+
+    def get_births(self):
+        """Get the entities added since the last compaction.
+
+        :rtype: list
+        """
+        return [entity for entity in self._slots[self._first_birth:] if entity is not None]
+
+    def is_birth(self, entity):
+        """Check if an entity was added since the last compaction.
+
+        :param Any entity: The entity, in the store
+        :rtype: bool
+        """
+        return entity.store_slot >= self._first_birth
+
+    def remove(self, entity):
+        """Remove an entity, leaving a tombstone in its slot until the next compaction.
+
+        :param Any entity: The entity
+        :raises ValueError: If the entity is not in the store
+        """
+        if entity not in self:
+            raise ValueError('{} is not in the store'.format(entity))
+        self._slots[entity.store_slot] = None
+        self._tombstones += 1
+        entity.store_slot = None
+        if self.index is not None:
+            self.index.remove(entity)
+        self.instrumentation.count('store.remove')
+
+    def clear(self):
+        """Remove every entity."""
+        for entity in self:
+            entity.store_slot = None
+            if self.index is not None:
+                self.index.remove(entity)
+        self._slots = []
+        self._first_birth = 0
+        self._tombstones = 0
+
+    def compact(self):
+        """Drop the tombstones and settle the births, in linear time."""
+        if not self._tombstones and self._first_birth == len(self._slots):
+            return
+        self.instrumentation.count('store.compact')
+        if self._tombstones:
+            first_changed = self._slots.index(None)
+            self._slots[first_changed:] = [entity for entity in self._slots[first_changed:]
+                                           if entity is not None]
+            self._tombstones = 0
+            for slot in range(first_changed, len(self._slots)):
+                self._slots[slot].store_slot = slot
+        self._first_birth = len(self._slots)
@@ -0,0 +1,149 @@
+"""Low overhead timers and counters around the phases of the simulation loop.
+
+Every world has an ``instrumentation``, by default ``NULL_INSTRUMENTATION`` whose methods do
+nothing, so the hooks in the hot paths cost a single no-op call when profiling is off. Turn it
+on with ``world.set_instrumentation(Instrumentation())``, and send the record of every tick to
+the log or to the statistics of the world with e.g.
+``Instrumentation(sinks=[log_sink, world.stats.record_profile])``.
+
+The counters are:
+
+* ``births``: new bacteria and plants
+* ``deaths.lifetime``, ``deaths.concentration``, ``deaths.crowding``: deaths by cause
+* ``store.append``, ``store.remove``, ``store.compact``: operations on the entity stores
+"""
+import collections
+import json
+import logging
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _PhaseTimer:
+    """Context manager adding the time spent in it to a phase.
+
+    :param Instrumentation instrumentation: The instrumentation
+    :param str name: The name of the phase
+    """
+    __slots__ = ('instrumentation', 'name', 'start')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        phase_seconds = self.instrumentation.phase_seconds
+        phase_seconds[self.name] = (phase_seconds.get(self.name, 0.0) +
+                                    time.perf_counter() - self.start)
+
+
+class _NullPhaseTimer:
+    """Context manager doing nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class Instrumentation:
+    """Time the phases of each tick and count the events happening in it.
+
+    At the end of each tick the timings and counters become a record, passed to every sink and
+    kept in ``records``, then they are reset for the next tick.
+
+    :param list[callable]|None sinks: Called with the record of every tick
+    :param int keep_records: The number of most recent records kept in ``records``
+    """
+    enabled = True
+
+    def __init__(self, sinks=None, keep_records=1000):
+        self.sinks = list(sinks or [])
+        self.records = collections.deque(maxlen=keep_records)
+        self.phase_seconds = {}
+        self.counters = collections.Counter()
+        self.totals = collections.Counter()
+        self._timers = {}
+
+    def phase(self, name):
+        """Time a phase of the tick, used as a context manager.
+
+        :param str name: The name of the phase
+        :rtype: _PhaseTimer
+        """
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _PhaseTimer(self, name)
+        return timer
+
+    def count(self, name, amount=1):
+        """Count an event.
+
+        :param str name: The name of the counter
+        :param int amount: The number of events
+        """
+        self.counters[name] += amount
+
+    def end_tick(self, tick):
+        """Turn the timings and counters of the tick into a record.
+
+        :param int tick: The time of the world
+        :rtype: dict
+        """
+        record = {'time': tick,
+                  'seconds': sum(self.phase_seconds.values()),
+                  'phases': self.phase_seconds,
+                  'counters': dict(self.counters)}
+        self.totals.update(self.counters)
+        self.phase_seconds = {}
+        self.counters = collections.Counter()
+        self.records.append(record)
+        for sink in self.sinks:
+            sink(record)
+        return record
+
+
+class NullInstrumentation:
+    """Instrumentation doing nothing, the default of every world."""
+    enabled = False
+    _NULL_TIMER = _NullPhaseTimer()
+
+    def phase(self, name):  # pylint: disable=unused-argument
+        """Do not time a phase.
+
+        :param str name: The name of the phase
+        :rtype: _NullPhaseTimer
+        """
+        return self._NULL_TIMER
+
+    def count(self, name, amount=1):
+        """Do not count an event.
+
+        :param str name: The name of the counter
+        :param int amount: The number of events
+        """
+
+    def end_tick(self, tick):
+        """Do not make a record.
+
+        :param int tick: The time of the world
+        """
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+def log_sink(record, logger=LOGGER):
+    """Sink logging every record as JSON at the debug level.
+
+    :param dict record: The record of a tick
+    :param logging.Logger logger: The logger
+    """
+    logger.debug(json.dumps(record))
@@ -0,0 +1,26 @@
+"""Base class of the objects observing a running simulation."""
+
+
+class SimulationObserver:
+    """Observer notified by ``sandbox.simulate_world.SimulateWorld`` while it runs.
+
+    Override any of the methods, the default ones do nothing.
+    """
+
+    def on_start(self, simulation):
+        """Called once before the first tick.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+
+    def on_tick(self, simulation):
+        """Called after every tick, once ``world.time`` was advanced.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+
+    def on_end(self, simulation):
+        """Called once after the last tick, or once the run failed if ``on_start`` was called.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
@@ -0,0 +1,138 @@
+"""Per-cell counts of the living things of a world, one array per kind."""
+import numpy
+
+from sandbox import chunks as sandbox_chunks
+
+COUNT_DTYPE = numpy.int32
+
+
+class OccupancyIndex:
+    """Number of living things of each kind in every piece of land.
+
+    Every kind, e.g. ``grass`` or ``nitrogen_bacteria``, has an integer array of shape
+    (max_x_size, max_y_size) allocated on its first use, updated in O(1) by the code causing
+    each birth, death and move so reading a count never scans the beings of a piece of land.
+    The counts are also kept per chunk of the world to find the chunks where things live, and
+    every death is recorded as a change of its chunk.
+
+    :param int max_x_size: The x size of the world
+    :param int max_y_size: The y size of the world
+    :param sandbox.chunks.ChunkIndex|None chunks: The chunks of the world
+    """
+    def __init__(self, max_x_size, max_y_size, chunks=None):
+        self.shape = (max_x_size, max_y_size)
+        self.chunks = chunks or sandbox_chunks.ChunkIndex(max_x_size, max_y_size)
+        self.counts = {}
+        self.chunk_counts = {}
+
+    def get_counts(self, kind):
+        """Get the counts of one kind in every piece of land, not to be modified.
+
+        :param str kind: The kind of being
+        :return: Array of shape (max_x_size, max_y_size) of the counts
+        :rtype: numpy.ndarray
+        """
+        counts = self.counts.get(kind)
+        if counts is None:
+            counts = self.counts[kind] = numpy.zeros(self.shape, dtype=COUNT_DTYPE)
+            self.chunk_counts[kind] = numpy.zeros(self.chunks.shape, dtype=numpy.int64)
+        return counts
+
+    def get(self, kind, x_position, y_position):
+        """Count the things of one kind in a piece of land.
+
+        :param str kind: The kind of being
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :rtype: int
+        """
+        return int(self.get_counts(kind)[x_position, y_position])
+
+    def add(self, kind, x_position, y_position, count=1):
+        """Count things of one kind arriving in a piece of land.
+
+        :param str kind: The kind of being
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :param int count: The number of things
+        """
+        self.get_counts(kind)[x_position, y_position] += count
+        chunk_size = self.chunks.chunk_size
+        self.chunk_counts[kind][x_position // chunk_size, y_position // chunk_size] += count
+
+    def remove(self, kind, x_position, y_position, count=1):
+        """Count things of one kind leaving a piece of land.
+
+        :param str kind: The kind of being
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :param int count: The number of things
+        """
+        self.add(kind, x_position, y_position, -count)
+        self.chunks.mark_changed(x_position, y_position)
+
+    def add_many(self, kind, x_positions, y_positions, count=1):
+        """Count things of one kind arriving in many pieces of land, repeats included.
+
+        :param str kind: The kind of being
+        :param numpy.ndarray x_positions: The x positions of the things
+        :param numpy.ndarray y_positions: The y positions of the things
+        :param int count: Added for each thing, -1 if they leave
+        """
+        if not len(x_positions):
+            return
+        numpy.add.at(self.get_counts(kind), (x_positions, y_positions), count)
+        chunk_size = self.chunks.chunk_size
+        numpy.add.at(self.chunk_counts[kind],
+                     (x_positions // chunk_size, y_positions // chunk_size), count)
+        if count < 0:
+            self.chunks.mark_changed_many(x_positions, y_positions)
+
+    def set_chunk(self, kind, chunk_x, chunk_y, counts):
+        """Replace the counts of one kind in a whole chunk.
+
+        :param str kind: The kind of being
+        :param int chunk_x: The x position of the chunk
+        :param int chunk_y: The y position of the chunk
+        :param numpy.ndarray counts: The counts of every piece of land of the chunk
+        """
+        region = self.get_counts(kind)[self.chunks.get_slices(chunk_x, chunk_y)]
+        region[...] = counts
+        self.chunk_counts[kind][chunk_x, chunk_y] = region.sum()
+
+    def get_active_chunks(self, kinds=None):
+        """Get the mask of the chunks where things live.
+
+        :param list[str]|None kinds: Only look for these kinds, all of them by default
+        :rtype: numpy.ndarray
+        """
+        active = numpy.zeros(self.chunks.shape, dtype=bool)
+        for kind in self.chunk_counts if kinds is None else kinds:
+            if kind in self.chunk_counts:
+                active |= self.chunk_counts[kind] > 0
+        return active
+
+    def total(self, kind):
+        """Count all the things of one kind in the world.
+
+        :param str kind: The kind of being
+        :rtype: int
+        """
+        self.get_counts(kind)
+        return int(self.chunk_counts[kind].sum())
+
+    def rebuild(self, world):
+        """Recount every kind from the living things of a world.
+
+        :param sandbox.simulate_world.World world: The world object
+        """
+        self.counts = {}
+        self.chunk_counts = {}
+        for entities in (world.global_plants, world.global_bacteria):
+            for entity in entities:
+                self.add(entity.KIND, entity.x_position, entity.y_position)
+        if world.bacteria_engine is not None:
+            for kind, counts in world.bacteria_engine.count_by_cell(self.shape).items():
+                self.get_counts(kind)[...] += counts.astype(COUNT_DTYPE)
+                self.chunk_counts[kind] = self.chunks.sum_chunks(
+                    self.counts[kind].astype(numpy.int64))
@@ -0,0 +1,185 @@
+"""Render a running simulation in a pygame window.
+
+This is the only module importing pygame, import it only when a window is wanted.
+"""
+import time
+
+import numpy
+import pygame
+
+from sandbox import display_world
+from sandbox import observers
+from sandbox import world_random
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+WIDTH = 20
+HEIGHT = 20
+FULL_REDRAW_FRACTION = 0.25
+
+
+class PygameRenderer(observers.SimulationObserver):
+    """Draw the land of the world in a pygame window.
+
+    The renderer never waits for the display, the simulation keeps ticking at full speed and a
+    frame is only drawn from the current state once it is due, skipping the ticks in between.
+    By default a frame is due at most ``fps`` times per second of wall time, with
+    ``every_n_ticks`` it is due every that many ticks instead.
+
+    A frame colors the world and blits it scaled into the window with ``pygame.surfarray``.
+    After the first frame only the chunks of the world where things live or which changed
+    since the last frame are colored again. In ``incremental`` mode only the pieces of land
+    whose color changed since the last frame are redrawn, unless so many changed that a full
+    blit is cheaper.
+
+    :param float fps: The max number of frames drawn per second
+    :param int|None every_n_ticks: Draw a frame every that many ticks instead of by wall time
+    :param bool incremental: Redraw only the pieces of land whose color changed
+    :param int cell_width: The width in pixels of a piece of land
+    :param int cell_height: The height in pixels of a piece of land
+    """
+
+    def __init__(self, fps=60, every_n_ticks=None, incremental=False, cell_width=WIDTH,
+                 cell_height=HEIGHT):
+        self.fps = fps
+        self.every_n_ticks = every_n_ticks
+        self.incremental = incremental
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.screen = None
+        self._grid_surface = None
+        self._last_colors = None
+        self._seen_changes = None
+        self.frames = 0
+        self._next_frame_time = 0.0
+        self._last_frame_tick = None
+
+    def on_start(self, simulation):
+        """Open the window.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        self.open_window(simulation.world.max_x_size, simulation.world.max_y_size)
+        self._next_frame_time = time.monotonic()
+        self._last_frame_tick = simulation.world.time
+
+    def open_window(self, max_x_size, max_y_size, caption='Sandbox'):
+        """Open a window fitting a world.
+
+        :param int max_x_size: The x size of the world
+        :param int max_y_size: The y size of the world
+        :param str caption: The caption of the window
+        """
+        pygame.init()  # pylint: disable=no-member
+        window_size = [max_x_size * self.cell_width, max_y_size * self.cell_height]
+        self.screen = pygame.display.set_mode(window_size)
+        self.screen.fill(WHITE)
+        self._grid_surface = pygame.Surface((max_x_size, max_y_size))
+        self._last_colors = None
+        self._seen_changes = None
+        pygame.display.set_caption(caption)
+
+    def on_tick(self, simulation):
+        """Update the screen of the game if a frame is due.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        if self.every_n_ticks:
+            if simulation.world.time - self._last_frame_tick < self.every_n_ticks:
+                return
+        else:
+            now = time.monotonic()
+            if now < self._next_frame_time:
+                return
+            self._next_frame_time = now + 1.0 / self.fps
+        self._last_frame_tick = simulation.world.time
+        self.update_screen(simulation)
+
+    def update_screen(self, simulation):
+        """Draw the current state of the world.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        pygame.event.pump()
+        world = simulation.world
+        changed, self._seen_changes = world.chunks.get_changed(self._seen_changes)
+        if self._last_colors is None:
+            colors = display_world.get_world_colors(world)
+        else:
+            colors = self._last_colors.copy()
+            display_world.update_world_colors(world, colors,
+                                              changed | world.get_active_chunks())
+        self.draw_colors(colors)
+
+    def draw_colors(self, colors):
+        """Draw the colors of the land into the window.
+
+        :param numpy.ndarray colors: Array of shape (x, y, 3) of the RGB colors
+        """
+        if not (self.incremental and self._last_colors is not None and
+                self._draw_changed(colors)):
+            pygame.surfarray.blit_array(self._grid_surface, colors)
+            pygame.transform.scale(self._grid_surface, self.screen.get_size(), self.screen)
+            pygame.display.flip()
+        self._last_colors = colors
+        self.frames += 1
+
+    def _draw_changed(self, colors):
+        """Redraw only the pieces of land whose color changed since the last frame.
+
+        :param numpy.ndarray colors: The colors of the land
+        :return: False if too many changed and the whole world should be blitted instead
+        :rtype: bool
+        """
+        x_positions, y_positions = numpy.nonzero(numpy.any(colors != self._last_colors, axis=-1))
+        if len(x_positions) > FULL_REDRAW_FRACTION * colors.shape[0] * colors.shape[1]:
+            return False
+        dirty_rects = []
+        for x_position, y_position in zip(x_positions.tolist(), y_positions.tolist()):
+            rect = pygame.Rect(self.cell_width * x_position, self.cell_height * y_position,
+                               self.cell_width, self.cell_height)
+            self.screen.fill(colors[x_position, y_position].tolist(), rect)
+            dirty_rects.append(rect)
+        pygame.display.update(dirty_rects)
+        return True
+
+    def on_end(self, simulation):
+        """Draw the final state of the world and close the window.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        if self._last_frame_tick != simulation.world.time:
+            self.update_screen(simulation)
+        pygame.quit()  # pylint: disable=no-member
+
+
+def replay_trajectory(reader, fps=30, start=0, incremental=True, cell_width=WIDTH,
+                      cell_height=HEIGHT):
+    """Replay a recorded trajectory in a pygame window, until it ends or the window is closed.
+
+    Frames are streamed from the file and colored like a live world.
+
+    :param sandbox.trajectory.TrajectoryReader reader: The recorded trajectory
+    :param float fps: The number of frames shown per second
+    :param int start: The index of the first frame
+    :param bool incremental: Redraw only the pieces of land whose color changed
+    :param int cell_width: The width in pixels of a piece of land
+    :param int cell_height: The height in pixels of a piece of land
+    """
+    renderer = PygameRenderer(fps=fps, incremental=incremental, cell_width=cell_width,
+                              cell_height=cell_height)
+    renderer.open_window(reader.max_x_size, reader.max_y_size, caption='Sandbox replay')
+    rng = world_random.WorldRandom(seed=0).rendering
+    clock = pygame.time.Clock()
+    for tick, frame in reader.iter_frames(start):
+        events = pygame.event.get()
+        if any(event.type == pygame.QUIT for event in events):  # pylint: disable=no-member
+            break
+        renderer.draw_colors(display_world.get_land_colors(
+            frame['phosphorus'], frame['potassium'], frame['nitrogen'], frame['grass'],
+            frame['tree'], rng))
+        pygame.display.set_caption('Sandbox replay {}'.format(tick))
+        clock.tick(fps)
+    pygame.quit()  # pylint: disable=no-member
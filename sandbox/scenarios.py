@@ -0,0 +1,174 @@
+"""Ready made simulations, usable as scenario factories of ``sandbox.ensemble``."""
+from sandbox import bacteria_engine
+from sandbox import cohort_engine
+from sandbox import scheduler
+from sandbox import seeding
+from sandbox import simulate_bacteria
+from sandbox import simulate_world
+from sandbox import species
+from sandbox import steady_state
+
+DEFAULT_INITIAL_BACTERIA = ((simulate_bacteria.PotassiumBacteria, 4, 4),
+                            (simulate_bacteria.PhosphorusBacteria, 9, 9),
+                            (simulate_bacteria.NitrogenBacteria, 14, 15),
+                            (simulate_bacteria.NitrogenBacteria, 2, 2),
+                            (simulate_bacteria.NitrogenBacteria, 8, 7))
+# The params of a spawn window of a species, named <species>.<param>, and its SpawnWindow field
+SPAWN_PARAMS = {'spawn_start': 'start', 'spawn_end': 'end', 'spawn_count': 'count'}
+
+
+def _stop_when_stable(params):
+    """Build a predicate holding once nothing lives anymore or the totals settled.
+
+    :param dict params: The params of a run, ``stable_window`` and ``stable_names`` are the
+        ``window`` and ``names`` of the ``sandbox.steady_state.StableTotals``
+    :rtype: callable
+    """
+    stable_totals = steady_state.StableTotals(window=params.get('stable_window', 100),
+                                              names=params.get('stable_names'))
+    return lambda simulation: (steady_state.is_extinct(simulation) or
+                               stable_totals(simulation))
+
+
+# The predicates ending a run early, built from the params of every run by their name
+STOP_CONDITIONS = {'extinct': lambda params: steady_state.is_extinct,
+                   'stable': _stop_when_stable}
+
+
+def _split_species_params(params):
+    """Split the params naming a species, like ``GrassPlant.max_lifetime``, by species.
+
+    :param dict params: The params of a run
+    :return: The params of every species named, keyed by its name
+    :rtype: dict
+    :raises ValueError: If a species is not registered or a param is not one of its traits
+        or ``SPAWN_PARAMS``
+    """
+    registered = {registered.__name__: registered for registered in species.get_species()}
+    species_params = {}
+    for name, value in params.items():
+        if '.' not in name:
+            continue
+        species_name, param = name.split('.', 1)
+        if species_name not in registered:
+            raise ValueError('Unknown species {}'.format(species_name))
+        if param not in SPAWN_PARAMS and (param not in species.TRAITS or not hasattr(
+                registered[species_name], species.TRAITS[param])):
+            raise ValueError('Unknown param {} of {}'.format(param, species_name))
+        species_params.setdefault(species_name, {})[param] = value
+    return species_params
+
+
+def get_run_species(params):
+    """Get the species of a run, with the traits its params give them.
+
+    A param ``<species>.<trait>``, e.g. ``NitrogenBacteria.death_concentration`` or
+    ``GrassPlant.reproduction_rate``, sets a trait of ``sandbox.species.TRAITS``. The species
+    are then derived into classes of the same name and kind for this run only, so the
+    registered ones are left as they are for the next runs of an ensemble worker process.
+
+    :param dict params: The params of a run
+    :return: The classes of the species keyed by their name, in the order they were registered
+    :rtype: dict
+    """
+    registered = {registered.__name__: registered for registered in species.get_species()}
+    traits = {name: {param: value for param, value in species_params.items()
+                     if param in species.TRAITS}
+              for name, species_params in _split_species_params(params).items()}
+    if not any(traits.values()):
+        return registered
+    run_species = {}
+    for name, registered_species in registered.items():
+        constants = {'__slots__': (), '__module__': registered_species.__module__,
+                     '__doc__': registered_species.__doc__}
+        for trait, value in traits.get(name, {}).items():
+            constants[species.TRAITS[trait]] = value
+        run_species[name] = type(name, (registered_species,), constants)
+    # The plants of the run spawn the bacteria of the run
+    for run_type in run_species.values():
+        spawn_types = getattr(run_type, 'DEATH_SPAWN_TYPES', ())
+        if spawn_types:
+            run_type.DEATH_SPAWN_TYPES = tuple(run_species[spawn_type.__name__]
+                                               for spawn_type in spawn_types)
+    return run_species
+
+
+def get_spawn_schedule(params, run_species, end_time):
+    """Get the spawn schedule of a run, with the windows its params give the species.
+
+    The params ``<species>.spawn_start``, ``<species>.spawn_end`` and ``<species>.spawn_count``
+    change the window of a species of ``sandbox.seeding.DEFAULT_SPAWN_SCHEDULE``, or give a
+    window from the start to the end of the run to a species without one.
+
+    :param dict params: The params of a run
+    :param dict run_species: The species of the run keyed by their name, see
+        ``get_run_species``
+    :param int end_time: The end of the run
+    :rtype: sandbox.seeding.SpawnSchedule
+    """
+    species_params = _split_species_params(params)
+    windows = []
+    for window in seeding.DEFAULT_SPAWN_SCHEDULE.windows:
+        name = window.entity_type.__name__
+        fields = {'start': window.start, 'end': window.end, 'count': window.count}
+        for param, value in species_params.pop(name, {}).items():
+            if param in SPAWN_PARAMS:
+                fields[SPAWN_PARAMS[param]] = value
+        windows.append(seeding.SpawnWindow(run_species[name], **fields))
+    for name, window_params in species_params.items():
+        fields = {'start': 0, 'end': end_time, 'count': 0}
+        for param, value in window_params.items():
+            if param in SPAWN_PARAMS:
+                fields[SPAWN_PARAMS[param]] = value
+        if fields['count']:
+            windows.append(seeding.SpawnWindow(run_species[name], **fields))
+    return seeding.SpawnSchedule(windows)
+
+
+def default_scenario(params, seed=None):
+    """Build the default simulation of ``execute_simulation.py``.
+
+    :param dict params: Overrides of ``max_x_size``, ``max_y_size``, ``end_time``,
+        ``vectorized_bacteria``, ``cohort_bacteria``, ``synchronous_workers``,
+        ``scheduled_lifecycles``, ``fast_forward`` and ``stop_when``, the initial bacteria wrap
+        around smaller worlds. ``stop_when`` is a name of ``STOP_CONDITIONS``, so runs of an
+        ensemble stopping the same way share their params, or a predicate. Traits and spawn
+        windows of the species are set by params named after them, see ``get_run_species`` and
+        ``get_spawn_schedule``
+    :param int|None seed: The seed of the world
+    :rtype: sandbox.simulate_world.SimulateWorld
+    :raises ValueError: If ``stop_when`` is an unknown name
+    """
+    stop_when = params.get('stop_when')
+    if isinstance(stop_when, str):
+        if stop_when not in STOP_CONDITIONS:
+            raise ValueError('Unknown stop condition {}'.format(stop_when))
+        stop_when = STOP_CONDITIONS[stop_when](params)
+    max_x_size = params.get('max_x_size', 20)
+    max_y_size = params.get('max_y_size', 20)
+    end_time = params.get('end_time', 1000)
+    world = simulate_world.World(max_x_size=max_x_size, max_y_size=max_y_size, seed=seed)
+    run_species = get_run_species(params)
+    bacteria_types = [run_type for run_type in run_species.values()
+                      if issubclass(run_type, simulate_bacteria.Bacteria)]
+    plant_types = [run_type for run_type in run_species.values()
+                   if not issubclass(run_type, simulate_bacteria.Bacteria)]
+    # Built here so they simulate the species of the run
+    if params.get('vectorized_bacteria', False):
+        world.bacteria_engine = bacteria_engine.BacteriaEngine(bacteria_types)
+    elif params.get('cohort_bacteria', False):
+        world.bacteria_engine = cohort_engine.CohortEngine(max_x_size, max_y_size, bacteria_types)
+    if params.get('scheduled_lifecycles', False):
+        world.lifecycle_scheduler = scheduler.LifecycleScheduler(
+            bacteria=world.bacteria_engine is None, plant_types=plant_types)
+    initial_bacteria = [
+        run_species[bacteria_type.__name__](x_position=x_position % max_x_size,
+                                            y_position=y_position % max_y_size)
+        for bacteria_type, x_position, y_position in DEFAULT_INITIAL_BACTERIA]
+    options = simulate_world.SimulationOptions(
+        synchronous_workers=params.get('synchronous_workers'),
+        scheduled_lifecycles=params.get('scheduled_lifecycles', False),
+        spawn_schedule=get_spawn_schedule(params, run_species, end_time),
+        fast_forward=params.get('fast_forward', False), stop_when=stop_when)
+    return simulate_world.SimulateWorld(world=world, end_time=end_time,
+                                        initial_bacteria=initial_bacteria, options=options)
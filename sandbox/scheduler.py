@@ -0,0 +1,445 @@
+"""Tick the plants and bacteria of a world by scheduled events instead of visiting them all.
+
+Between its birth, its reproductions and its death, a plant or a bacteria only ages, so
+``LifecycleScheduler`` keeps the next of these events of every entity in a ``TimingWheel`` and
+only visits the entities due on each tick. What the entities do on every tick is applied per
+piece of land instead: the plants eat their layers with one array operation per chunk where
+plants live, and the death checks reading the land only run on the pieces of land where
+plants go hungry or crowded, or where the land of the bacteria changed. The cost of a tick
+follows the number of events and such pieces of land, not the number of entities.
+"""
+import numpy
+
+from sandbox import simulate_bacteria
+from sandbox import species
+
+WHEEL_SIZE = 256
+
+
+class TimingWheel:
+    """Items bucketed by the tick they are due on.
+
+    Items due within ``size`` ticks of the last popped tick go in the slot of their tick, later
+    ones wait in an overflow keyed by their tick.
+
+    :param int size: The number of slots
+    :param int current_tick: The last popped tick
+    """
+    def __init__(self, size=WHEEL_SIZE, current_tick=-1):
+        self.size = size
+        self.current_tick = current_tick
+        self._slots = [[] for _ in range(size)]
+        self._overflow = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for slot in self._slots:
+            yield from slot
+        for items in self._overflow.values():
+            yield from items
+
+    def schedule(self, tick, item):
+        """Add an item due on a tick.
+
+        :param int tick: The tick, after the last popped one
+        :param Any item: The item
+        :raises ValueError: If the tick was already popped
+        """
+        if tick <= self.current_tick:
+            raise ValueError('Tick {} was already popped'.format(tick))
+        if tick - self.current_tick <= self.size:
+            self._slots[tick % self.size].append(item)
+        else:
+            self._overflow.setdefault(tick, []).append(item)
+        self._count += 1
+
+    def get_items(self):
+        """Get the items with the ticks they are due on, in the order ``pop`` returns them.
+
+        :return: Pairs of a tick and an item
+        :rtype: list[tuple]
+        """
+        last_slotted_tick = self.current_tick + self.size
+        items = []
+        for due_tick in range(self.current_tick + 1, last_slotted_tick + 1):
+            items.extend((due_tick, item) for item in self._overflow.get(due_tick, ()))
+            items.extend((due_tick, item) for item in self._slots[due_tick % self.size])
+        for due_tick in sorted(self._overflow):
+            if due_tick > last_slotted_tick:
+                items.extend((due_tick, item) for item in self._overflow[due_tick])
+        return items
+
+    def pop(self, tick):
+        """Remove and get the items due up to a tick, in the order of their ticks.
+
+        :param int tick: The tick
+        :rtype: list
+        """
+        items = []
+        for due_tick in range(self.current_tick + 1, tick + 1):
+            slot = due_tick % self.size
+            items.extend(self._overflow.pop(due_tick, ()))
+            items.extend(self._slots[slot])
+            self._slots[slot] = []
+        self.current_tick = max(self.current_tick, tick)
+        self._count -= len(items)
+        return items
+
+
+class LifecycleScheduler:
+    """Tick plants and, without a bacteria engine, bacteria objects by their events.
+
+    An entity born on tick ``base`` is ``tick - base`` ticks old on ``tick``. Its only events
+    are reproducing every ``reproduction_rate`` ticks of its lifetime and dying of age after
+    ``max_lifetime``, so the wheel holds one ``(entity, base)`` item per entity for its next
+    event and ``current_lifetime`` is only brought up to date by events and
+    ``sync_lifetimes``.
+
+    A tick follows the default tick of ``SimulateWorld``, the plants first:
+
+    1. kills the plants too old to live
+    2. makes every plant eat the ``CONSUMPTION`` of its species from its piece of land, per
+       chunk where plants live. Where a layer went below zero, the plants eat again one by
+       one in the order of the store and die once a layer they eat is below zero
+    3. makes the plants due to reproduce reproduce, then kills the oldest plants of the
+       pieces of land holding more than the ``CROWDING`` of their species, counting the
+       children but not killing them
+    4. kills the bacteria too old to live and, in the pieces of land which changed since their
+       last check, the bacteria whose nutrient is above their ``DEATH_CONCENTRATION``, in the
+       order they were born. The bacteria spawned by the plants dying on this tick are ticked
+       too
+    5. makes the bacteria due to reproduce reproduce
+
+    Like in the default tick, entities killed by the land still reproduce on the tick they die.
+    Runs are reproducible for the same seed and track the populations of default runs, but
+    are not the same runs: the entities are not interleaved one by one, so e.g. a plant only
+    counts the children born before it was visited in the default tick. The plants eat by the
+    constants of their species, not by lifetimes given to single plants.
+
+    :param bool bacteria: Schedule the bacteria objects too, False when a bacteria engine
+        simulates them
+    :param tuple|None plant_types: The plant classes eating the land, every registered plant
+        species by default
+    :param int wheel_size: The number of slots of the timing wheel
+    """
+    def __init__(self, bacteria=True, plant_types=None, wheel_size=WHEEL_SIZE):
+        self.bacteria = bacteria
+        self.plant_types = tuple(plant_types or species.get_species('plant'))
+        self.wheel = TimingWheel(wheel_size)
+        self._bacteria_cells = {}
+        self._changed_cells = {}
+        # The bacteria spawned by plants during the tick, already scheduled
+        self._early_births = set()
+        self.started = False
+
+    def _get_stores(self, world):
+        """Get the stores of the scheduled entities.
+
+        :param sandbox.simulate_world.World world: The world object
+        :rtype: tuple
+        """
+        if self.bacteria:
+            return world.global_plants, world.global_bacteria
+        return (world.global_plants,)
+
+    def start(self, world):
+        """Schedule the entities already living in a world.
+
+        :param sandbox.simulate_world.World world: The world object
+        """
+        self.wheel.current_tick = world.time - 1
+        for entities in self._get_stores(world):
+            entities.compact()
+            for entity in entities:
+                self._add(entity, world.time - 1 - entity.current_lifetime, world.time - 1)
+        self.started = True
+
+    def get_state(self):
+        """Get what the scheduler follows between two ticks, e.g. to checkpoint it.
+
+        :return: The last ticked time, the ``(tick, entity, base)`` events of the living
+            entities in the order they are due and the pieces of land left to check
+        :rtype: tuple
+        """
+        events = [(tick, entity, base) for tick, (entity, base) in self.wheel.get_items()
+                  if entity.store_slot is not None]
+        return self.wheel.current_tick, events, list(self._changed_cells)
+
+    def restore(self, world, current_tick, events, changed_cells):
+        """Follow the entities of a world from a state given by ``get_state``, instead of
+        starting.
+
+        :param sandbox.simulate_world.World world: The world object, with its entities
+        :param int current_tick: The last ticked time
+        :param list[tuple] events: The ``(tick, entity, base)`` events, in the order they are due
+        :param list[tuple] changed_cells: The pieces of land left to check
+        """
+        self.wheel = TimingWheel(self.wheel.size, current_tick)
+        for tick, entity, base in events:
+            self.wheel.schedule(tick, (entity, base))
+        self._changed_cells = dict.fromkeys(changed_cells)
+        self._early_births = set()
+        self._bacteria_cells = {}
+        # Followed in the order they were born, like while ticking
+        for bacteria in world.global_bacteria if self.bacteria else ():
+            self._bacteria_cells.setdefault((bacteria.x_position, bacteria.y_position),
+                                            []).append(bacteria)
+        self.started = True
+
+    def schedule_births(self, world):
+        """Schedule the entities born during the tick, before the stores are compacted.
+
+        Does nothing before the first tick, which schedules every entity living by then.
+
+        :param sandbox.simulate_world.World world: The world object
+        """
+        if not self.started:
+            return
+        for entities in self._get_stores(world):
+            for entity in entities.get_births():
+                if entity not in self._early_births:
+                    self._add(entity, world.time, world.time)
+        self._early_births = set()
+
+    def sync_lifetimes(self, world):
+        """Bring the ``current_lifetime`` of every scheduled entity up to date.
+
+        :param sandbox.simulate_world.World world: The world object, between two ticks
+        """
+        for entity, base in self.wheel:
+            entity.current_lifetime = world.time - 1 - base
+
+    def _add(self, entity, base, tick):
+        """Start following an entity.
+
+        :param sandbox.simulate_plants.Plant|sandbox.simulate_bacteria.Bacteria entity: The
+            entity
+        :param int base: The tick the entity was born on
+        :param int tick: The tick the entity was last visited on
+        """
+        position = (entity.x_position, entity.y_position)
+        self._changed_cells[position] = None
+        if isinstance(entity, simulate_bacteria.Bacteria):
+            self._bacteria_cells.setdefault(position, []).append(entity)
+        self._schedule(entity, base, tick)
+
+    def _schedule(self, entity, base, tick):
+        """Schedule the next event of an entity after a tick.
+
+        :param sandbox.simulate_plants.Plant|sandbox.simulate_bacteria.Bacteria entity: The
+            entity
+        :param int base: The tick the entity was born on
+        :param int tick: The tick the entity was last visited on
+        """
+        lifetime = tick - base
+        next_lifetime = (lifetime // entity.reproduction_rate + 1) * entity.reproduction_rate
+        if next_lifetime > entity.max_lifetime:
+            next_lifetime = max(entity.max_lifetime, lifetime) + 1
+        self.wheel.schedule(base + next_lifetime, (entity, base))
+
+    def _kill(self, world, entity):
+        """Kill an entity.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param sandbox.simulate_plants.Plant|sandbox.simulate_bacteria.Bacteria entity: The
+            entity
+        """
+        entity._die(world)  # pylint: disable=protected-access
+        position = (entity.x_position, entity.y_position)
+        self._changed_cells[position] = None
+        bacteria = self._bacteria_cells.get(position)
+        if bacteria and entity in bacteria:
+            bacteria.remove(entity)
+            if not bacteria:
+                del self._bacteria_cells[position]
+
+    def execute_tick(self, world):
+        """Run one tick for every scheduled entity.
+
+        :param sandbox.simulate_world.World world: The world object
+        """
+        if not self.started:
+            self.start(world)
+        tick = world.time
+        due_plants = []
+        due_bacteria = []
+        for entity, base in self.wheel.pop(tick):
+            if entity.store_slot is None:
+                continue
+            entity.current_lifetime = tick - base
+            if isinstance(entity, simulate_bacteria.Bacteria):
+                due_bacteria.append((entity, base))
+            else:
+                due_plants.append((entity, base))
+        # Visited in the order of their store, like the default tick
+        due_plants.sort(key=lambda due: due[0].store_slot)
+        due_bacteria.sort(key=lambda due: due[0].store_slot)
+
+        self._tick_plants(world, due_plants)
+        if self.bacteria:
+            self._tick_bacteria(world, due_bacteria)
+        else:
+            self._changed_cells = {}
+
+    def _tick_plants(self, world, due_plants):
+        """Run one tick for every plant.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param list[tuple] due_plants: The ``(plant, base)`` of the plants due on this tick
+        """
+        reproducing = []
+        for plant, base in due_plants:
+            if plant.current_lifetime > plant.max_lifetime:
+                world.instrumentation.count('deaths.lifetime')
+                self._kill(world, plant)
+            else:
+                reproducing.append((plant, base))
+        active = self._eat(world)
+        self._reproduce(world, reproducing)
+        self._thin_out(world, active)
+
+    def _tick_bacteria(self, world, due_bacteria):
+        """Run one tick for every bacteria, after the plants.
+
+        The bacteria spawned by the plants dying on this tick are ticked on it too, like in the
+        default tick. Only the bacteria of the pieces of land which changed since their last
+        check can die of their nutrient, they are checked in the order they were born.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param list[tuple] due_bacteria: The ``(bacteria, base)`` of the bacteria due on this
+            tick
+        """
+        tick = world.time
+        for bacteria in world.global_bacteria.get_births():
+            self._add(bacteria, tick - 1, tick)
+            self._early_births.add(bacteria)
+        reproducing = []
+        aged = set()
+        for bacteria, base in due_bacteria:
+            if bacteria.current_lifetime > bacteria.max_lifetime:
+                aged.add(bacteria)
+                self._changed_cells[(bacteria.x_position, bacteria.y_position)] = None
+            else:
+                reproducing.append((bacteria, base))
+
+        # The deaths of this tick are checked again on the next one, like the bacteria
+        # visited before them in the default tick
+        changed_cells, self._changed_cells = self._changed_cells, {}
+        for position in changed_cells:
+            for bacteria in list(self._bacteria_cells.get(position, ())):
+                if bacteria in aged:
+                    world.instrumentation.count('deaths.lifetime')
+                elif getattr(world, bacteria.NUTRIENT)[position] > bacteria.DEATH_CONCENTRATION:
+                    world.instrumentation.count('deaths.concentration')
+                else:
+                    continue
+                self._kill(world, bacteria)
+        self._reproduce(world, reproducing)
+
+    def _reproduce(self, world, reproducing):
+        """Make the entities due to reproduce reproduce and schedule their next event.
+
+        Like in the default tick, the entities killed by the land on this tick still reproduce.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param list[tuple] reproducing: The ``(entity, base)`` of the entities, in order
+        """
+        for entity, base in reproducing:
+            entity.reproduce(world)
+            if entity.store_slot is not None:
+                self._schedule(entity, base, world.time)
+
+    def _eat(self, world):
+        """Make every plant eat from its piece of land, killing the plants left hungry.
+
+        The land is eaten with one array operation per chunk where plants live. Where plants
+        go hungry, the plants of the piece of land eat again one by one in the order of their
+        store, dying like in the default tick.
+
+        :param sandbox.simulate_world.World world: The world object
+        :return: The chunks where plants live, None if there are none
+        :rtype: numpy.ndarray|None
+        """
+        kinds = [plant_type.KIND for plant_type in self.plant_types]
+        active = world.occupancy.get_active_chunks(kinds)
+        if not active.any():
+            return None
+        eaten_totals = {}
+        critical = []
+        for x_slice, y_slice in world.chunks.iter_slices(active):
+            counts = [world.occupancy.get_counts(kind)[x_slice, y_slice] for kind in kinds]
+            for plant_type, plant_counts in zip(self.plant_types, counts):
+                for layer, weight in plant_type.CONSUMPTION:
+                    eaten = plant_counts * (plant_type.DEATH_CONCENTRATION * weight /
+                                            plant_type.MAX_LIFETIME)
+                    getattr(world, layer)[x_slice, y_slice] -= eaten
+                    eaten_totals[layer] = eaten_totals.get(layer, 0.0) + eaten.sum()
+            dying = numpy.zeros(counts[0].shape, dtype=bool)
+            for plant_type, plant_counts in zip(self.plant_types, counts):
+                starving = numpy.zeros(plant_counts.shape, dtype=bool)
+                for layer, _ in plant_type.CONSUMPTION:
+                    starving |= getattr(world, layer)[x_slice, y_slice] < 0
+                dying |= starving & (plant_counts > 0)
+            x_positions, y_positions = numpy.nonzero(dying)
+            critical.extend(zip((x_positions + x_slice.start).tolist(),
+                                (y_positions + y_slice.start).tolist()))
+        world.chunks.mark_changed_chunks(active)
+        for layer, eaten in eaten_totals.items():
+            world.stats.add_to_layer(layer, -eaten.item())
+
+        for position in critical:
+            self._eat_one_by_one(world, position)
+        return active
+
+    def _eat_one_by_one(self, world, position):
+        """Eat a piece of land again plant by plant, killing the hungry ones like the default tick.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param tuple position: The piece of land, already eaten by all its plants at once
+        """
+        beings = world.get_beings(*position)
+        plants = sorted((plant for plant_type in self.plant_types
+                         for plant in beings[plant_type.KIND]),
+                        key=lambda plant: plant.store_slot)
+        amounts = [[(getattr(world, layer), plant.DEATH_CONCENTRATION * weight /
+                     plant.MAX_LIFETIME) for layer, weight in plant.CONSUMPTION]
+                   for plant in plants]
+        for plant_amounts in amounts:
+            for layer_array, amount in plant_amounts:
+                layer_array[position] += amount
+        for plant, plant_amounts in zip(plants, amounts):
+            for layer_array, amount in plant_amounts:
+                layer_array[position] -= amount
+            if any(layer_array[position] < 0 for layer_array, _ in plant_amounts):
+                world.instrumentation.count('deaths.concentration')
+                self._kill(world, plant)
+
+    def _thin_out(self, world, active):
+        """Kill the oldest plants of the pieces of land holding more than their ``CROWDING``.
+
+        Counts the children born on this tick, which landed before most of the plants of the
+        default tick were visited, but only kills the plants visited on this tick.
+
+        :param sandbox.simulate_world.World world: The world object
+        :param numpy.ndarray|None active: The chunks where plants lived at the start of the tick
+        """
+        if active is None:
+            return
+        for plant_type in self.plant_types:
+            if plant_type.CROWDING is None:
+                continue
+            for x_slice, y_slice in world.chunks.iter_slices(active):
+                x_positions, y_positions = numpy.nonzero(
+                    world.occupancy.get_counts(plant_type.KIND)[x_slice, y_slice] >
+                    plant_type.CROWDING)
+                for position in zip((x_positions + x_slice.start).tolist(),
+                                    (y_positions + y_slice.start).tolist()):
+                    plants = world.get_beings(*position)[plant_type.KIND]
+                    for plant in [plant for plant in plants
+                                  if not world.global_plants.is_birth(plant)][
+                                      :len(plants) - plant_type.CROWDING]:
+                        world.instrumentation.count('deaths.crowding')
+                        self._kill(world, plant)
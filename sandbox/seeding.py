@@ -0,0 +1,228 @@
+"""Seed a world with many plants and bacteria, and whole nutrient layers, at once.
+
+``seed_entities`` seeds a species from arrays of positions and ``seed_density`` from a raster of
+the number expected in every piece of land, both updating the entity stores, the occupancy and
+the statistics of the world in one pass. Bacteria go straight into the bacteria engine of the
+world when it has one, without ever building objects. ``set_layer`` and ``set_layers`` fill the
+layers of the world from arrays or ``.npy`` and ``.npz`` files.
+
+``SpawnSchedule`` seeds plants at random positions during windows of time, see
+``DEFAULT_SPAWN_SCHEDULE`` for the plants spawned by ``SimulateWorld.spawn_plants``.
+"""
+import os
+
+import numpy
+
+from sandbox import simulate_bacteria
+from sandbox import simulate_plants
+
+
+def _load_array(values):
+    """Load an array from a ``.npy`` file if given its path.
+
+    :param numpy.ndarray|str values: The array or the path of the file
+    :rtype: numpy.ndarray
+    """
+    if isinstance(values, (str, os.PathLike)):
+        return numpy.load(values)
+    return numpy.asarray(values)
+
+
+def _check_shape(world, values, name):
+    """Check an array covers every piece of land of a world.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param numpy.ndarray values: The array
+    :param str name: What the array holds, for the error message
+    :raises ValueError: If the array is not of shape (max_x_size, max_y_size)
+    """
+    if values.shape != (world.max_x_size, world.max_y_size):
+        raise ValueError('The {} are of shape {}, not the shape of the world {}'.format(
+            name, values.shape, (world.max_x_size, world.max_y_size)))
+
+
+def random_positions(world, count):
+    """Draw random positions in a world from ``world.rng.spawning``.
+
+    The positions are the same as drawing the x and then the y of each position one at a time
+    with ``randint``.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param int count: The number of positions
+    :return: The x positions and the y positions
+    :rtype: tuple
+    """
+    spawning = world.rng.spawning
+    if world.max_x_size == world.max_y_size:
+        # Both are drawn from the same stream, interleaved
+        positions = spawning.randints(0, world.max_x_size - 1, 2 * count)
+        return positions[0::2], positions[1::2]
+    return (spawning.randints(0, world.max_x_size - 1, count),
+            spawning.randints(0, world.max_y_size - 1, count))
+
+
+def seed_entities(world, entity_type, x_positions, y_positions):
+    """Seed new plants or bacteria of one species at the given positions.
+
+    The entities are born like the children of a tick, in the order of the positions.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param type entity_type: The plant or bacteria class, e.g.
+        ``sandbox.simulate_plants.GrassPlant``
+    :param numpy.ndarray x_positions: The x positions of the entities, repeats included
+    :param numpy.ndarray y_positions: The y positions of the entities
+    :return: The number of entities seeded
+    :rtype: int
+    """
+    x_positions = numpy.asarray(x_positions, dtype=numpy.int64)
+    y_positions = numpy.asarray(y_positions, dtype=numpy.int64)
+    count = len(x_positions)
+    if not count:
+        return 0
+    is_bacteria = issubclass(entity_type, simulate_bacteria.Bacteria)
+    engine = world.bacteria_engine
+    if is_bacteria and engine is not None:
+        engine.add(numpy.full(count, engine.bacteria_types.index(entity_type)),
+                   x_positions, y_positions)
+    else:
+        entities = [entity_type(x_position, y_position) for x_position, y_position in
+                    zip(x_positions.tolist(), y_positions.tolist())]
+        if is_bacteria:
+            world.global_bacteria.extend(entities)
+        else:
+            world.global_plants.extend(entities)
+            for entity in entities:
+                world.get_beings(entity.x_position, entity.y_position)[entity.KIND].append(entity)
+
+    if is_bacteria:
+        world.stats.bacteria_born(entity_type.__name__, count)
+    else:
+        world.stats.plant_born(entity_type.__name__, count)
+    world.instrumentation.count('births', count)
+    world.occupancy.add_many(entity_type.KIND, x_positions, y_positions)
+    return count
+
+
+def seed_density(world, entity_type, density):
+    """Seed new plants or bacteria of one species from the number expected in each piece of land.
+
+    The whole part of the density of a piece of land is seeded there, its fractional part is the
+    chance of one more, drawn from ``world.rng.dispersal``.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param type entity_type: The plant or bacteria class
+    :param numpy.ndarray|str density: Array of shape (max_x_size, max_y_size), or the path of
+        a ``.npy`` file of it
+    :return: The number of entities seeded
+    :rtype: int
+    :raises ValueError: If the density is not of the shape of the world or negative
+    """
+    density = _load_array(density)
+    _check_shape(world, density, 'densities')
+    if (density < 0).any():
+        raise ValueError('Densities can not be negative')
+    counts = numpy.floor(density).astype(numpy.int64)
+    fractions = density - counts
+    if fractions.any():
+        counts += world.rng.dispersal.binomial(numpy.ones_like(counts), fractions)
+    x_positions, y_positions = numpy.nonzero(counts)
+    repeats = counts[x_positions, y_positions]
+    return seed_entities(world, entity_type, numpy.repeat(x_positions, repeats),
+                         numpy.repeat(y_positions, repeats))
+
+
+def set_layer(world, layer, values):
+    """Replace a layer of a world, in place.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param str layer: The name of the layer, one of ``sandbox.simulate_world.LAYERS``
+    :param numpy.ndarray|str values: Array of shape (max_x_size, max_y_size), or the path of a
+        ``.npy`` file of it
+    :raises ValueError: If the layer does not exist or the values are not of the shape of the
+        world
+    :raises TypeError: If the values can not be stored in the layer without losing precision
+    """
+    if layer not in world.stats.layers:
+        raise ValueError('Unknown layer {}'.format(layer))
+    values = _load_array(values)
+    _check_shape(world, values, '{} values'.format(layer))
+    layer_array = getattr(world, layer)
+    changed = layer_array != values
+    previous_total = layer_array.sum()
+    numpy.copyto(layer_array, values, casting='same_kind')
+    world.stats.add_to_layer(layer, (layer_array.sum() - previous_total).item())
+    world.chunks.mark_changed_chunks(world.chunks.sum_chunks(changed) > 0)
+
+
+def set_layers(world, layers):
+    """Replace many layers of a world, in place.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param dict|str layers: Arrays keyed by the name of their layer, or the path of a ``.npz``
+        file of them
+    """
+    if isinstance(layers, (str, os.PathLike)):
+        with numpy.load(layers) as layer_file:
+            layers = dict(layer_file)
+    for layer, values in layers.items():
+        set_layer(world, layer, values)
+
+
+class SpawnWindow:
+    """Seed a number of entities of one species at random positions on every tick of a window.
+
+    :param type entity_type: The plant or bacteria class
+    :param int start: Seed after this time
+    :param int end: Seed before this time
+    :param int count: The number of entities seeded on every tick
+    """
+    def __init__(self, entity_type, start, end, count):
+        self.entity_type = entity_type
+        self.start = start
+        self.end = end
+        self.count = count
+
+    def __repr__(self):
+        return 'SpawnWindow({}, {}, {}, {})'.format(
+            self.entity_type.__name__, self.start, self.end, self.count)
+
+
+class SpawnSchedule:
+    """Windows of time during which entities are seeded at random positions.
+
+    :param list[SpawnWindow] windows: The windows, seeded in this order when they overlap
+    """
+    def __init__(self, windows=()):
+        self.windows = list(windows)
+
+    def next_spawn_time(self, time):
+        """Get the first time from a time on when some entities are seeded.
+
+        :param int time: The time
+        :return: The time, None if nothing is seeded anymore
+        :rtype: int|None
+        """
+        times = []
+        for window in self.windows:
+            spawn_time = max(time, window.start + 1)
+            if window.count and spawn_time < window.end:
+                times.append(spawn_time)
+        return min(times, default=None)
+
+    def execute_tick(self, world):
+        """Seed the entities of the windows open at the time of the world.
+
+        :param sandbox.simulate_world.World world: The world object
+        :return: The number of entities seeded
+        :rtype: int
+        """
+        seeded = 0
+        for window in self.windows:
+            if window.start < world.time < window.end:
+                x_positions, y_positions = random_positions(world, window.count)
+                seeded += seed_entities(world, window.entity_type, x_positions, y_positions)
+        return seeded
+
+
+DEFAULT_SPAWN_SCHEDULE = SpawnSchedule([SpawnWindow(simulate_plants.GrassPlant, 100, 125, 5),
+                                        SpawnWindow(simulate_plants.TreePlant, 200, 225, 10)])
@@ -1,191 +1,159 @@
 """Definitions of the simulated bacteria in the world."""
-import abc
-
 from sandbox import utils
 
 
 class Bacteria:
-    """Base bacteria object.
+    """Base bacteria object, living by the traits of its species.
+
+    The traits of a species are class attributes shared by all its members and every instance
+    only holds its ``__slots__``, so a species is a subclass setting constants only, see
+    ``sandbox.species``. A single bacteria can still be given a lifetime or a reproduction rate of
+    its own, see ``max_lifetime`` and ``reproduction_rate``.
+
+    A bacteria makes ``NUTRIENT``: it deposits ``DEATH_DEPOSIT`` of it where it dies and dies
+    once there is more than ``DEATH_CONCENTRATION`` of it in its piece of land. Its children land
+    up to ``DISPERSAL`` pieces of land away.
 
-    :param int max_lifetime: How long the bacteria should live
     :param int x_position: The x position of this bacteria
     :param int y_position: The y position of this bacteria
-    :param int reproduction_rate: Ticks needed for each reproduction cycle
+    :param int|None max_lifetime: Keyword only, how long the bacteria should live, by default the
+        ``MAX_LIFETIME`` of the species
+    :param int|None reproduction_rate: Keyword only, ticks needed for each reproduction cycle,
+        by default the ``REPRODUCTION_RATE`` of the species
     """
-    __metaclass__ = abc.ABCMeta
     DEATH_CONCENTRATION = 6
-
-    def __init__(self, max_lifetime, x_position, y_position, reproduction_rate=2):
+    DEATH_DEPOSIT = 3
+    DISPERSAL = 1
+    NUTRIENT = None
+    KIND = None
+    __slots__ = ('current_lifetime', 'x_position', 'y_position', 'store_slot', '_own_traits')
+    MAX_LIFETIME = None
+    REPRODUCTION_RATE = 2
+
+    def __init__(self, x_position, y_position, *, max_lifetime=None, reproduction_rate=None):
         self.current_lifetime = 0
-        self.max_lifetime = max_lifetime
-        self.reproduction_rate = reproduction_rate
         self.x_position = x_position
         self.y_position = y_position
+        self.store_slot = None
+        # The lifetime and reproduction rate of this one, None while they are the species ones
+        self._own_traits = None
+        if max_lifetime is not None or reproduction_rate is not None:
+            self._set_own_traits(max_lifetime, reproduction_rate)
 
-    def execute_tick(self, world):
-        """Add to the lifetime and perform basic life checks.
-
-        :param sandbox.simulation_world.World world: The world object
-        """
-        self.current_lifetime += 1
-        if self.current_lifetime > self.max_lifetime:
-            self._die(world)
-            return
-
-        self.check_death(world)
-
-        if self.current_lifetime % self.reproduction_rate == 0:
-            self.reproduce(world)
+    def __repr__(self):
+        return '{}'.format(self.__class__.__name__)
 
-    @abc.abstractmethod
-    def _die(self, world):
-        """Override this method to define die behavior.
+    @property
+    def max_lifetime(self):
+        """How long the bacteria should live, the ``MAX_LIFETIME`` of its species by default.
 
-        :param sandbox.simulate_world.World world: The world object
+        :rtype: int
         """
+        if self._own_traits is None:
+            return self.MAX_LIFETIME
+        return self._own_traits[0]
 
-    @abc.abstractmethod
-    def reproduce(self, world):
-        """Override this method to define reproduction behavior.
-
-        :param sandbox.simulate_world.World world: The world object
-        """
+    @max_lifetime.setter
+    def max_lifetime(self, max_lifetime):
+        self._set_own_traits(max_lifetime, None)
 
-    @abc.abstractmethod
-    def check_death(self, world):
-        """Override this method to define check death behavior.
+    @property
+    def reproduction_rate(self):
+        """Ticks needed for each reproduction cycle, the ``REPRODUCTION_RATE`` of its species by
+        default.
 
-        :param sandbox.simulate_world.World world: The world object
+        :rtype: int
         """
+        if self._own_traits is None:
+            return self.REPRODUCTION_RATE
+        return self._own_traits[1]
 
+    @reproduction_rate.setter
+    def reproduction_rate(self, reproduction_rate):
+        self._set_own_traits(None, reproduction_rate)
 
-class NitrogenBacteria(Bacteria):
-    """Bacteria which make nitrogen.
-
-    :param int x_position: The x position of this bacteria
-    :param int y_position: The y position of this bacteria
-    """
-
-    def __init__(self, x_position, y_position):
-        super(NitrogenBacteria, self).__init__(max_lifetime=4, x_position=x_position,
-                                               y_position=y_position)
-
-    def __repr__(self):
-        return '{}'.format(self.__class__.__name__)
-
-    def _die(self, world):
-        """Kill the nitrogen bacteria.
-
-        :param sandbox.simulation_world.World world: The world object
-        """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        world.world_map[x_y_key].nitrogen += 3
-        world.global_bacteria.remove(self)
-
-    def reproduce(self, world):
-        """Make a new child nitrogen bacteria.
+    def _set_own_traits(self, max_lifetime, reproduction_rate):
+        """Give the bacteria a lifetime or a reproduction rate of its own.
 
-        :param sandbox.simulate_world.World world: The world object
-        :rtype: sandbox.simulate_bacteria.NitrogenBacteria
+        :param int|None max_lifetime: The lifetime, None to keep the current one
+        :param int|None reproduction_rate: The reproduction rate, None to keep the current one
         """
-        new_x_position, new_y_position = utils.get_new_position(
-            self.x_position, self.y_position, world.max_x_size, world.max_y_size, 1)
-        child = NitrogenBacteria(new_x_position, new_y_position)
-        world.global_bacteria.append(child)
+        own_traits = (self.max_lifetime if max_lifetime is None else max_lifetime,
+                      self.reproduction_rate if reproduction_rate is None else reproduction_rate)
+        self._own_traits = None if own_traits == (self.MAX_LIFETIME,
+                                                  self.REPRODUCTION_RATE) else own_traits
 
-    def check_death(self, world):
-        """Check if nitrogen bacteria should die.
+    def execute_tick(self, world):
+        """Add to the lifetime and perform basic life checks.
 
-        :param sandbox.simulate_world.World world: The world object
+        :param sandbox.simulation_world.World world: The world object
         """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        if world.world_map[x_y_key].nitrogen > self.DEATH_CONCENTRATION:
+        self.current_lifetime += 1
+        if self.current_lifetime > self.max_lifetime:
+            world.instrumentation.count('deaths.lifetime')
             self._die(world)
+            return
 
+        self.check_death(world)
 
-class PhosphorusBacteria(Bacteria):
-    """Bacteria which make phosphorus.
-
-    :param int x_position: The x position of this bacteria
-    :param int y_position: The y position of this bacteria
-    """
-
-    def __init__(self, x_position, y_position):
-        super(PhosphorusBacteria, self).__init__(max_lifetime=4, x_position=x_position,
-                                                 y_position=y_position)
-
-    def __repr__(self):
-        return '{}'.format(self.__class__.__name__)
+        if self.current_lifetime % self.reproduction_rate == 0:
+            self.reproduce(world)
 
     def _die(self, world):
-        """Kill the phosphorus bacteria.
+        """Kill the bacteria, depositing its nutrient in its piece of land.
 
         :param sandbox.simulation_world.World world: The world object
         """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        world.world_map[x_y_key].phosphorus += 3
+        getattr(world, self.NUTRIENT)[self.x_position, self.y_position] += self.DEATH_DEPOSIT
+        world.stats.add_to_layer(self.NUTRIENT, self.DEATH_DEPOSIT)
+        world.stats.bacteria_died(self.__class__.__name__)
         world.global_bacteria.remove(self)
+        world.occupancy.remove(self.KIND, self.x_position, self.y_position)
 
     def reproduce(self, world):
-        """Make a new child phosphorus bacteria.
+        """Make a new child bacteria of the same species.
 
         :param sandbox.simulate_world.World world: The world object
-        :rtype: sandbox.simulate_bacteria.PhosphorusBacteria
         """
         new_x_position, new_y_position = utils.get_new_position(
-            self.x_position, self.y_position, world.max_x_size, world.max_y_size, 1)
-        child = PhosphorusBacteria(new_x_position, new_y_position)
+            self.x_position, self.y_position, world.max_x_size, world.max_y_size,
+            self.DISPERSAL, rng=world.rng.movement)
+        child = self.__class__(new_x_position, new_y_position)
         world.global_bacteria.append(child)
+        world.stats.bacteria_born(child.__class__.__name__)
+        world.instrumentation.count('births')
+        world.occupancy.add(child.KIND, new_x_position, new_y_position)
 
     def check_death(self, world):
-        """Check if phosphorus bacteria should die.
+        """Check if the bacteria should die of the concentration of its nutrient.
 
         :param sandbox.simulate_world.World world: The world object
         """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        if world.world_map[x_y_key].phosphorus > self.DEATH_CONCENTRATION:
+        if getattr(world, self.NUTRIENT)[self.x_position, self.y_position] > \
+           self.DEATH_CONCENTRATION:
+            world.instrumentation.count('deaths.concentration')
             self._die(world)
 
 
-class PotassiumBacteria(Bacteria):
-    """Bacteria which make potassium.
-
-    :param int x_position: The x position of this bacteria
-    :param int y_position: The y position of this bacteria
-    """
-
-    def __init__(self, x_position, y_position):
-        super(PotassiumBacteria, self).__init__(max_lifetime=4, x_position=x_position,
-                                                y_position=y_position)
-
-    def __repr__(self):
-        return '{}'.format(self.__class__.__name__)
-
-    def _die(self, world):
-        """Kill the potassium bacteria.
+class NitrogenBacteria(Bacteria):
+    """Bacteria which make nitrogen."""
+    __slots__ = ()
+    MAX_LIFETIME = 4
+    NUTRIENT = 'nitrogen'
+    KIND = 'nitrogen_bacteria'
 
-        :param sandbox.simulation_world.World world: The world object
-        """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        world.world_map[x_y_key].potassium += 3
-        world.global_bacteria.remove(self)
 
-    def reproduce(self, world):
-        """Make a new child potassium bacteria.
+class PhosphorusBacteria(Bacteria):
+    """Bacteria which make phosphorus."""
+    __slots__ = ()
+    MAX_LIFETIME = 4
+    NUTRIENT = 'phosphorus'
+    KIND = 'phosphorus_bacteria'
 
-        :param sandbox.simulate_world.World world: The world object
-        :rtype: sandbox.simulate_bacteria.PotassiumBacteria
-        """
-        new_x_position, new_y_position = utils.get_new_position(
-            self.x_position, self.y_position, world.max_x_size, world.max_y_size, 1)
-        child = PotassiumBacteria(new_x_position, new_y_position)
-        world.global_bacteria.append(child)
 
-    def check_death(self, world):
-        """Check if potassium bacteria should die.
-
-        :param sandbox.simulate_world.World world: The world object
-        """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        if world.world_map[x_y_key].potassium > self.DEATH_CONCENTRATION:
-            self._die(world)
+class PotassiumBacteria(Bacteria):
+    """Bacteria which make potassium."""
+    __slots__ = ()
+    MAX_LIFETIME = 4
+    NUTRIENT = 'potassium'
+    KIND = 'potassium_bacteria'
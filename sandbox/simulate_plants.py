@@ -1,206 +1,200 @@
 """Definitions of the simulated plants in the world."""
-import abc
-import random
-
 from sandbox import simulate_bacteria
 from sandbox import utils
 
 
 class Plant:
-    """Base plant object.
+    """Base plant object, living by the traits of its species.
+
+    The traits of a species are class attributes shared by all its members and every instance
+    only holds its ``__slots__``, so a species is a subclass setting constants only, see
+    ``sandbox.species``. A single plant can still be given a lifetime or a reproduction rate of
+    its own, see ``max_lifetime`` and ``reproduction_rate``.
+
+    Every tick a plant eats ``CONSUMPTION`` from its piece of land and dies once one of the
+    layers it eats runs out, or when more than ``CROWDING`` plants of its species share its
+    piece of land. A dying plant deposits ``DEATH_DEPOSITS`` and spawns ``DEATH_SPAWNS``
+    bacteria, each of a type drawn from ``DEATH_SPAWN_TYPES``. Its children land up to
+    ``DISPERSAL`` pieces of land away.
 
-    :param int max_lifetime: How long the plant should live
     :param int x_position: The x position of this plant
     :param int y_position: The y position of this plant
-    :param int reproduction_rate: Ticks needed for each reproduction cycle
+    :param int|None max_lifetime: Keyword only, how long the plant should live, by default the
+        ``MAX_LIFETIME`` of the species
+    :param int|None reproduction_rate: Keyword only, ticks needed for each reproduction cycle,
+        by default the ``REPRODUCTION_RATE`` of the species
     """
-    __metaclass__ = abc.ABCMeta
     DEATH_CONCENTRATION = 4
-
-    def __init__(self, max_lifetime, x_position, y_position, reproduction_rate=6):
+    KIND = None
+    # Layers eaten every tick, in DEATH_CONCENTRATION / MAX_LIFETIME units
+    CONSUMPTION = ()
+    CROWDING = None
+    DEATH_DEPOSITS = ()
+    DEATH_SPAWNS = 0
+    # Repeat a type to make it more likely
+    DEATH_SPAWN_TYPES = ()
+    DISPERSAL = 1
+    __slots__ = ('current_lifetime', 'x_position', 'y_position', 'store_slot', '_own_traits')
+    MAX_LIFETIME = None
+    REPRODUCTION_RATE = 6
+
+    def __init__(self, x_position, y_position, *, max_lifetime=None, reproduction_rate=None):
         self.current_lifetime = 0
-        self.max_lifetime = max_lifetime
-        self.reproduction_rate = reproduction_rate
         self.x_position = x_position
         self.y_position = y_position
+        self.store_slot = None
+        # The lifetime and reproduction rate of this one, None while they are the species ones
+        self._own_traits = None
+        if max_lifetime is not None or reproduction_rate is not None:
+            self._set_own_traits(max_lifetime, reproduction_rate)
 
-    def execute_tick(self, world):
-        """Add to the lifetime and perform basic life checks.
+    def __repr__(self):
+        return '{}'.format(self.__class__.__name__)
 
-        :param sandbox.simulation_world.World world: The world object
-        """
-        self.current_lifetime += 1
-        if self.current_lifetime > self.max_lifetime:
-            self._die(world)
-            return
+    @property
+    def max_lifetime(self):
+        """How long the plant should live, the ``MAX_LIFETIME`` of its species by default.
 
-        self.check_death(world)
+        :rtype: int
+        """
+        if self._own_traits is None:
+            return self.MAX_LIFETIME
+        return self._own_traits[0]
 
-        if self.current_lifetime % self.reproduction_rate == 0:
-            self.reproduce(world)
+    @max_lifetime.setter
+    def max_lifetime(self, max_lifetime):
+        self._set_own_traits(max_lifetime, None)
 
-    @abc.abstractmethod
-    def _die(self, world):
-        """Override this method to define die behavior.
+    @property
+    def reproduction_rate(self):
+        """Ticks needed for each reproduction cycle, the ``REPRODUCTION_RATE`` of its species by
+        default.
 
-        :param sandbox.simulate_world.World world: The world object
+        :rtype: int
         """
+        if self._own_traits is None:
+            return self.REPRODUCTION_RATE
+        return self._own_traits[1]
 
-    @abc.abstractmethod
-    def reproduce(self, world):
-        """Override this method to define reproduction behavior.
+    @reproduction_rate.setter
+    def reproduction_rate(self, reproduction_rate):
+        self._set_own_traits(None, reproduction_rate)
 
-        :param sandbox.simulate_world.World world: The world object
-        """
+    def _set_own_traits(self, max_lifetime, reproduction_rate):
+        """Give the plant a lifetime or a reproduction rate of its own.
 
-    @abc.abstractmethod
-    def check_death(self, world):
-        """Override this method to define check death behavior.
-
-        :param sandbox.simulate_world.World world: The world object
+        :param int|None max_lifetime: The lifetime, None to keep the current one
+        :param int|None reproduction_rate: The reproduction rate, None to keep the current one
         """
+        own_traits = (self.max_lifetime if max_lifetime is None else max_lifetime,
+                      self.reproduction_rate if reproduction_rate is None else reproduction_rate)
+        self._own_traits = None if own_traits == (self.MAX_LIFETIME,
+                                                  self.REPRODUCTION_RATE) else own_traits
 
+    def execute_tick(self, world):
+        """Add to the lifetime and perform basic life checks.
 
-class GrassPlant(Plant):
-    """Basic grass plant.
-
-    :param int x_position: The x position of this grass plant
-    :param int y_position: The y position of this grass plant
-    """
-    DEATH_CONCENTRATION = 6
+        :param sandbox.simulation_world.World world: The world object
+        """
+        self.current_lifetime += 1
+        if self.current_lifetime > self.max_lifetime:
+            world.instrumentation.count('deaths.lifetime')
+            self._die(world)
+            return
 
-    def __init__(self, x_position, y_position):
-        super(GrassPlant, self).__init__(max_lifetime=24, x_position=x_position,
-                                         y_position=y_position,
-                                         reproduction_rate=6)
+        self.check_death(world)
 
-    def __repr__(self):
-        return '{}'.format(self.__class__.__name__)
+        if self.current_lifetime % self.reproduction_rate == 0:
+            self.reproduce(world)
 
     def _die(self, world):
-        """Kill the grass plant.
+        """Kill the plant, depositing its matter and spawning its bacteria.
 
         :param sandbox.simulation_world.World world: The world object
         """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        world.world_map[x_y_key].plant_matter += 1
-        world.world_map[x_y_key].carbon += 1
-        self.spawn_bacteria(world)
-        self.spawn_bacteria(world)
-        self.spawn_bacteria(world)
+        for layer, amount in self.DEATH_DEPOSITS:
+            getattr(world, layer)[self.x_position, self.y_position] += amount
+            world.stats.add_to_layer(layer, amount)
+        for _ in range(self.DEATH_SPAWNS):
+            self.spawn_bacteria(world)
+        world.stats.plant_died(self.__class__.__name__)
         world.global_plants.remove(self)
-        world.world_map[x_y_key].beings['grass'].remove(self)
+        world.get_beings(self.x_position, self.y_position)[self.KIND].remove(self)
+        world.occupancy.remove(self.KIND, self.x_position, self.y_position)
 
     def reproduce(self, world):
-        """Make a new child grass plant.
+        """Make a new child plant of the same species.
 
         :param sandbox.simulate_world.World world: The world object
-        :rtype: sandbox.simulate_plants.GrassPlant
         """
         new_x_position, new_y_position = utils.get_new_position(
-            self.x_position, self.y_position, world.max_x_size, world.max_y_size, 2)
-        child = GrassPlant(new_x_position, new_y_position)
-        x_y_key = utils.get_x_y_key(new_x_position, new_y_position)
+            self.x_position, self.y_position, world.max_x_size, world.max_y_size,
+            self.DISPERSAL, rng=world.rng.movement)
+        child = self.__class__(new_x_position, new_y_position)
         world.global_plants.append(child)
-        world.world_map[x_y_key].beings['grass'].append(child)
+        world.stats.plant_born(child.__class__.__name__)
+        world.instrumentation.count('births')
+        world.get_beings(new_x_position, new_y_position)[child.KIND].append(child)
+        world.occupancy.add(child.KIND, new_x_position, new_y_position)
 
     def check_death(self, world):
-        """Check if grass plant should die.
+        """Eat from the piece of land and check if the plant should die.
 
         :param sandbox.simulate_world.World world: The world object
         """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        world.world_map[x_y_key].nitrogen -= self.DEATH_CONCENTRATION * 2/self.max_lifetime
-        world.world_map[x_y_key].phosphorus -= self.DEATH_CONCENTRATION * 1/self.max_lifetime
-        world.world_map[x_y_key].potassium -= self.DEATH_CONCENTRATION * 1/self.max_lifetime
-        if world.world_map[x_y_key].nitrogen < 0 or \
-           world.world_map[x_y_key].phosphorus < 0 or \
-           world.world_map[x_y_key].potassium < 0:
+        position = (self.x_position, self.y_position)
+        for layer, weight in self.CONSUMPTION:
+            getattr(world, layer)[position] -= self.DEATH_CONCENTRATION * weight/self.max_lifetime
+        for layer, weight in self.CONSUMPTION:
+            world.stats.add_to_layer(layer, -self.DEATH_CONCENTRATION * weight/self.max_lifetime)
+        if any(getattr(world, layer)[position] < 0 for layer, _ in self.CONSUMPTION):
+            world.instrumentation.count('deaths.concentration')
             self._die(world)
             return
-        if len(world.world_map[x_y_key].beings['grass']) > 10:
+        if self.CROWDING is not None and \
+           world.occupancy.get_counts(self.KIND)[position] > self.CROWDING:
+            world.instrumentation.count('deaths.crowding')
             self._die(world)
             return
 
     def spawn_bacteria(self, world):
-        """Spawn new bacteria where grass died.
+        """Spawn a new bacteria where the plant died.
 
         :param sandbox.simulate_world.World world: The world object
         """
-        rand_bacteria = random.randint(0, 7)
-        if rand_bacteria in [0, 1, 2, 3]:
-            world.global_bacteria.append(simulate_bacteria.NitrogenBacteria(
-                self.x_position, self.y_position))
-        elif rand_bacteria in [4, 5]:
-            world.global_bacteria.append(simulate_bacteria.PhosphorusBacteria(
-                self.x_position, self.y_position))
-        elif rand_bacteria in [6, 7]:
-            world.global_bacteria.append(simulate_bacteria.PotassiumBacteria(
-                self.x_position, self.y_position))
-
+        bacteria_type = self.DEATH_SPAWN_TYPES[
+            world.rng.spawning.randint(0, len(self.DEATH_SPAWN_TYPES) - 1)]
+        bacteria = bacteria_type(self.x_position, self.y_position)
+        world.global_bacteria.append(bacteria)
+        world.stats.bacteria_born(bacteria.__class__.__name__)
+        world.instrumentation.count('births')
+        world.occupancy.add(bacteria.KIND, self.x_position, self.y_position)
 
-class TreePlant(Plant):
-    """Basic tree.
 
-    :param int x_position: The x position of this tree
-    :param int y_position: The y position of this tree
-    """
+class GrassPlant(Plant):
+    """Basic grass plant."""
     DEATH_CONCENTRATION = 6
+    __slots__ = ()
+    KIND = 'grass'
+    MAX_LIFETIME = 24
+    REPRODUCTION_RATE = 6
+    CONSUMPTION = (('nitrogen', 2), ('phosphorus', 1), ('potassium', 1))
+    CROWDING = 10
+    DEATH_DEPOSITS = (('plant_matter', 1), ('carbon', 1))
+    DEATH_SPAWNS = 3
+    DEATH_SPAWN_TYPES = ((simulate_bacteria.NitrogenBacteria,) * 4 +
+                         (simulate_bacteria.PhosphorusBacteria,) * 2 +
+                         (simulate_bacteria.PotassiumBacteria,) * 2)
+    DISPERSAL = 2
 
-    def __init__(self, x_position, y_position):
-        super(TreePlant, self).__init__(max_lifetime=160, x_position=x_position,
-                                        y_position=y_position,
-                                        reproduction_rate=35)
-
-    def __repr__(self):
-        return '{}'.format(self.__class__.__name__)
-
-    def _die(self, world):
-        """Kill the tree.
-
-        :param sandbox.simulation_world.World world: The world object
-        """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        world.world_map[x_y_key].tree_matter += 10
-        world.global_plants.remove(self)
-        world.world_map[x_y_key].beings['tree'].remove(self)
-
-    def reproduce(self, world):
-        """Make a new child tree.
-
-        :param sandbox.simulate_world.World world: The world object
-        :rtype: sandbox.simulate_plants.TreePlant
-        """
-        new_x_position, new_y_position = utils.get_new_position(
-            self.x_position, self.y_position, world.max_x_size, world.max_y_size, 1)
-        child = TreePlant(new_x_position, new_y_position)
-        x_y_key = utils.get_x_y_key(new_x_position, new_y_position)
-        world.global_plants.append(child)
-        world.world_map[x_y_key].beings['tree'].append(child)
-
-    def check_death(self, world):
-        """Check if tree should die.
 
-        :param sandbox.simulate_world.World world: The world object
-        """
-        x_y_key = utils.get_x_y_key(self.x_position, self.y_position)
-        # world.world_map[x_y_key].plant_matter -= self.DEATH_CONCENTRATION * 5/self.max_lifetime
-        world.world_map[x_y_key].carbon -= self.DEATH_CONCENTRATION * 5/self.max_lifetime
-        world.world_map[x_y_key].nitrogen -= self.DEATH_CONCENTRATION * 2/self.max_lifetime
-        world.world_map[x_y_key].phosphorus -= self.DEATH_CONCENTRATION * 1/self.max_lifetime
-        world.world_map[x_y_key].potassium -= self.DEATH_CONCENTRATION * 1/self.max_lifetime
-        if world.world_map[x_y_key].carbon < 0 or \
-           world.world_map[x_y_key].nitrogen < 0 or \
-           world.world_map[x_y_key].phosphorus < 0 or \
-           world.world_map[x_y_key].potassium < 0:
-            # print('TREE DIED:: x: {} y: {}, carbon:{}, nitrogen:{}, '
-            #       'phosphorus:{}, potassium:{}'.format(self.x_position, self.y_position,
-            #                                            world.world_map[x_y_key].carbon,
-            #                                            world.world_map[x_y_key].nitrogen,
-            #                                            world.world_map[x_y_key].phosphorus,
-            #                                            world.world_map[x_y_key].potassium))
-            self._die(world)
-            return
-        if len(world.world_map[x_y_key].beings['tree']) > 2:
-            self._die(world)
-            return
+class TreePlant(Plant):
+    """Basic tree."""
+    DEATH_CONCENTRATION = 6
+    __slots__ = ()
+    KIND = 'tree'
+    MAX_LIFETIME = 160
+    REPRODUCTION_RATE = 35
+    CONSUMPTION = (('carbon', 5), ('nitrogen', 2), ('phosphorus', 1), ('potassium', 1))
+    CROWDING = 2
+    DEATH_DEPOSITS = (('tree_matter', 10),)
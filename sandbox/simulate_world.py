@@ -1,67 +1,354 @@
 """Main simulation loop file"""
-import collections
-import random
+import collections.abc
 
-import pygame
+import numpy
 
+from sandbox import bacteria_engine
+from sandbox import chunks
+from sandbox import cohort_engine
 from sandbox import display_world
+from sandbox import entity_store
+from sandbox import instrumentation as sandbox_instrumentation
+from sandbox import occupancy
+from sandbox import scheduler
+from sandbox import seeding
 from sandbox import simulate_plants
+from sandbox import spatial
+from sandbox import steady_state
+from sandbox import synchronous_tick
 from sandbox import utils
+from sandbox import world_random
+from sandbox import world_stats
 
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-GREEN = (0, 255, 0)
-RED = (255, 0, 0)
-WIDTH = 20
-HEIGHT = 20
+NUTRIENT_LAYERS = ('carbon', 'potassium', 'nitrogen', 'phosphorus')
+MATTER_LAYERS = ('plant_matter', 'tree_matter')
+LAYERS = NUTRIENT_LAYERS + MATTER_LAYERS
 
 
 class World:
     """Main world object.
 
+    The land of the world is stored as one 2D array per layer indexed by ``[x, y]``, see
+    ``LAYERS`` for the available layers. ``world_map`` still hands out ``Land`` views keyed by
+    ``utils.get_x_y_key`` strings for code which works on a single piece of land.
+
+    All the randomness of the simulation comes from ``rng``, so the same seed always gives
+    the same run, whichever bacteria engine is used. Like the ``bacteria_engine``, the
+    ``lifecycle_scheduler`` of scheduled lifecycles lives on the world so checkpoints keep it.
+
+    The layers are allocated zeroed, so the memory of a piece of land is only committed once
+    it is written to and a large empty world starts instantly. ``chunks`` splits the world into
+    square chunks, the ones where nothing lives and nothing changed are skipped by the cohort
+    engine and the renderer, see ``get_active_chunks``. ``get_spatial_index`` finds the plants
+    and bacteria near a piece of land.
+
     :param int max_x_size: The x size of the world
     :param int max_y_size: The y size of the world
+    :param int|None seed: The seed of the random streams of the world, a random one by default
+    :param int chunk_size: The x and y size of the chunks of the world
     """
-    def __init__(self, max_x_size, max_y_size):
+    def __init__(self, max_x_size, max_y_size, seed=None, chunk_size=chunks.CHUNK_SIZE):
         self.max_x_size = max_x_size
         self.max_y_size = max_y_size
 
         self.time = 0
-        self.world_map = {}
-        for x_val in range(0, self.max_x_size):
-            for y_val in range(0, self.max_x_size):
-                x_y_key = utils.get_x_y_key(x_val, y_val)
-                self.world_map[x_y_key] = Land(x_val, y_val)
-        self.global_bacteria = []
-        self.global_plants = []
+        self.rng = world_random.WorldRandom(seed)
+        for layer in NUTRIENT_LAYERS:
+            setattr(self, layer, numpy.zeros((max_x_size, max_y_size), dtype=numpy.float64))
+        for layer in MATTER_LAYERS:
+            setattr(self, layer, numpy.zeros((max_x_size, max_y_size), dtype=numpy.int64))
+        self.beings = {}
+        self.chunks = chunks.ChunkIndex(max_x_size, max_y_size, chunk_size)
+        self.occupancy = occupancy.OccupancyIndex(max_x_size, max_y_size, self.chunks)
+        self.world_map = WorldMap(self)
+        self.instrumentation = sandbox_instrumentation.NULL_INSTRUMENTATION
+        self.global_bacteria = entity_store.EntityStore(instrumentation=self.instrumentation)
+        self.global_plants = entity_store.EntityStore(instrumentation=self.instrumentation)
+        self.bacteria_engine = None
+        self.lifecycle_scheduler = None
+        self.spatial_index = None
+        self.stats = world_stats.WorldStats(LAYERS)
+
+    def set_instrumentation(self, instrumentation):
+        """Profile the world and its entity stores, or stop with ``None``.
+
+        :param sandbox.instrumentation.Instrumentation|None instrumentation: The instrumentation
+        """
+        instrumentation = instrumentation or sandbox_instrumentation.NULL_INSTRUMENTATION
+        self.instrumentation = instrumentation
+        self.global_bacteria.instrumentation = instrumentation
+        self.global_plants.instrumentation = instrumentation
+
+    def count_bacteria(self):
+        """Count the living bacteria of each type, keyed by the name of the type.
+
+        :rtype: dict
+        """
+        bacteria_count = {}
+        if self.bacteria_engine is not None:
+            bacteria_count.update(self.bacteria_engine.count_by_type())
+        for bacteria in self.global_bacteria:
+            if str(bacteria) in bacteria_count:
+                bacteria_count[str(bacteria)] += 1
+            else:
+                bacteria_count[str(bacteria)] = 1
+        return bacteria_count
+
+    def get_beings(self, x_position, y_position):
+        """Get the things living in a piece of land, keyed by their kind.
+
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :rtype: Beings
+        """
+        key = (x_position, y_position)
+        beings = self.beings.get(key)
+        if beings is None:
+            beings = self.beings[key] = Beings()
+        return beings
+
+    def count_beings(self, kind):
+        """Count all the things of one kind living in the world.
+
+        :param str kind: The kind of being, e.g. grass or tree
+        :rtype: int
+        """
+        return self.occupancy.total(kind)
+
+    def get_beings_counts(self, kind):
+        """Count the things of one kind living in each piece of land.
+
+        :param str kind: The kind of being, e.g. grass, tree or nitrogen_bacteria
+        :return: Array of shape (max_x_size, max_y_size) of the counts
+        :rtype: numpy.ndarray
+        """
+        return self.occupancy.get_counts(kind).copy()
+
+    def get_active_chunks(self):
+        """Get the mask of the chunks where things live.
+
+        :return: Boolean array of the shape of the chunks
+        :rtype: numpy.ndarray
+        """
+        return self.occupancy.get_active_chunks()
+
+    def get_spatial_index(self):
+        """Get the index of the positions of the plant and bacteria objects, built on first use.
+
+        The entity stores keep it up to date from then on, move entities with ``move_entity``.
+        The bacteria of a bacteria engine are not objects so they are not indexed, count them
+        with ``count_near``.
+
+        :rtype: sandbox.spatial.SpatialIndex
+        """
+        if self.spatial_index is None:
+            self.spatial_index = spatial.SpatialIndex(self.max_x_size, self.max_y_size)
+            for entities in (self.global_plants, self.global_bacteria):
+                self.spatial_index.add_many(entities)
+                entities.index = self.spatial_index
+        return self.spatial_index
+
+    def count_near(self, kind, x_positions, y_positions, radius, metric='euclidean'):
+        """Count the things of one kind within a radius of many pieces of land at once.
+
+        :param str kind: The kind of being, e.g. grass, tree or nitrogen_bacteria
+        :param numpy.ndarray x_positions: The x positions of the pieces of land
+        :param numpy.ndarray y_positions: The y positions of the pieces of land
+        :param int radius: The radius, see ``sandbox.spatial.count_within``
+        :param str metric: ``euclidean`` or ``chebyshev``
+        :return: The number of things near each piece of land
+        :rtype: numpy.ndarray
+        """
+        return spatial.count_within(self.occupancy.get_counts(kind), x_positions, y_positions,
+                                    radius, metric)
+
+    def move_entity(self, entity, x_position, y_position):
+        """Move a living plant or bacteria object to another piece of land.
+
+        :param Any entity: The plant or bacteria
+        :param int x_position: The new x position
+        :param int y_position: The new y position
+        :raises ValueError: If the entity is not living in the world
+        """
+        if entity.store_slot is None:
+            raise ValueError('{} is not living'.format(entity))
+        previous_x_position, previous_y_position = entity.x_position, entity.y_position
+        # Moved in the index first, which checks the entity is indexed before anything changes
+        if self.spatial_index is not None:
+            self.spatial_index.move(entity, x_position, y_position)
+        else:
+            entity.x_position = x_position
+            entity.y_position = y_position
+        self.occupancy.remove(entity.KIND, previous_x_position, previous_y_position)
+        if isinstance(entity, simulate_plants.Plant):
+            self.get_beings(previous_x_position, previous_y_position)[entity.KIND].remove(entity)
+            self.get_beings(x_position, y_position)[entity.KIND].append(entity)
+        self.occupancy.add(entity.KIND, x_position, y_position)
+
+    def get_layer_total(self, layer):
+        """Get the sum of a layer over the whole world.
+
+        :param str layer: The name of the layer, one of ``LAYERS``
+        :rtype: float|int
+        """
+        return getattr(self, layer).sum().item()
+
+
+class Beings:
+    """The things living in a piece of land, in one fixed slot per kind.
+
+    Indexed by kind like a dict, e.g. ``beings['grass']``. The kinds of the other plant
+    species, see ``sandbox.species``, share a dict allocated on their first use.
+    """
+    __slots__ = ('grass', 'tree', 'other_kinds')
+    KINDS = ('grass', 'tree')
+
+    def __init__(self):
+        self.grass = []
+        self.tree = []
+        self.other_kinds = None
+
+    def __getitem__(self, kind):
+        if kind in self.KINDS:
+            return getattr(self, kind)
+        if self.other_kinds is None:
+            self.other_kinds = {}
+        return self.other_kinds.setdefault(kind, [])
+
+    def __contains__(self, kind):
+        return kind in self.KINDS or bool(self.other_kinds and kind in self.other_kinds)
+
+    def __bool__(self):
+        return bool(self.grass or self.tree or
+                    (self.other_kinds and any(self.other_kinds.values())))
+
+    def __repr__(self):
+        return 'Beings(grass={}, tree={}, other_kinds={})'.format(self.grass, self.tree,
+                                                                  self.other_kinds)
+
+
+class WorldMap(collections.abc.Mapping):
+    """Read only mapping of ``x:y`` keys to ``Land`` views of a world.
+
+    :param World world: The world object
+    """
+    def __init__(self, world):
+        self.world = world
+
+    def __getitem__(self, x_y_key):
+        if isinstance(x_y_key, tuple):
+            x_position, y_position = x_y_key
+        else:
+            x_position, y_position = utils.parse_x_y_key(x_y_key)
+        if not (0 <= x_position < self.world.max_x_size and
+                0 <= y_position < self.world.max_y_size):
+            raise KeyError(x_y_key)
+        return Land(self.world, x_position, y_position)
+
+    def __iter__(self):
+        for x_val in range(0, self.world.max_x_size):
+            for y_val in range(0, self.world.max_y_size):
+                yield utils.get_x_y_key(x_val, y_val)
+
+    def __len__(self):
+        return self.world.max_x_size * self.world.max_y_size
+
+
+def _layer_property(layer):
+    """Make a property reading and writing one cell of a world layer.
+
+    :param str layer: The name of the layer
+    :rtype: property
+    """
+    def getter(self):
+        return getattr(self.world, layer)[self.x_position, self.y_position].item()
+
+    def setter(self, value):
+        layer_array = getattr(self.world, layer)
+        self.world.stats.add_to_layer(layer, value - layer_array[self.x_position,
+                                                                 self.y_position].item())
+        layer_array[self.x_position, self.y_position] = value
+        self.world.chunks.mark_changed(self.x_position, self.y_position)
+
+    return property(getter, setter, doc='The amount of {} in this piece of land.'.format(layer))
 
 
 class Land:
-    """Object to represent a piece of land.
+    """View of a piece of land backed by the layers of the world.
 
+    :param World world: The world object
     :param int x_position: The x position of their piece of land
     :param int y_position: The y position of their piece of land
-    :param float carbon: The amount of carbon
-    :param float potassium: The amount of potassium
-    :param float nitrogen: The amount of nitrogen
-    :param float phosphorus: The amount of phosphorus
-    :param int plant_matter: The amount of plant matter
-    :param int tree_matter: The amount of tree matter
-    :param list[Any] beings: A list of any things living in this piece of land
     """
-    def __init__(self, x_position, y_position, carbon=0, potassium=0, nitrogen=0,
-                 phosphorus=0, plant_matter=0, tree_matter=0, beings=None):
+    carbon = _layer_property('carbon')
+    potassium = _layer_property('potassium')
+    nitrogen = _layer_property('nitrogen')
+    phosphorus = _layer_property('phosphorus')
+    plant_matter = _layer_property('plant_matter')
+    tree_matter = _layer_property('tree_matter')
+    __slots__ = ('world', 'x_position', 'y_position')
+
+    def __init__(self, world, x_position, y_position):
+        self.world = world
         self.x_position = x_position
         self.y_position = y_position
-        self.carbon = float(carbon)
-        self.potassium = float(potassium)
-        self.nitrogen = float(nitrogen)
-        self.phosphorus = float(phosphorus)
-        self.plant_matter = plant_matter
-        self.tree_matter = tree_matter
-        self.beings = collections.defaultdict(list)
-        if beings:
-            self.beings.update(beings)
+
+    @property
+    def beings(self):
+        """The lists of any things living in this piece of land, indexed by their kind.
+
+        :rtype: Beings
+        """
+        return self.world.get_beings(self.x_position, self.y_position)
+
+
+class SimulationOptions:
+    """How a simulation ticks and runs, the default tick of one bacteria object at a time and
+    the default spawn schedule unless told otherwise.
+
+    :param bool vectorized_bacteria: Simulate the bacteria with a
+        ``sandbox.bacteria_engine.BacteriaEngine`` instead of one object per bacteria
+    :param bool cohort_bacteria: Simulate the bacteria as counts per piece of land, type and age
+        with a ``sandbox.cohort_engine.CohortEngine``, for populations too large to simulate one
+        by one
+    :param int|None synchronous_workers: Tick the plants and bacteria from the state of the
+        world at the start of the tick, over that many threads, see
+        ``sandbox.synchronous_tick.StripedTick``. The result does not depend on the number of
+        threads but differs from the default tick, where each entity sees the changes of the
+        ones ticked before it
+    :param bool scheduled_lifecycles: Tick the plants, and the bacteria objects without a
+        bacteria engine, by their scheduled births, reproductions and deaths, see
+        ``sandbox.scheduler.LifecycleScheduler``. Its populations track the ones of the
+        default tick but the runs are not the same
+    :param sandbox.seeding.SpawnSchedule|None spawn_schedule: The plants seeded by
+        ``spawn_plants``, ``sandbox.seeding.DEFAULT_SPAWN_SCHEDULE`` by default
+    :param bool fast_forward: Jump the time of a world where nothing lives to the next spawn,
+        the observers are notified once per jump, see ``sandbox.steady_state``
+    :param callable|None stop_when: End a run early once this predicate of the simulation holds
+        after a tick, e.g. ``sandbox.steady_state.is_extinct``
+    :param str|None checkpoint_path: Periodically checkpoint the world to this path, see
+        ``sandbox.checkpoint.CheckpointObserver``
+    :param int checkpoint_every: Checkpoint every that many ticks
+    :param sandbox.instrumentation.Instrumentation|None instrumentation: Profile the phases of
+        every tick and count their events
+    """
+    def __init__(self, *, vectorized_bacteria=False, cohort_bacteria=False,
+                 synchronous_workers=None, scheduled_lifecycles=False, spawn_schedule=None,
+                 fast_forward=False, stop_when=None, checkpoint_path=None, checkpoint_every=200,
+                 instrumentation=None):
+        self.vectorized_bacteria = vectorized_bacteria
+        self.cohort_bacteria = cohort_bacteria
+        self.synchronous_workers = synchronous_workers
+        self.scheduled_lifecycles = scheduled_lifecycles
+        self.spawn_schedule = spawn_schedule
+        self.fast_forward = fast_forward
+        self.stop_when = stop_when
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.instrumentation = instrumentation
+
+
+DEFAULT_OPTIONS = SimulationOptions()
 
 
 class SimulateWorld:
@@ -70,53 +357,211 @@ class SimulateWorld:
     :param World world: The world object
     :param int end_time: Number of ticks to simulate world
     :param list[sandbox.simulate_bacteria.Bacteria]|None initial_bacteria: Initial bacteria to seed
-        the world with
+        the world with, see ``sandbox.seeding`` to seed many at once
+    :param SimulationOptions|None options: How the simulation ticks and runs, ``DEFAULT_OPTIONS``
+        by default
+    :raises ValueError: If synchronous ticks are asked for with a bacteria engine or with
+        scheduled lifecycles
     """
-    def __init__(self, world, end_time, initial_bacteria=None):
+    def __init__(self, world, end_time, initial_bacteria=None, options=None):
         self.world = world
+        self.options = options = options or DEFAULT_OPTIONS
+        if options.instrumentation is not None:
+            world.set_instrumentation(options.instrumentation)
         self.end_time = end_time
         self.global_bacteria = world.global_bacteria
         self.global_plants = world.global_plants
         if initial_bacteria:
             self.global_bacteria.extend(initial_bacteria)
+            for bacteria in initial_bacteria:
+                world.stats.bacteria_born(bacteria.__class__.__name__)
+                world.occupancy.add(bacteria.KIND, bacteria.x_position, bacteria.y_position)
+        if options.vectorized_bacteria and world.bacteria_engine is None:
+            world.bacteria_engine = bacteria_engine.BacteriaEngine()
+        elif options.cohort_bacteria and world.bacteria_engine is None:
+            world.bacteria_engine = cohort_engine.CohortEngine(world.max_x_size, world.max_y_size)
+        self.synchronous_tick = None
+        if options.synchronous_workers:
+            if world.bacteria_engine is not None:
+                raise ValueError('Synchronous ticks only simulate bacteria objects, not a '
+                                 '{}'.format(type(world.bacteria_engine).__name__))
+            if options.scheduled_lifecycles:
+                raise ValueError('Synchronous ticks and scheduled lifecycles do not mix')
+            self.synchronous_tick = synchronous_tick.StripedTick(options.synchronous_workers)
+        self.scheduler = None
+        if options.scheduled_lifecycles:
+            if world.lifecycle_scheduler is None:
+                world.lifecycle_scheduler = scheduler.LifecycleScheduler(
+                    bacteria=world.bacteria_engine is None)
+            self.scheduler = world.lifecycle_scheduler
+        self.spawn_schedule = options.spawn_schedule or seeding.DEFAULT_SPAWN_SCHEDULE
+        self.observers = []
+        if options.checkpoint_path:
+            from sandbox import checkpoint  # pylint: disable=import-outside-toplevel
+            self.add_observer(checkpoint.CheckpointObserver(options.checkpoint_path,
+                                                            options.checkpoint_every))
+
+    @classmethod
+    def resume(cls, path, end_time, options=None):
+        """Resume a simulation from a checkpoint file.
+
+        :param str path: The path of the checkpoint file
+        :param int end_time: Number of ticks to simulate world
+        :param SimulationOptions|None options: How the simulation ticks and runs
+        :rtype: SimulateWorld
+        """
+        from sandbox import checkpoint  # pylint: disable=import-outside-toplevel
+        return cls(world=checkpoint.load_checkpoint(path), end_time=end_time, options=options)
+
+    def add_observer(self, observer):
+        """Attach an observer notified while the simulation runs.
+
+        :param sandbox.observers.SimulationObserver observer: The observer
+        """
+        self.observers.append(observer)
 
-    def execute(self):
-        """Main execute function, runs in a loop until time has elapsed."""
-        pygame.init()  # pylint: disable=no-member
-        window_size = [self.world.max_x_size * WIDTH, self.world.max_y_size * HEIGHT]
-        screen = pygame.display.set_mode(window_size)
-        screen.fill(WHITE)
-        pygame.display.set_caption('Sandbox')
-        clock = pygame.time.Clock()
-
-        while self.world.time < self.end_time:
-            self.execute_tick()
-            self.update_screen(clock, screen)
-            self.world.time += 1
-            display_world.plot_bacteria(self.world)
+    def execute(self, fps=60, every_n_ticks=None):
+        """Main execute function, runs in a loop until time has elapsed.
+
+        Renders the world in a pygame window and plots the bacteria after every tick. The
+        simulation is not slowed down by the window, see ``sandbox.render_world.PygameRenderer``.
+
+        :param float fps: The max number of frames drawn per second
+        :param int|None every_n_ticks: Draw a frame every that many ticks instead of by wall time
+        """
+        from sandbox import render_world  # pylint: disable=import-outside-toplevel
+        renderer = render_world.PygameRenderer(fps=fps, every_n_ticks=every_n_ticks)
+        self.run(observers=[renderer, display_world.PlotObserver()])
+
+    def run(self, ticks=None, observers=()):
+        """Run the simulation without any display, notifying only the attached observers.
+
+        Stops before ``end_time`` once ``stop_when`` holds. The started observers are ended
+        even if the run fails, so e.g. a ``sandbox.trajectory.TrajectoryRecorder`` closes its
+        file.
+
+        :param int|None ticks: Number of ticks to run, by default until ``end_time``
+        :param list[sandbox.observers.SimulationObserver] observers: Observers to notify on top
+            of the attached ones for this run only
+        :rtype: World
+        """
+        end_time = self.end_time if ticks is None else self.world.time + ticks
+        run_observers = self.observers + list(observers)
+        started = []
+        try:
+            for observer in run_observers:
+                observer.on_start(self)
+                started.append(observer)
+            self._run_ticks(end_time, run_observers)
+            self.sync_lifetimes()
+        finally:
+            if self.synchronous_tick is not None:
+                self.synchronous_tick.shutdown()
+            for observer in started:
+                observer.on_end(self)
+        return self.world
+
+    def _run_ticks(self, end_time, run_observers):
+        """Tick until ``end_time`` or until ``stop_when`` holds, notifying the observers.
+
+        :param int end_time: The time the run ends
+        :param list[sandbox.observers.SimulationObserver] run_observers: The observers to notify
+        """
+        instrumentation = self.world.instrumentation
+        observer_phases = ['observer.' + observer.__class__.__name__
+                           for observer in run_observers]
+        while self.world.time < end_time:
+            fast_forward_time = self.get_fast_forward_time(end_time)
+            if fast_forward_time is not None:
+                with instrumentation.phase('fast_forward'):
+                    self.world.time = fast_forward_time
+            else:
+                self.execute_tick()
+                self.world.time += 1
+            for observer, phase in zip(run_observers, observer_phases):
+                with instrumentation.phase(phase):
+                    observer.on_tick(self)
+            instrumentation.end_tick(self.world.time)
+            if self.options.stop_when is not None and self.options.stop_when(self):
+                break
+
+    def get_fast_forward_time(self, end_time):
+        """Get the time a world where nothing lives can jump to, when fast forwarding.
+
+        Nothing changes the land of such a world until the next spawn, so ticking up to it
+        would leave the world as it is.
+
+        :param int end_time: The time the run ends
+        :return: The time of the next spawn or the end, None if the next tick has to run
+        :rtype: int|None
+        """
+        if not self.options.fast_forward or not steady_state.is_quiescent(self.world):
+            return None
+        spawn_time = self.spawn_schedule.next_spawn_time(self.world.time)
+        fast_forward_time = end_time if spawn_time is None else min(spawn_time, end_time)
+        return fast_forward_time if fast_forward_time > self.world.time else None
 
     def execute_tick(self):
-        """Run one tick of the simulation."""
+        """Run one tick of the simulation.
+
+        Entities born during a phase are first ticked on the next phase iterating their kind,
+        the removals and births are compacted into the entity stores at the end of the tick.
+        With synchronous ticks or scheduled lifecycles the plants and bacteria objects are ticked
+        together in a single phase.
+        """
 
+        instrumentation = self.world.instrumentation
+        if self.synchronous_tick is not None:
+            with instrumentation.phase('tick_entities'):
+                self.synchronous_tick.execute_tick(self.world)
+        elif self.scheduler is not None:
+            with instrumentation.phase('tick_entities'):
+                self.scheduler.execute_tick(self.world)
+            if self.world.bacteria_engine is not None:
+                with instrumentation.phase('tick_bacteria'):
+                    self.world.bacteria_engine.execute_tick(self.world)
+        else:
+            with instrumentation.phase('tick_plants'):
+                self.tick_plants()
+            with instrumentation.phase('tick_bacteria'):
+                self.tick_bacteria()
+        # Seed the world with plants after some time
+        with instrumentation.phase('spawn_plants'):
+            self.spawn_plants()
+        with instrumentation.phase('compact_entities'):
+            self.compact_entities()
+
+    def tick_plants(self):
+        """Run one tick for every plant."""
         for plant in self.global_plants:
             plant.execute_tick(self.world)
-        for bacteria in self.global_bacteria:
-            bacteria.execute_tick(self.world)
-        # Seed the world with plants after some time
-        self.spawn_plants()
+
+    def tick_bacteria(self):
+        """Run one tick for every bacteria."""
+        if self.world.bacteria_engine is not None:
+            self.world.bacteria_engine.execute_tick(self.world)
+        else:
+            for bacteria in self.global_bacteria:
+                bacteria.execute_tick(self.world)
+
+    def compact_entities(self):
+        """Compact the deaths and births of the tick into the entity stores."""
+        if self.scheduler is not None:
+            self.scheduler.schedule_births(self.world)
+        self.global_plants.compact()
+        self.global_bacteria.compact()
+
+    def sync_lifetimes(self):
+        """Bring the lifetimes of the entities up to date between two scheduled ticks.
+
+        Only needed with scheduled lifecycles, where lifetimes are only updated by events.
+        """
+        if self.scheduler is not None:
+            self.scheduler.sync_lifetimes(self.world)
 
     def spawn_plants(self):
-        """Spawn plants."""
-        if 100 < self.world.time < 125:
-            for _ in range(0, 5):
-                rand_x_pos = random.randint(0, self.world.max_x_size - 1)
-                rand_y_pos = random.randint(0, self.world.max_y_size - 1)
-                self.spawn_grass_plant(rand_x_pos, rand_y_pos)
-        if 200 < self.world.time < 225:
-            for _ in range(0, 10):
-                rand_x_pos = random.randint(0, self.world.max_x_size - 1)
-                rand_y_pos = random.randint(0, self.world.max_y_size - 1)
-                self.spawn_tree(rand_x_pos, rand_y_pos)
+        """Seed the plants of the spawn schedule due at the time of the world."""
+        self.spawn_schedule.execute_tick(self.world)
 
     def spawn_grass_plant(self, x_position, y_position):
         """Spawn a single grass plant.
@@ -125,9 +570,11 @@ class SimulateWorld:
         :param int y_position: The y position of this grass plant
         """
         plant = simulate_plants.GrassPlant(x_position, y_position)
-        x_y_key = utils.get_x_y_key(x_position, y_position)
         self.world.global_plants.append(plant)
-        self.world.world_map[x_y_key].beings['grass'].append(plant)
+        self.world.stats.plant_born(plant.__class__.__name__)
+        self.world.instrumentation.count('births')
+        self.world.get_beings(x_position, y_position)['grass'].append(plant)
+        self.world.occupancy.add(plant.KIND, x_position, y_position)
 
     def spawn_tree(self, x_position, y_position):
         """Spawn a single tree.
@@ -136,23 +583,11 @@ class SimulateWorld:
         :param int y_position: The y position of this tree
         """
         tree = simulate_plants.TreePlant(x_position, y_position)
-        x_y_key = utils.get_x_y_key(x_position, y_position)
         self.world.global_plants.append(tree)
-        self.world.world_map[x_y_key].beings['tree'].append(tree)
-
-    def update_screen(self, clock, screen):
-        """Update the screen of the game."""
-        for x_position in range(self.world.max_x_size):
-            for y_position in range(self.world.max_y_size):
-                color = self.get_land_color(x_position, y_position)
-                pygame.draw.rect(screen,
-                                 color,
-                                 [WIDTH * x_position,
-                                  HEIGHT * y_position,
-                                  WIDTH,
-                                  HEIGHT])
-        clock.tick(60)
-        pygame.display.flip()
+        self.world.stats.plant_born(tree.__class__.__name__)
+        self.world.instrumentation.count('births')
+        self.world.get_beings(x_position, y_position)['tree'].append(tree)
+        self.world.occupancy.add(tree.KIND, x_position, y_position)
 
     def get_land_color(self, x_position, y_position):
         """Get the color of the land for the simulation.
@@ -161,23 +596,25 @@ class SimulateWorld:
         :param int y_position: The y position of their piece of land
         :rtype: tuple
         """
-        x_y_key = utils.get_x_y_key(x_position, y_position)
-        red_color = (self.world.world_map[x_y_key].phosphorus +
-                     self.world.world_map[x_y_key].potassium +
-                     self.world.world_map[x_y_key].nitrogen)
-        green_color = self.world.world_map[x_y_key].nitrogen
-        blue_color = self.world.world_map[x_y_key].potassium
+        world = self.world
+        red_color = (world.phosphorus[x_position, y_position] +
+                     world.potassium[x_position, y_position] +
+                     world.nitrogen[x_position, y_position])
+        green_color = world.nitrogen[x_position, y_position]
+        blue_color = world.potassium[x_position, y_position]
+        grass = world.occupancy.get('grass', x_position, y_position)
+        trees = world.occupancy.get('tree', x_position, y_position)
 
-        # red_color -= len(self.world.world_map[x_y_key].beings['grass']) * 400
-        # green_color += len(self.world.world_map[x_y_key].beings['grass']) * 45
-        # blue_color -= len(self.world.world_map[x_y_key].beings['grass']) * 60
+        # red_color -= grass * 400
+        # green_color += grass * 45
+        # blue_color -= grass * 60
 
-        if len(self.world.world_map[x_y_key].beings['grass']) >= 5:
+        if grass >= 5:
             red_color = 0
-            green_color = random.randint(180, 220)
+            green_color = world.rng.rendering.randint(180, 220)
             blue_color = 0
 
-        if len(self.world.world_map[x_y_key].beings['tree']) >= 2:
+        if trees >= 2:
             red_color = 139
             green_color = 69
             blue_color = 19
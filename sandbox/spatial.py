@@ -0,0 +1,327 @@
+"""Find the plants and bacteria living near a piece of land without scanning all of them.
+
+``SpatialIndex`` buckets the plant and bacteria objects of a world by square buckets of land,
+see ``World.get_spatial_index``, and answers radius, nearest neighbour and rectangle queries
+from the few buckets they cover. ``count_within`` answers radius queries for many positions at
+once from the per-cell counts of ``sandbox.occupancy.OccupancyIndex``, which also count the
+bacteria of a bacteria engine.
+
+The world wraps around its edges like ``utils.get_new_position`` wraps the children of a
+parent, so distances are measured on a torus: the children of a parent dispersing ``distance``
+land within a ``chebyshev`` radius ``distance`` of it.
+"""
+import numpy
+
+BUCKET_SIZE = 8
+METRICS = ('euclidean', 'chebyshev')
+
+
+def _get_axis_distance(first, second, size):
+    """Get the distance between two positions along one wrapping axis of a world.
+
+    :param int first: The first position
+    :param int second: The second position
+    :param int size: The size of the world along the axis
+    :rtype: int
+    """
+    difference = (first - second) % size
+    return min(difference, size - difference)
+
+
+def _is_within(x_distance, y_distance, radius, metric):
+    """Check if offsets along both axes are within a radius.
+
+    :param int x_distance: The distance along the x axis
+    :param int y_distance: The distance along the y axis
+    :param int|float radius: The radius
+    :param str metric: ``euclidean`` or ``chebyshev``
+    :rtype: bool
+    """
+    if metric == 'chebyshev':
+        return max(x_distance, y_distance) <= radius
+    return x_distance * x_distance + y_distance * y_distance <= radius * radius
+
+
+def _check_metric(metric):
+    """Check a metric is known.
+
+    :param str metric: The metric
+    :raises ValueError: If the metric is not one of ``METRICS``
+    """
+    if metric not in METRICS:
+        raise ValueError('Unknown metric {}, use one of {}'.format(metric, ', '.join(METRICS)))
+
+
+def count_within(counts, x_positions, y_positions, radius, metric='euclidean'):
+    """Count the things within a radius of many positions at once.
+
+    Builds cumulative sums of the counts once per call, then costs one array operation per row
+    of land within the radius, whatever the number of positions.
+
+    :param numpy.ndarray counts: The counts of every piece of land, e.g.
+        ``world.occupancy.get_counts('grass')``
+    :param numpy.ndarray x_positions: The x positions
+    :param numpy.ndarray y_positions: The y positions
+    :param int radius: The radius, the positions themselves are within radius 0
+    :param str metric: ``euclidean`` or ``chebyshev``
+    :return: The number of things within the radius of each position
+    :rtype: numpy.ndarray
+    :raises ValueError: If the metric is unknown or the radius negative
+    """
+    _check_metric(metric)
+    if radius < 0:
+        raise ValueError('The radius can not be negative')
+    max_x_size, max_y_size = counts.shape
+    x_positions = numpy.asarray(x_positions, dtype=numpy.int64)
+    y_positions = numpy.asarray(y_positions, dtype=numpy.int64)
+    # Sums of the counts of every row over windows starting anywhere and wrapping once
+    cumulative = numpy.zeros((max_x_size, 2 * max_y_size + 1), dtype=numpy.int64)
+    numpy.cumsum(numpy.concatenate((counts, counts), axis=1), axis=1, out=cumulative[:, 1:])
+
+    totals = numpy.zeros(len(x_positions), dtype=numpy.int64)
+    if 2 * radius + 1 < max_x_size:
+        x_offsets = range(-radius, radius + 1)
+    else:
+        x_offsets = range(max_x_size)
+    for x_offset in x_offsets:
+        x_distance = _get_axis_distance(x_offset, 0, max_x_size)
+        if x_distance > radius:
+            continue
+        if metric == 'chebyshev':
+            half_width = radius
+        else:
+            half_width = int(numpy.sqrt(radius * radius - x_distance * x_distance))
+        width = min(2 * half_width + 1, max_y_size)
+        rows = (x_positions + x_offset) % max_x_size
+        starts = (y_positions - half_width) % max_y_size
+        totals += cumulative[rows, starts + width] - cumulative[rows, starts]
+    return totals
+
+
+class SpatialIndex:
+    """Plant and bacteria objects bucketed by the square of land they live in.
+
+    Each bucket covers ``bucket_size`` by ``bucket_size`` pieces of land and keeps its entities
+    in the order they were added, so queries return them in a reproducible order. An entity
+    must be removed or moved through the index, see ``move``, while it is indexed.
+
+    :param int max_x_size: The x size of the world
+    :param int max_y_size: The y size of the world
+    :param int bucket_size: The x and y size of a bucket
+    """
+    def __init__(self, max_x_size, max_y_size, bucket_size=BUCKET_SIZE):
+        self.max_x_size = max_x_size
+        self.max_y_size = max_y_size
+        self.bucket_size = bucket_size
+        self.shape = (-(-max_x_size // bucket_size), -(-max_y_size // bucket_size))
+        self.buckets = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, entity):
+        return entity in self.buckets.get(self._get_bucket_key(entity), ())
+
+    def _get_bucket_key(self, entity):
+        """Get the key of the bucket of an entity.
+
+        :param Any entity: The entity
+        :rtype: tuple
+        """
+        return entity.x_position // self.bucket_size, entity.y_position // self.bucket_size
+
+    def add(self, entity):
+        """Index an entity at its position.
+
+        :param Any entity: The plant or bacteria
+        """
+        key = self._get_bucket_key(entity)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = {}
+        if entity not in bucket:
+            bucket[entity] = None
+            self._count += 1
+
+    def add_many(self, entities):
+        """Index many entities at their positions.
+
+        :param collections.abc.Iterable entities: The plants and bacteria
+        """
+        for entity in entities:
+            self.add(entity)
+
+    def remove(self, entity):
+        """Stop indexing an entity.
+
+        :param Any entity: The plant or bacteria
+        :raises ValueError: If the entity is not indexed at its position
+        """
+        key = self._get_bucket_key(entity)
+        bucket = self.buckets.get(key)
+        if bucket is None or entity not in bucket:
+            raise ValueError('{} is not indexed at ({}, {})'.format(
+                entity, entity.x_position, entity.y_position))
+        del bucket[entity]
+        if not bucket:
+            del self.buckets[key]
+        self._count -= 1
+
+    def move(self, entity, x_position, y_position):
+        """Move an indexed entity to another piece of land.
+
+        :param Any entity: The plant or bacteria
+        :param int x_position: The new x position
+        :param int y_position: The new y position
+        """
+        self.remove(entity)
+        entity.x_position = x_position
+        entity.y_position = y_position
+        self.add(entity)
+
+    def clear(self):
+        """Stop indexing every entity."""
+        self.buckets = {}
+        self._count = 0
+
+    def _get_bucket_range(self, start, length, size, buckets):
+        """Get the buckets along one axis covering a wrapping range of positions.
+
+        :param int start: The first position of the range
+        :param int length: The number of positions, at most the size of the world
+        :param int size: The size of the world along the axis
+        :param int buckets: The number of buckets along the axis
+        :rtype: list[int]
+        """
+        if length >= size:
+            return list(range(buckets))
+        start %= size
+        first = start // self.bucket_size
+        last = (start + length - 1) % size // self.bucket_size
+        if start + length <= size:
+            return list(range(first, last + 1))
+        return list(dict.fromkeys(list(range(first, buckets)) + list(range(last + 1))))
+
+    def _iter_range(self, x_start, x_length, y_start, y_length, kinds):
+        """Iterate over the entities in a wrapping rectangle of land.
+
+        :param int x_start: The first x position of the rectangle
+        :param int x_length: The number of x positions, at most the x size of the world
+        :param int y_start: The first y position of the rectangle
+        :param int y_length: The number of y positions, at most the y size of the world
+        :param tuple|None kinds: Only these kinds, all of them by default
+        :rtype: collections.abc.Iterator
+        """
+        x_buckets = self._get_bucket_range(x_start, x_length, self.max_x_size, self.shape[0])
+        y_buckets = self._get_bucket_range(y_start, y_length, self.max_y_size, self.shape[1])
+        for bucket_x in x_buckets:
+            for bucket_y in y_buckets:
+                for entity in self.buckets.get((bucket_x, bucket_y), ()):
+                    if (kinds is None or entity.KIND in kinds) and \
+                       (entity.x_position - x_start) % self.max_x_size < x_length and \
+                       (entity.y_position - y_start) % self.max_y_size < y_length:
+                        yield entity
+
+    def query_rect(self, x_start, y_start, x_end, y_end, kinds=None):
+        """Get the entities in a rectangle of land.
+
+        The rectangle wraps around the edges of the world when an end is before its start,
+        e.g. x from ``max_x_size - 2`` to ``1`` covers four columns.
+
+        :param int x_start: The first x position, included
+        :param int y_start: The first y position, included
+        :param int x_end: The last x position, included
+        :param int y_end: The last y position, included
+        :param tuple|None kinds: Only these kinds, e.g. ``('grass',)``, all of them by default
+        :rtype: list
+        """
+        return list(self._iter_range(x_start, (x_end - x_start) % self.max_x_size + 1,
+                                     y_start, (y_end - y_start) % self.max_y_size + 1, kinds))
+
+    def _get_candidates(self, x_position, y_position, radius, kinds, metric):
+        """Get the entities within a radius of a position, with their distances.
+
+        :param int x_position: The x position
+        :param int y_position: The y position
+        :param int|float radius: The radius
+        :param tuple|None kinds: Only these kinds, all of them by default
+        :param str metric: ``euclidean`` or ``chebyshev``
+        :return: Pairs of the squared euclidean or the chebyshev distance and the entity
+        :rtype: list[tuple]
+        """
+        reach = int(radius)
+        candidates = []
+        for entity in self._iter_range(x_position - reach, min(2 * reach + 1, self.max_x_size),
+                                       y_position - reach, min(2 * reach + 1, self.max_y_size),
+                                       kinds):
+            x_distance = _get_axis_distance(entity.x_position, x_position, self.max_x_size)
+            y_distance = _get_axis_distance(entity.y_position, y_position, self.max_y_size)
+            if _is_within(x_distance, y_distance, radius, metric):
+                if metric == 'chebyshev':
+                    distance = max(x_distance, y_distance)
+                else:
+                    distance = x_distance * x_distance + y_distance * y_distance
+                candidates.append((distance, entity))
+        return candidates
+
+    def query_radius(self, x_position, y_position, radius, kinds=None, metric='euclidean'):
+        """Get the entities within a radius of a piece of land, itself included.
+
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :param int|float radius: The radius
+        :param tuple|None kinds: Only these kinds, e.g. ``('grass',)``, all of them by default
+        :param str metric: ``euclidean`` or ``chebyshev``
+        :rtype: list
+        :raises ValueError: If the metric is unknown
+        """
+        _check_metric(metric)
+        return [entity for _, entity in
+                self._get_candidates(x_position, y_position, radius, kinds, metric)]
+
+    def query_radius_many(self, x_positions, y_positions, radius, kinds=None,
+                          metric='euclidean'):
+        """Get the entities within a radius of many pieces of land.
+
+        Use ``count_within`` over the counts of the occupancy of the world when the numbers of
+        entities are enough.
+
+        :param numpy.ndarray x_positions: The x positions of the pieces of land
+        :param numpy.ndarray y_positions: The y positions of the pieces of land
+        :param int|float radius: The radius
+        :param tuple|None kinds: Only these kinds, all of them by default
+        :param str metric: ``euclidean`` or ``chebyshev``
+        :return: The list of the entities near each piece of land
+        :rtype: list[list]
+        """
+        return [self.query_radius(x_position, y_position, radius, kinds, metric)
+                for x_position, y_position in zip(numpy.asarray(x_positions).tolist(),
+                                                  numpy.asarray(y_positions).tolist())]
+
+    def query_nearest(self, x_position, y_position, count=1, kinds=None, metric='euclidean'):
+        """Get the entities nearest to a piece of land, nearest first.
+
+        Entities at the same distance come in the order of their buckets, then of their
+        addition. The radius searched starts at one bucket and doubles until enough entities
+        are found.
+
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :param int count: The number of entities, less if fewer are indexed
+        :param tuple|None kinds: Only these kinds, all of them by default
+        :param str metric: ``euclidean`` or ``chebyshev``
+        :rtype: list
+        :raises ValueError: If the metric is unknown
+        """
+        _check_metric(metric)
+        # Far enough to reach every piece of land of the world from any other
+        max_radius = self.max_x_size // 2 + self.max_y_size // 2
+        radius = self.bucket_size
+        while True:
+            candidates = self._get_candidates(x_position, y_position, radius, kinds, metric)
+            if len(candidates) >= count or radius >= max_radius:
+                break
+            radius = min(2 * radius, max_radius)
+        candidates.sort(key=lambda candidate: candidate[0])
+        return [entity for _, entity in candidates[:count]]
@@ -0,0 +1,134 @@
+"""Registry of the species of plants and bacteria, and species defined as data.
+
+A species is a subclass of ``sandbox.simulate_plants.Plant`` or
+``sandbox.simulate_bacteria.Bacteria`` setting only constants, its traits. The base classes
+live by these traits, ``sandbox.bacteria_engine.BacteriaEngine`` and
+``sandbox.cohort_engine.CohortEngine`` update every bacteria type as one batch and
+``sandbox.scheduler.LifecycleScheduler`` feeds the plants species by species, so a new species
+needs no code of its own. ``define_species`` builds and registers one from its traits, e.g. read
+from a JSON file by ``load_species``::
+
+    [{"name": "SulfurBacteria", "kingdom": "bacteria", "kind": "sulfur_bacteria",
+      "nutrient": "phosphorus", "max_lifetime": 6, "reproduction_rate": 3}]
+
+The engines simulate the species registered when they are built.
+"""
+import json
+
+from sandbox import simulate_bacteria
+from sandbox import simulate_plants
+
+KINGDOMS = {'bacteria': simulate_bacteria.Bacteria, 'plant': simulate_plants.Plant}
+# The traits of a species and the constants holding them
+TRAITS = {'kind': 'KIND',
+          'max_lifetime': 'MAX_LIFETIME',
+          'reproduction_rate': 'REPRODUCTION_RATE',
+          'dispersal': 'DISPERSAL',
+          'death_concentration': 'DEATH_CONCENTRATION',
+          'nutrient': 'NUTRIENT',
+          'death_deposit': 'DEATH_DEPOSIT',
+          'consumption': 'CONSUMPTION',
+          'crowding': 'CROWDING',
+          'death_deposits': 'DEATH_DEPOSITS',
+          'death_spawns': 'DEATH_SPAWNS',
+          'death_spawn_types': 'DEATH_SPAWN_TYPES'}
+REQUIRED_TRAITS = {'bacteria': ('kind', 'max_lifetime', 'nutrient'),
+                   'plant': ('kind', 'max_lifetime')}
+REGISTRY = {}
+
+
+def register(species):
+    """Register a species by its name.
+
+    :param type species: The plant or bacteria class
+    :return: The species
+    :rtype: type
+    :raises ValueError: If another species has the same name or kind
+    """
+    for registered in REGISTRY.values():
+        if registered is not species and (registered.__name__ == species.__name__ or
+                                          registered.KIND == species.KIND):
+            raise ValueError('{} clashes with the registered {}'.format(
+                species.__name__, registered.__name__))
+    REGISTRY[species.__name__] = species
+    return species
+
+
+def __getattr__(name):
+    """Resolve the species defined as data through the registry.
+
+    They are found by name like the built in species, so they pickle, e.g. to domain workers.
+
+    :param str name: The name of the species
+    :rtype: type
+    :raises AttributeError: If no species has this name
+    """
+    if name in REGISTRY:
+        return REGISTRY[name]
+    raise AttributeError('module {} has no attribute {}'.format(__name__, name))
+
+
+def get_species(kingdom=None):
+    """Get the registered species, in the order they were registered.
+
+    :param str|None kingdom: Only get the ``bacteria`` or the ``plant`` species
+    :rtype: tuple
+    """
+    if kingdom is None:
+        return tuple(REGISTRY.values())
+    return tuple(species for species in REGISTRY.values()
+                 if issubclass(species, KINGDOMS[kingdom]))
+
+
+def define_species(name, kingdom, **traits):
+    """Build and register a species from its traits.
+
+    Pairs of layers and amounts, e.g. ``consumption``, can be given as lists, and the
+    ``death_spawn_types`` by the names of registered bacteria species.
+
+    :param str name: The name of the class of the species
+    :param str kingdom: ``bacteria`` or ``plant``
+    :param traits: The traits, see ``TRAITS``, the others are the ones of the kingdom
+    :return: The class of the species
+    :rtype: type
+    :raises ValueError: If the kingdom or a trait is unknown, a required trait is missing or the
+        name is taken, by a species or by this module
+    """
+    if kingdom not in KINGDOMS:
+        raise ValueError('Unknown kingdom {}'.format(kingdom))
+    if name in globals():
+        raise ValueError('{} clashes with a name of {}'.format(name, __name__))
+    base = KINGDOMS[kingdom]
+    missing = [trait for trait in REQUIRED_TRAITS[kingdom] if traits.get(trait) is None]
+    if missing:
+        raise ValueError('{} misses the traits {}'.format(name, ', '.join(missing)))
+    constants = {'__slots__': (), '__module__': __name__,
+                 '__doc__': 'Species {} defined as data.'.format(name)}
+    for trait, value in traits.items():
+        if trait not in TRAITS or not hasattr(base, TRAITS[trait]):
+            raise ValueError('Unknown trait {} of {}'.format(trait, kingdom))
+        if trait in ('consumption', 'death_deposits'):
+            value = tuple((layer, amount) for layer, amount in value)
+        elif trait == 'death_spawn_types':
+            value = tuple(REGISTRY[spawn] if isinstance(spawn, str) else spawn
+                          for spawn in value)
+        constants[TRAITS[trait]] = value
+    return register(type(name, (base,), constants))
+
+
+def load_species(path):
+    """Define the species listed in a JSON file, see ``define_species``.
+
+    :param str path: The path of the file, a list of objects holding a ``name``, a ``kingdom``
+        and the traits of a species
+    :return: The classes of the species
+    :rtype: list[type]
+    """
+    with open(path, encoding='utf-8') as species_file:
+        return [define_species(**definition) for definition in json.load(species_file)]
+
+
+for _species in (simulate_bacteria.NitrogenBacteria, simulate_bacteria.PhosphorusBacteria,
+                 simulate_bacteria.PotassiumBacteria, simulate_plants.GrassPlant,
+                 simulate_plants.TreePlant):
+    register(_species)
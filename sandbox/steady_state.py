@@ -0,0 +1,83 @@
+"""Find the stretches of a run where nothing happens, and the runs which settled.
+
+A world where nothing lives does not change: the land only changes through the plants and
+bacteria living on it. ``SimulationOptions(fast_forward=True)`` jumps the time of such a world
+straight to the next tick where its spawn schedule seeds something, see ``is_quiescent``.
+
+``SimulationOptions(stop_when=...)`` ends a run early once a predicate of the simulation holds,
+e.g. ``is_extinct`` or a ``StableTotals``.
+"""
+import collections
+
+
+def is_quiescent(world):
+    """Check if nothing lives in a world, counting the bacteria of its bacteria engine.
+
+    :param sandbox.simulate_world.World world: The world object
+    :rtype: bool
+    """
+    return not world.occupancy.get_active_chunks().any()
+
+
+def is_extinct(simulation):
+    """Check if nothing lives in the world of a simulation and nothing will be spawned.
+
+    :param sandbox.simulate_world.SimulateWorld simulation: The simulation
+    :rtype: bool
+    """
+    return (is_quiescent(simulation.world) and
+            simulation.spawn_schedule.next_spawn_time(simulation.world.time) is None)
+
+
+def _flatten(totals, prefix=''):
+    """Flatten the nested totals of ``WorldStats.get_totals`` into dotted names.
+
+    :param dict totals: The totals
+    :param str prefix: The prefix of the names
+    :rtype: dict
+    """
+    flat = {}
+    for name, value in totals.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, '{}{}.'.format(prefix, name)))
+        else:
+            flat[prefix + name] = value
+    return flat
+
+
+class StableTotals:
+    """Predicate holding once the running statistics of a world stopped moving.
+
+    Holds when the average of every total of ``WorldStats.get_totals`` over the last ``window``
+    calls is within ``tolerance`` of its average over the ``window`` calls before, and nothing is
+    left to spawn. Averaging lets populations which keep cycling, like grass reproducing in
+    waves, settle. Call it once per tick, as ``stop_when`` does.
+
+    :param int window: The number of ticks averaged, longer than the cycles of the populations
+    :param float tolerance: The relative change of the averages allowed
+    :param tuple|None names: Only watch these totals, named like ``plants.GrassPlant`` or
+        ``nitrogen``, all of them by default
+    """
+    def __init__(self, window=100, tolerance=0.01, names=None):
+        self.window = window
+        self.tolerance = tolerance
+        self.names = names
+        self.history = collections.deque(maxlen=2 * window)
+
+    def __call__(self, simulation):
+        """Record the totals of the tick and check if they are stable.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        :rtype: bool
+        """
+        self.history.append(_flatten(simulation.world.stats.get_totals()))
+        if len(self.history) < self.history.maxlen or \
+           simulation.spawn_schedule.next_spawn_time(simulation.world.time) is not None:
+            return False
+        history = list(self.history)
+        for name in self.names or set().union(*history):
+            previous = sum(totals.get(name, 0) for totals in history[:self.window]) / self.window
+            latest = sum(totals.get(name, 0) for totals in history[self.window:]) / self.window
+            if abs(latest - previous) > self.tolerance * abs(previous):
+                return False
+        return True
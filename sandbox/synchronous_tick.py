@@ -0,0 +1,344 @@
+"""Order independent ticks, updating stripes of the world in parallel from the previous state.
+
+In a synchronous tick every plant and bacteria reads the layers and occupancy of the world as
+they were at the start of the tick, whatever the others do during it. The world is split into
+stripes of rows, the entities of each stripe are ticked against a ``StripeWorld`` buffering
+their nutrient deltas, births and deaths, and the buffers are applied to the world at the end
+of the tick in stripe order. Writes to the layers are taken as increments, e.g.
+``world.nitrogen[position] -= amount``, so the changes of every stripe add up.
+
+Stripes do not depend on the number of workers and each has its own random streams, see
+``sandbox.world_random.WorldRandom.get_partition_random``, so a run gives the same result with
+any number of threads.
+"""
+import collections
+import concurrent.futures
+
+import numpy
+
+from sandbox import world_stats
+
+
+class _BufferedLayer:
+    """Layer reading the previous state of the world and recording the changes made to it.
+
+    :param numpy.ndarray values: The layer of the world, only read
+    """
+    __slots__ = ('values', 'x_positions', 'y_positions', 'deltas')
+
+    def __init__(self, values):
+        self.values = values
+        self.x_positions = []
+        self.y_positions = []
+        self.deltas = []
+
+    def __getitem__(self, position):
+        return self.values[position]
+
+    def __setitem__(self, position, value):
+        x_position, y_position = position
+        self.x_positions.append(x_position)
+        self.y_positions.append(y_position)
+        self.deltas.append(value - self.values[position])
+
+    def apply(self, layer):
+        """Add the recorded changes to a layer, in the order they were made.
+
+        :param numpy.ndarray layer: The layer of the world
+        """
+        if self.deltas:
+            numpy.add.at(layer, (self.x_positions, self.y_positions),
+                         numpy.array(self.deltas, dtype=layer.dtype))
+
+
+class _BufferedStore:
+    """Entity store recording the entities born and dying during the tick."""
+    __slots__ = ('births', 'deaths')
+
+    def __init__(self):
+        self.births = []
+        self.deaths = []
+
+    def append(self, entity):
+        """Record a birth.
+
+        :param object entity: The new entity
+        """
+        self.births.append(entity)
+
+    def remove(self, entity):
+        """Record a death.
+
+        :param object entity: The dying entity
+        """
+        self.deaths.append(entity)
+
+
+class _BufferedBeingsList:
+    """List of the beings of one kind in a piece of land, recording the changes made to it.
+
+    :param list operations: The operations recorded for the whole stripe
+    :param tuple key: The position and the kind of the beings
+    """
+    __slots__ = ('operations', 'key')
+
+    def __init__(self, operations, key):
+        self.operations = operations
+        self.key = key
+
+    def append(self, entity):
+        """Record an entity arriving.
+
+        :param object entity: The entity
+        """
+        self.operations.append((self.key, True, entity))
+
+    def remove(self, entity):
+        """Record an entity leaving.
+
+        :param object entity: The entity
+        """
+        self.operations.append((self.key, False, entity))
+
+
+class _BufferedBeings:
+    """Beings of a piece of land, recording the changes made to them.
+
+    :param list operations: The operations recorded for the whole stripe
+    :param int x_position: The x position of the piece of land
+    :param int y_position: The y position of the piece of land
+    """
+    __slots__ = ('operations', 'x_position', 'y_position')
+
+    def __init__(self, operations, x_position, y_position):
+        self.operations = operations
+        self.x_position = x_position
+        self.y_position = y_position
+
+    def __getitem__(self, kind):
+        return _BufferedBeingsList(self.operations, (self.x_position, self.y_position, kind))
+
+
+class _BufferedOccupancy:
+    """Occupancy reading the previous state of the world and recording the changes made to it.
+
+    :param sandbox.occupancy.OccupancyIndex occupancy: The occupancy of the world, only read
+    """
+    __slots__ = ('occupancy', 'operations')
+
+    def __init__(self, occupancy):
+        self.occupancy = occupancy
+        self.operations = []
+
+    def get_counts(self, kind):
+        """Get the counts of one kind at the start of the tick.
+
+        :param str kind: The kind of being
+        :rtype: numpy.ndarray
+        """
+        return self.occupancy.get_counts(kind)
+
+    def get(self, kind, x_position, y_position):
+        """Count the things of one kind in a piece of land at the start of the tick.
+
+        :param str kind: The kind of being
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :rtype: int
+        """
+        return self.occupancy.get(kind, x_position, y_position)
+
+    def add(self, kind, x_position, y_position, count=1):
+        """Record things of one kind arriving in a piece of land.
+
+        :param str kind: The kind of being
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :param int count: The number of things
+        """
+        self.operations.append((kind, x_position, y_position, count))
+
+    def remove(self, kind, x_position, y_position, count=1):
+        """Record things of one kind leaving a piece of land.
+
+        :param str kind: The kind of being
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :param int count: The number of things
+        """
+        self.operations.append((kind, x_position, y_position, -count))
+
+
+class _BufferedInstrumentation:
+    """Instrumentation counting the events of a stripe."""
+    __slots__ = ('counters',)
+
+    def __init__(self):
+        self.counters = collections.Counter()
+
+    def count(self, name, amount=1):
+        """Count an event.
+
+        :param str name: The name of the counter
+        :param int amount: The number of events
+        """
+        self.counters[name] += amount
+
+
+def apply_counts(world, stats, counters):
+    """Add the statistics and the instrumentation counters of a stripe to the world.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param sandbox.world_stats.WorldStats stats: The statistics of the stripe
+    :param collections.Counter counters: The instrumentation counters of the stripe
+    """
+    for name, count in stats.bacteria.items():
+        world.stats.bacteria_born(name, count)
+    for name, count in stats.plants.items():
+        world.stats.plant_born(name, count)
+    for layer, amount in stats.layers.items():
+        world.stats.add_to_layer(layer, amount)
+    for name, amount in counters.items():
+        world.instrumentation.count(name, amount)
+
+
+class StripeWorld:
+    """Stand in for the world while the entities of one stripe are ticked.
+
+    Entities see the same attributes as on a ``sandbox.simulate_world.World``, reading the
+    state at the start of the tick while their changes are buffered until ``apply``.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param int stripe: The index of the stripe
+    """
+    def __init__(self, world, stripe):
+        self.max_x_size = world.max_x_size
+        self.max_y_size = world.max_y_size
+        self.time = world.time
+        self.layers = tuple(world.stats.layers)
+        for layer in self.layers:
+            setattr(self, layer, _BufferedLayer(getattr(world, layer)))
+        self.global_plants = _BufferedStore()
+        self.global_bacteria = _BufferedStore()
+        self.stats = world_stats.WorldStats(self.layers)
+        self.occupancy = _BufferedOccupancy(world.occupancy)
+        self.instrumentation = _BufferedInstrumentation()
+        self.rng = world.rng.get_partition_random(world.time, stripe)
+        self.beings_operations = []
+
+    def get_beings(self, x_position, y_position):
+        """Get the things living in a piece of land, recording the changes made to them.
+
+        :param int x_position: The x position of the piece of land
+        :param int y_position: The y position of the piece of land
+        :rtype: _BufferedBeings
+        """
+        return _BufferedBeings(self.beings_operations, x_position, y_position)
+
+    def apply(self, world):
+        """Apply the buffered changes to the world.
+
+        :param sandbox.simulate_world.World world: The world object
+        """
+        for layer in self.layers:
+            buffered = getattr(self, layer)
+            buffered.apply(getattr(world, layer))
+            if buffered.deltas:
+                world.chunks.mark_changed_many(numpy.array(buffered.x_positions),
+                                               numpy.array(buffered.y_positions))
+        apply_counts(world, self.stats, self.instrumentation.counters)
+
+        for buffered, store in ((self.global_plants, world.global_plants),
+                                (self.global_bacteria, world.global_bacteria)):
+            for entity in buffered.deaths:
+                store.remove(entity)
+            store.extend(buffered.births)
+        for (x_position, y_position, kind), arrives, entity in self.beings_operations:
+            beings = world.get_beings(x_position, y_position)[kind]
+            if arrives:
+                beings.append(entity)
+            else:
+                beings.remove(entity)
+        for kind, x_position, y_position, count in self.occupancy.operations:
+            if count < 0:
+                world.occupancy.remove(kind, x_position, y_position, -count)
+            else:
+                world.occupancy.add(kind, x_position, y_position, count)
+
+
+class StripedTick:
+    """Tick the plants and bacteria of a world stripe by stripe over a thread pool.
+
+    :param int workers: The number of threads, the stripes are ticked in the calling thread
+        with 1
+    :param int|None stripe_height: The number of rows of a stripe, the chunk size of the world
+        by default
+    """
+    def __init__(self, workers=1, stripe_height=None):
+        self.workers = workers
+        self.stripe_height = stripe_height
+        self._executor = None
+
+    def split(self, world):
+        """Split the living plants and bacteria of a world into stripes.
+
+        :param sandbox.simulate_world.World world: The world object
+        :return: The plants and bacteria of every stripe, in the order of the world
+        :rtype: list[tuple]
+        """
+        stripe_height = self.stripe_height or world.chunks.chunk_size
+        stripes = [([], []) for _ in range(-(-world.max_x_size // stripe_height))]
+        kinds = set()
+        for index, entities in enumerate((world.global_plants, world.global_bacteria)):
+            for entity in entities:
+                stripes[entity.x_position // stripe_height][index].append(entity)
+                kinds.add(entity.KIND)
+        # Allocate the counts now, the stripes only read the occupancy
+        for kind in kinds:
+            world.occupancy.get_counts(kind)
+        return stripes
+
+    @staticmethod
+    def tick_stripe(world, stripe, plants, bacteria):
+        """Tick the entities of one stripe against a buffered view of the world.
+
+        :param sandbox.simulate_world.World world: The world object, only read
+        :param int stripe: The index of the stripe
+        :param list plants: The plants of the stripe
+        :param list bacteria: The bacteria of the stripe
+        :rtype: StripeWorld
+        """
+        stripe_world = StripeWorld(world, stripe)
+        for plant in plants:
+            plant.execute_tick(stripe_world)
+        for single in bacteria:
+            single.execute_tick(stripe_world)
+        return stripe_world
+
+    def execute_tick(self, world):
+        """Tick every plant and bacteria of the world from the state at the start of the tick.
+
+        Entities born during the tick are first ticked on the next one.
+
+        :param sandbox.simulate_world.World world: The world object
+        """
+        stripes = [(world, stripe, plants, bacteria)
+                   for stripe, (plants, bacteria) in enumerate(self.split(world))
+                   if plants or bacteria]
+        if self.workers > 1:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers)
+            # Wait for every stripe before changing the world they read
+            stripe_worlds = list(self._executor.map(lambda args: self.tick_stripe(*args),
+                                                    stripes))
+        else:
+            stripe_worlds = [self.tick_stripe(*args) for args in stripes]
+        for stripe_world in stripe_worlds:
+            stripe_world.apply(world)
+
+    def shutdown(self):
+        """Stop the threads of the pool."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,320 @@
+"""Stream the statistics of a running simulation to any number of subscribers.
+
+``TelemetryPublisher`` serves, on a localhost socket, one JSON message per line for every tick
+and every ``frame_every`` ticks a frame of the land downsampled by ``frame_scale``. With
+``websocket=True`` it speaks the websocket protocol instead, one text message per JSON message,
+so a browser dashboard can subscribe with ``new WebSocket('ws://localhost:port')``.
+
+The server runs an asyncio loop in a background thread. The simulation only hands it a
+snapshot of the tick, never waits for it, and every subscriber has a bounded queue dropping its
+oldest messages when it falls behind, so slow subscribers never slow the simulation down.
+Follow a run from a terminal with::
+
+    python -m sandbox.telemetry --connect localhost:8765
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import threading
+
+import numpy
+
+from sandbox import observers
+
+QUEUE_SIZE = 64
+FRAME_CHANNELS = ('nitrogen', 'phosphorus', 'potassium', 'grass', 'tree')
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+WEBSOCKET_TEXT = 0x1
+WEBSOCKET_CLOSE = 0x8
+
+
+def downsample(values, scale):
+    """Average an array of the shape of the world over blocks of ``scale`` x ``scale``.
+
+    :param numpy.ndarray values: Array of shape (max_x_size, max_y_size)
+    :param int scale: The x and y size of a block, the edges are padded with zeros
+    :rtype: numpy.ndarray
+    """
+    if scale == 1:
+        return values.astype(numpy.float32)
+    x_blocks, y_blocks = -(-values.shape[0] // scale), -(-values.shape[1] // scale)
+    padded = numpy.zeros((x_blocks * scale, y_blocks * scale), dtype=numpy.float64)
+    padded[:values.shape[0], :values.shape[1]] = values
+    return padded.reshape(x_blocks, scale, y_blocks, scale).mean(axis=(1, 3)).astype(
+        numpy.float32)
+
+
+def get_frame(world, channels=FRAME_CHANNELS, scale=1):
+    """Get a downsampled frame of the land of a world.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param tuple channels: Layers of the world or kinds of beings counted in each piece of land
+    :param int scale: The x and y size of the blocks of land averaged into a pixel
+    :return: The frame message, every channel as base64 float32 in row major order
+    :rtype: dict
+    """
+    frame = {'type': 'frame', 'time': world.time, 'scale': scale, 'channels': {}}
+    for channel in channels:
+        if channel in world.stats.layers:
+            values = downsample(getattr(world, channel), scale)
+        else:
+            values = downsample(world.occupancy.get_counts(channel), scale)
+        frame['channels'][channel] = {'dtype': values.dtype.str, 'shape': list(values.shape),
+                                      'data': base64.b64encode(values.tobytes()).decode()}
+    return frame
+
+
+def _encode_websocket_frame(payload, opcode=WEBSOCKET_TEXT):
+    """Encode a final unmasked websocket frame, as sent by a server.
+
+    :param bytes payload: The payload
+    :param int opcode: The opcode of the frame
+    :rtype: bytes
+    """
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 1 << 16:
+        header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, 'big')
+    else:
+        header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, 'big')
+    return header + payload
+
+
+class _Subscriber:
+    """A connected subscriber and its bounded queue of pending messages.
+
+    :param asyncio.StreamWriter writer: The stream to the subscriber
+    :param int queue_size: The max number of pending messages
+    :param bool websocket: Send websocket frames instead of lines
+    """
+    def __init__(self, writer, queue_size, websocket):
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.websocket = websocket
+        self.dropped = 0
+
+    def put(self, message):
+        """Queue an encoded message, dropping the oldest one if the queue is full.
+
+        :param bytes message: The encoded message
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def send_all(self):
+        """Send the queued messages as they come, until the subscriber goes away."""
+        while True:
+            message = await self.queue.get()
+            if self.websocket:
+                self.writer.write(_encode_websocket_frame(message))
+            else:
+                self.writer.write(message + b'\n')
+            await self.writer.drain()
+
+
+class TelemetryPublisher(observers.SimulationObserver):
+    """Publish the statistics of every tick and downsampled frames to socket subscribers.
+
+    Every tick message holds the ``time`` of the world, its running statistics ``stats`` and,
+    when the world is instrumented, the latest ``profile`` of ``sandbox.instrumentation``.
+
+    :param str host: The host to listen on
+    :param int port: The port to listen on, a free one by default, see ``address``
+    :param bool websocket: Speak the websocket protocol instead of JSON lines
+    :param int queue_size: The max number of messages pending for each subscriber before the
+        oldest ones are dropped
+    :param int|None frame_every: Publish a frame every that many ticks, never by default
+    :param int frame_scale: The x and y size of the blocks of land averaged into a pixel
+    :param tuple frame_channels: The layers and kinds of beings in every frame
+    """
+    def __init__(self, host='127.0.0.1', port=0, websocket=False, queue_size=QUEUE_SIZE,
+                 frame_every=None, frame_scale=1, frame_channels=FRAME_CHANNELS):
+        self.host = host
+        self.port = port
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.frame_every = frame_every
+        self.frame_scale = frame_scale
+        self.frame_channels = frame_channels
+        self.address = None
+        self.subscribers = set()
+        self.dropped = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._connections = {}
+
+    def start(self):
+        """Start serving in a background thread, once listening.
+
+        :return: The host and port the publisher listens on
+        :rtype: tuple
+        """
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(asyncio.start_server(
+                self._serve, self.host, self.port, family=socket.AF_INET))
+            self.address = self._server.sockets[0].getsockname()[:2]
+            self._thread = threading.Thread(target=self._loop.run_forever,
+                                            name='telemetry', daemon=True)
+            self._thread.start()
+        return self.address
+
+    def close(self):
+        """Disconnect every subscriber and stop serving."""
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = self._loop = self._server = None
+
+    async def _shutdown(self):
+        """Close the server and the connections of the subscribers."""
+        self._server.close()
+        # Drop what the subscribers did not read yet instead of waiting for them
+        for writer in self._connections.values():
+            writer.transport.abort()
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=1.0)
+        await self._server.wait_closed()
+
+    def publish(self, message):
+        """Queue a message for every subscriber, without waiting for them.
+
+        :param dict message: The message, encoded as JSON by the serving thread
+        """
+        if self._thread is not None and self.subscribers:
+            self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    def _broadcast(self, message):
+        """Encode a message and queue it for every subscriber.
+
+        :param dict message: The message
+        """
+        data = json.dumps(message).encode()
+        for subscriber in self.subscribers:
+            dropped = subscriber.dropped
+            subscriber.put(data)
+            self.dropped += subscriber.dropped - dropped
+
+    async def _serve(self, reader, writer):
+        """Send the messages to a new subscriber until it goes away.
+
+        :param asyncio.StreamReader reader: The stream from the subscriber
+        :param asyncio.StreamWriter writer: The stream to the subscriber
+        """
+        connection = asyncio.current_task()
+        self._connections[connection] = writer
+        try:
+            if self.websocket and not await self._accept_websocket(reader, writer):
+                return
+            subscriber = _Subscriber(writer, self.queue_size, self.websocket)
+            self.subscribers.add(subscriber)
+            sender = asyncio.ensure_future(subscriber.send_all())
+            try:
+                # Whatever a subscriber sends is ignored, up to a websocket close frame
+                while not sender.done():
+                    data = await reader.read(4096)
+                    if not data or (self.websocket and data[0] & 0x0f == WEBSOCKET_CLOSE):
+                        break
+            finally:
+                self.subscribers.discard(subscriber)
+                sender.cancel()
+                await asyncio.gather(sender, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            self._connections.pop(connection, None)
+            writer.close()
+
+    @staticmethod
+    async def _accept_websocket(reader, writer):
+        """Answer the opening handshake of a websocket client.
+
+        :param asyncio.StreamReader reader: The stream from the client
+        :param asyncio.StreamWriter writer: The stream to the client
+        :return: False if the request was not a websocket handshake
+        :rtype: bool
+        """
+        request = await reader.readuntil(b'\r\n\r\n')
+        headers = {}
+        for line in request.decode('latin-1').split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get('sec-websocket-key')
+        if key is None:
+            writer.write(b'HTTP/1.1 400 Bad Request\r\n\r\n')
+            return False
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest())
+        writer.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                     b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+        await writer.drain()
+        return True
+
+    def on_start(self, simulation):
+        """Start serving.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        self.start()
+
+    def on_tick(self, simulation):
+        """Publish the statistics of the tick and a frame if due.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        if not self.subscribers:
+            return
+        world = simulation.world
+        self.publish({'type': 'tick', 'time': world.time, 'stats': world.stats.get_totals(),
+                      'profile': world.stats.profile})
+        if self.frame_every and not world.time % self.frame_every:
+            self.publish(get_frame(world, self.frame_channels, self.frame_scale))
+
+    def on_end(self, simulation):
+        """Publish the end of the run and stop serving once the messages are sent.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        self.publish({'type': 'end', 'time': simulation.world.time})
+        if self._thread is not None:
+            asyncio.run_coroutine_threadsafe(self._flush(), self._loop).result()
+        self.close()
+
+    async def _flush(self, timeout=1.0):
+        """Wait a little for the queues of the subscribers to empty.
+
+        :param float timeout: The max number of seconds to wait
+        """
+        deadline = self._loop.time() + timeout
+        while any(not subscriber.queue.empty() for subscriber in self.subscribers):
+            if self._loop.time() > deadline:
+                return
+            await asyncio.sleep(0.01)
+
+
+def main():
+    """Print the statistics published by a running simulation."""
+    parser = argparse.ArgumentParser(description='Follow the telemetry of a simulation.')
+    parser.add_argument('--connect', default='localhost:8765', help='The host:port to follow')
+    args = parser.parse_args()
+    host, port = args.connect.rsplit(':', 1)
+    with socket.create_connection((host, int(port))) as connection:
+        for line in connection.makefile('rb'):
+            message = json.loads(line)
+            if message['type'] == 'tick':
+                print('{} {}'.format(message['time'], message['stats']))
+            elif message['type'] == 'end':
+                return
+
+
+if __name__ == '__main__':
+    main()
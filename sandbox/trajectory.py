@@ -0,0 +1,278 @@
+"""Record the evolution of the land of a world to a file and stream it back.
+
+A trajectory file starts with ``MAGIC``, the length of a JSON header as a little endian uint64
+and the header itself, describing the size of the world and the recorded channels: layers of
+the world plus the number of grass plants and trees in each piece of land. It is followed by
+one record per recorded tick, each made of a ``RECORD_HEADER`` and a payload:
+
+* a key frame holds every channel as a raw array
+* a delta frame holds, per channel, the number of changed pieces of land, their flat indexes
+  and their new values
+
+Records are aligned to 8 bytes, so the reader memory-maps the file and views key frames in
+place. Replay a recorded run with::
+
+    python -m sandbox.trajectory run.traj --fps 30
+"""
+import argparse
+import json
+import struct
+
+import numpy
+
+from sandbox import observers
+from sandbox import simulate_world
+
+MAGIC = b'SBXTRAJ1'
+VERSION = 1
+RECORD_HEADER = struct.Struct('<qQQ')
+KEY_FRAME = 0
+DELTA_FRAME = 1
+COUNT_CHANNELS = ('grass', 'tree')
+COUNT_DTYPE = numpy.int32
+INDEX_DTYPE = numpy.uint32
+
+
+def _padding(length):
+    """Get the number of bytes padding a length to a multiple of 8.
+
+    :param int length: The length
+    :rtype: int
+    """
+    return -length % 8
+
+
+def _get_channels(world, layers):
+    """Get the current value of every channel of a world.
+
+    :param sandbox.simulate_world.World world: The world object
+    :param tuple layers: The names of the recorded layers
+    :rtype: dict
+    """
+    channels = {layer: numpy.array(getattr(world, layer)) for layer in layers}
+    for kind in COUNT_CHANNELS:
+        channels[kind] = world.occupancy.get_counts(kind).astype(COUNT_DTYPE)
+    return channels
+
+
+class TrajectoryRecorder(observers.SimulationObserver):
+    """Record the land of a running simulation every ``stride`` ticks.
+
+    When fast forwarding jumps past such a tick the first tick after it is recorded instead.
+
+    Frames are buffered and written ``chunk_frames`` at a time. With ``delta`` only the pieces
+    of land which changed since the previous frame are written, with a full key frame every
+    ``key_frame_every`` frames so the file can be read from any key frame.
+
+    :param str path: The path of the trajectory file, overwritten
+    :param int stride: Record every that many ticks
+    :param tuple layers: The names of the recorded layers
+    :param bool delta: Delta compress the frames
+    :param int key_frame_every: Write a key frame every that many frames when delta compressing
+    :param int chunk_frames: The number of frames buffered before writing them
+    """
+    def __init__(self, path, stride=1, layers=simulate_world.LAYERS, delta=True,
+                 key_frame_every=100, chunk_frames=16):
+        self.path = path
+        self.stride = stride
+        self.layers = tuple(layers)
+        self.delta = delta
+        self.key_frame_every = key_frame_every
+        self.chunk_frames = chunk_frames
+        self.frames = 0
+        self._file = None
+        self._chunk = []
+        self._previous = None
+        self._recorded_time = None
+
+    def on_start(self, simulation):
+        """Create the file and record the initial state.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        world = simulation.world
+        channels = _get_channels(world, self.layers)
+        header = json.dumps({
+            'version': VERSION,
+            'max_x_size': world.max_x_size,
+            'max_y_size': world.max_y_size,
+            'stride': self.stride,
+            'channels': [[name, values.dtype.str] for name, values in channels.items()],
+        }).encode()
+        header += b' ' * _padding(len(MAGIC) + 8 + len(header))
+        self._file = open(self.path, 'wb')  # pylint: disable=consider-using-with
+        self._file.write(MAGIC)
+        self._file.write(struct.pack('<Q', len(header)))
+        self._file.write(header)
+        self._record(world.time, channels)
+
+    def on_tick(self, simulation):
+        """Record the state of this tick if due.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        time = simulation.world.time
+        if self._recorded_time is None:
+            due = not time % self.stride
+        else:
+            due = time // self.stride > self._recorded_time // self.stride
+        if due:
+            self._record(time, _get_channels(simulation.world, self.layers))
+
+    def on_end(self, simulation):
+        """Write the buffered frames and close the file.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def flush(self):
+        """Write the buffered frames."""
+        self._file.write(b''.join(self._chunk))
+        self._file.flush()
+        self._chunk = []
+
+    def _record(self, tick, channels):
+        """Encode one frame into the buffer.
+
+        :param int tick: The time of the world
+        :param dict channels: The value of every channel
+        """
+        if self.delta and self._previous is not None and self.frames % self.key_frame_every:
+            kind = DELTA_FRAME
+            parts = []
+            for name, values in channels.items():
+                indexes = numpy.flatnonzero(values != self._previous[name]).astype(INDEX_DTYPE)
+                parts.append(struct.pack('<Q', len(indexes)))
+                for part in (indexes.tobytes(), values.ravel()[indexes].tobytes()):
+                    parts.append(part + b'\0' * _padding(len(part)))
+        else:
+            kind = KEY_FRAME
+            parts = [values.tobytes() + b'\0' * _padding(values.nbytes)
+                     for values in channels.values()]
+        payload = b''.join(parts)
+        self._chunk.append(RECORD_HEADER.pack(tick, kind, len(payload)) + payload)
+        self._previous = channels
+        self._recorded_time = tick
+        self.frames += 1
+        if len(self._chunk) >= self.chunk_frames:
+            self.flush()
+
+
+class TrajectoryReader:
+    """Stream the frames of a trajectory file without loading the whole history.
+
+    The file is memory-mapped and indexed on open. Iterating keeps a single decoded frame in
+    memory, key frames are views into the file itself.
+
+    :param str path: The path of the trajectory file
+    :raises ValueError: If the file is not a trajectory
+    """
+    def __init__(self, path):
+        self.path = path
+        self._data = numpy.memmap(path, dtype=numpy.uint8, mode='r')
+        if bytes(self._data[:len(MAGIC)]) != MAGIC:
+            raise ValueError('{} is not a trajectory file'.format(path))
+        header_length, = struct.unpack('<Q', bytes(self._data[len(MAGIC):len(MAGIC) + 8]))
+        offset = len(MAGIC) + 8
+        header = json.loads(bytes(self._data[offset:offset + header_length]).decode())
+        self.max_x_size = header['max_x_size']
+        self.max_y_size = header['max_y_size']
+        self.stride = header['stride']
+        self.channels = [(name, numpy.dtype(dtype)) for name, dtype in header['channels']]
+
+        self.ticks = []
+        self._records = []
+        offset += header_length
+        while offset + RECORD_HEADER.size <= len(self._data):
+            tick, kind, length = RECORD_HEADER.unpack(
+                bytes(self._data[offset:offset + RECORD_HEADER.size]))
+            offset += RECORD_HEADER.size
+            if offset + length > len(self._data):
+                break
+            self.ticks.append(tick)
+            self._records.append((kind, offset))
+            offset += length
+
+    def __len__(self):
+        return len(self._records)
+
+    def _view(self, offset, dtype, count):
+        """View an array stored in the file.
+
+        :param int offset: The offset of the array
+        :param numpy.dtype dtype: The dtype of the array
+        :param int count: The number of values
+        :return: The array and the offset after it
+        :rtype: tuple
+        """
+        length = count * dtype.itemsize
+        values = self._data[offset:offset + length].view(dtype)
+        return values, offset + length + _padding(length)
+
+    def _decode(self, index, previous):
+        """Decode one frame.
+
+        :param int index: The index of the frame
+        :param dict|None previous: The previous frame, needed by delta frames
+        :rtype: dict
+        """
+        kind, offset = self._records[index]
+        shape = (self.max_x_size, self.max_y_size)
+        frame = {}
+        for name, dtype in self.channels:
+            if kind == KEY_FRAME:
+                values, offset = self._view(offset, dtype, shape[0] * shape[1])
+                frame[name] = values.reshape(shape)
+            else:
+                count, = struct.unpack('<Q', bytes(self._data[offset:offset + 8]))
+                indexes, offset = self._view(offset + 8, numpy.dtype(INDEX_DTYPE), count)
+                values, offset = self._view(offset, dtype, count)
+                channel = numpy.array(previous[name])
+                channel.ravel()[indexes] = values
+                frame[name] = channel
+        return frame
+
+    def iter_frames(self, start=0):
+        """Iterate over the frames from a given one.
+
+        :param int start: The index of the first frame
+        :return: The tick and the value of every channel of each frame
+        :rtype: collections.abc.Iterator[tuple]
+        """
+        key_index = start
+        while self._records[key_index][0] != KEY_FRAME:
+            key_index -= 1
+        frame = None
+        for index in range(key_index, len(self)):
+            frame = self._decode(index, frame)
+            if index >= start:
+                yield self.ticks[index], frame
+
+    def get_frame(self, index):
+        """Decode one frame, from the closest key frame before it.
+
+        :param int index: The index of the frame
+        :rtype: dict
+        """
+        for _, frame in self.iter_frames(index):
+            return frame
+        raise IndexError(index)
+
+
+def main():
+    """Replay a trajectory file in a pygame window."""
+    parser = argparse.ArgumentParser(description='Replay a recorded trajectory.')
+    parser.add_argument('path', help='The path of the trajectory file')
+    parser.add_argument('--fps', type=float, default=30, help='Number of frames per second')
+    parser.add_argument('--start', type=int, default=0, help='The index of the first frame')
+    args = parser.parse_args()
+
+    from sandbox import render_world  # pylint: disable=import-outside-toplevel
+    render_world.replay_trajectory(TrajectoryReader(args.path), fps=args.fps, start=args.start)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 """Useful utils."""
 import random
 
+import numpy
+
 
 def get_x_y_key(x_val, y_val):
     """Return a string of x:y used for the world map keys.
@@ -11,7 +13,17 @@ def get_x_y_key(x_val, y_val):
     return '{}:{}'.format(x_val, y_val)
 
 
-def get_new_position(orig_x, orig_y, max_x, max_y, distance):
+def parse_x_y_key(x_y_key):
+    """Return the x and y values of a world map key made by ``get_x_y_key``.
+
+    :param str x_y_key: The world map key
+    :rtype: tuple
+    """
+    x_val, y_val = x_y_key.split(':')
+    return int(x_val), int(y_val)
+
+
+def get_new_position(orig_x, orig_y, max_x, max_y, distance, rng=None):
     """Get new positions for things to reproduce.
 
     :param int orig_x: The original x position
@@ -19,16 +31,20 @@ def get_new_position(orig_x, orig_y, max_x, max_y, distance):
     :param int max_x: The max x position
     :param int max_y: The max y position
     :param int distance: The possible distance to spread
+    :param sandbox.world_random.RandomStream|None rng: The random stream to draw from, the
+        global ``random`` module by default
     :rtype: tuple
     """
+    if rng is None:
+        rng = random
     # x_diff = 0
     # while not x_diff:
     #     x_diff = random.randint(0, distance * 2) - distance
     # y_diff = 0
     # while not y_diff:
     #     y_diff = random.randint(0, distance * 2) - distance
-    x_diff = random.randint(0, distance * 2) - distance
-    y_diff = random.randint(0, distance * 2) - distance
+    x_diff = rng.randint(0, distance * 2) - distance
+    y_diff = rng.randint(0, distance * 2) - distance
     new_x = orig_x + x_diff
     new_y = orig_y + y_diff
     if new_x < 0:
@@ -40,3 +56,45 @@ def get_new_position(orig_x, orig_y, max_x, max_y, distance):
     if new_y >= max_y:
         new_y = 0
     return new_x, new_y
+
+
+def get_new_positions(orig_x, orig_y, max_x, max_y, distance, rng=None):
+    """Get new positions for many things to reproduce at once.
+
+    Draws the same random numbers in the same order as calling ``get_new_position`` once per
+    position, so both give identical results for the same seed.
+
+    :param numpy.ndarray orig_x: The original x positions
+    :param numpy.ndarray orig_y: The original y positions
+    :param int max_x: The max x position
+    :param int max_y: The max y position
+    :param int distance: The possible distance to spread
+    :param sandbox.world_random.RandomStream|None rng: The random stream to draw from in
+        blocks, the global ``random`` module one number at a time by default
+    :rtype: tuple
+    """
+    count = len(orig_x)
+    if rng is None:
+        diffs = numpy.array([random.randint(0, distance * 2) for _ in range(count * 2)],
+                            dtype=numpy.int64)
+    else:
+        diffs = rng.randints(0, distance * 2, count * 2)
+    diffs = diffs.reshape(count, 2) - distance
+    return (wrap_positions(orig_x + diffs[:, 0], max_x),
+            wrap_positions(orig_y + diffs[:, 1], max_y))
+
+
+def wrap_positions(positions, max_size):
+    """Wrap positions past an edge of the world onto the other edge, like ``get_new_position``.
+
+    Any position before the first piece of land lands on the last one and any position after
+    the last one lands on the first one.
+
+    :param numpy.ndarray positions: The positions along one axis, modified
+    :param int max_size: The size of the world along the axis
+    :return: The positions
+    :rtype: numpy.ndarray
+    """
+    positions[positions < 0] = max_size - 1
+    positions[positions >= max_size] = 0
+    return positions
@@ -0,0 +1,219 @@
+"""Seedable random number streams of a world, drawn in pre-generated blocks."""
+import numpy
+
+BLOCK_SIZE = 4096
+PARTITION_BLOCK_SIZE = 256
+# Spawn key of the partition streams, after the spawn keys of the streams of the world
+PARTITION_SPAWN_KEY = 4
+
+
+class RandomStream:
+    """Stream of random integers drawn from blocks generated in advance.
+
+    Every span of integers gets its own generator and block, so ``randint`` and ``randints``
+    hand out the same numbers in the same order whether they are drawn one at a time or many
+    at once, and draws of one span never shift the numbers of another.
+
+    :param numpy.random.SeedSequence seed_sequence: The seed of this stream
+    :param int block_size: The number of integers generated per block
+    """
+    def __init__(self, seed_sequence, block_size=BLOCK_SIZE):
+        self.seed_sequence = seed_sequence
+        self.block_size = block_size
+        self._generators = {}
+        self._block_states = {}
+        self._blocks = {}
+        self._indexes = {}
+
+    def _next_block(self, span):
+        """Generate the next block of integers between 0 and span included.
+
+        :param int span: The span of the integers
+        :rtype: numpy.ndarray
+        """
+        generator = self._generators.get(span)
+        if generator is None:
+            generator = self._generators[span] = numpy.random.default_rng(
+                numpy.random.SeedSequence(self.seed_sequence.entropy,
+                                          spawn_key=self.seed_sequence.spawn_key + (span,)))
+        self._block_states[span] = generator.bit_generator.state
+        block = self._blocks[span] = generator.integers(0, span + 1, size=self.block_size)
+        self._indexes[span] = 0
+        return block
+
+    def get_state(self):
+        """Get the state of the stream, made of plain JSON serializable values.
+
+        Only the state of the generators before their current block is kept, the blocks are
+        generated again when the state is restored.
+
+        :rtype: dict
+        """
+        return {str(span): {'block_state': self._block_states[span],
+                            'index': self._indexes[span]}
+                for span in self._generators}
+
+    def set_state(self, state):
+        """Restore a state returned by ``get_state``.
+
+        :param dict state: The state of the stream
+        """
+        self._generators = {}
+        self._block_states = {}
+        self._blocks = {}
+        self._indexes = {}
+        for span, span_state in state.items():
+            span = int(span)
+            generator = self._generators[span] = numpy.random.default_rng()
+            generator.bit_generator.state = span_state['block_state']
+            self._next_block(span)
+            self._indexes[span] = span_state['index']
+
+    def randint(self, low, high):
+        """Return a random integer between low and high included, like ``random.randint``.
+
+        :param int low: The lowest integer
+        :param int high: The highest integer
+        :rtype: int
+        """
+        span = high - low
+        index = self._indexes.get(span, self.block_size)
+        if index == self.block_size:
+            block = self._next_block(span)
+            index = 0
+        else:
+            block = self._blocks[span]
+        self._indexes[span] = index + 1
+        return low + int(block[index])
+
+    def randints(self, low, high, count):
+        """Return many random integers between low and high included.
+
+        :param int low: The lowest integer
+        :param int high: The highest integer
+        :param int count: The number of integers
+        :rtype: numpy.ndarray
+        """
+        span = high - low
+        values = numpy.empty(count, dtype=numpy.int64)
+        filled = 0
+        while filled < count:
+            index = self._indexes.get(span, self.block_size)
+            if index == self.block_size:
+                block = self._next_block(span)
+                index = 0
+            else:
+                block = self._blocks[span]
+            taken = min(count - filled, self.block_size - index)
+            values[filled:filled + taken] = block[index:index + taken]
+            self._indexes[span] = index + taken
+            filled += taken
+        return values + low
+
+
+class DistributionStream:
+    """Stream of random draws from distributions, e.g. splitting populations between cells.
+
+    :param numpy.random.SeedSequence seed_sequence: The seed of this stream
+    """
+    def __init__(self, seed_sequence):
+        self.generator = numpy.random.default_rng(seed_sequence)
+
+    def multinomial(self, counts, probabilities):
+        """Split every count between outcomes of the given probabilities.
+
+        :param numpy.ndarray counts: The counts to split
+        :param list[float] probabilities: The probability of each outcome
+        :return: Array of the counts shape plus one axis of the number per outcome
+        :rtype: numpy.ndarray
+        """
+        return self.generator.multinomial(counts, probabilities)
+
+    def binomial(self, counts, probability):
+        """Draw how many of every count succeed with the given probability.
+
+        :param numpy.ndarray counts: The counts of trials
+        :param float|numpy.ndarray probability: The probability of success of each trial, or
+            of the trials of every count
+        :rtype: numpy.ndarray
+        """
+        return self.generator.binomial(counts, probability)
+
+    def get_state(self):
+        """Get the state of the stream, made of plain JSON serializable values.
+
+        :rtype: dict
+        """
+        return self.generator.bit_generator.state
+
+    def set_state(self, state):
+        """Restore a state returned by ``get_state``.
+
+        :param dict state: The state of the stream
+        """
+        self.generator.bit_generator.state = state
+
+
+class WorldRandom:
+    """The independent random streams of a world, all derived from one seed.
+
+    ``movement`` drives where children are placed, ``spawning`` what and where things are
+    spawned and ``rendering`` the shading of the display, so drawing frames never changes the
+    course of the simulation. ``dispersal`` splits whole populations, see
+    ``sandbox.cohort_engine.CohortEngine``.
+
+    :param int|None seed: The seed, a random one by default
+    :param int block_size: The number of integers generated per block
+    :param numpy.random.SeedSequence|None seed_sequence: Derive the streams from this seed
+        sequence instead of the seed
+    """
+    def __init__(self, seed=None, block_size=BLOCK_SIZE, seed_sequence=None):
+        self.seed_sequence = seed_sequence or numpy.random.SeedSequence(seed)
+        movement, spawning, rendering, dispersal = self.seed_sequence.spawn(4)
+        self.movement = RandomStream(movement, block_size=block_size)
+        self.spawning = RandomStream(spawning, block_size=block_size)
+        self.rendering = RandomStream(rendering, block_size=block_size)
+        self.dispersal = DistributionStream(dispersal)
+
+    def get_state(self):
+        """Get the state of every stream, made of plain JSON serializable values.
+
+        :rtype: dict
+        """
+        return {'seed': self.seed,
+                'movement': self.movement.get_state(),
+                'spawning': self.spawning.get_state(),
+                'rendering': self.rendering.get_state(),
+                'dispersal': self.dispersal.get_state()}
+
+    def set_state(self, state):
+        """Restore a state returned by ``get_state``, the seed has to be the same.
+
+        :param dict state: The state of every stream
+        """
+        self.movement.set_state(state['movement'])
+        self.spawning.set_state(state['spawning'])
+        self.rendering.set_state(state['rendering'])
+        self.dispersal.set_state(state['dispersal'])
+
+    def get_partition_random(self, tick, partition, block_size=PARTITION_BLOCK_SIZE):
+        """Get independent streams for one partition of the world during one tick.
+
+        They only depend on the seed, the tick and the partition, so a partition draws the same
+        numbers whichever thread ticks it and in whichever order.
+
+        :param int tick: The time of the world
+        :param int partition: The index of the partition
+        :param int block_size: The number of integers generated per block
+        :rtype: WorldRandom
+        """
+        return WorldRandom(block_size=block_size, seed_sequence=numpy.random.SeedSequence(
+            self.seed, spawn_key=(PARTITION_SPAWN_KEY, tick, partition)))
+
+    @property
+    def seed(self):
+        """The seed of the world, pass it back to reproduce a run.
+
+        :rtype: int
+        """
+        return self.seed_sequence.entropy
@@ -0,0 +1,161 @@
+"""Running statistics of a world, kept up to date from the simulation events."""
+import collections
+import math
+
+from sandbox import observers
+
+
+class WorldStats:
+    """Running totals of the living things and of every layer of a world.
+
+    The counters are updated by the code causing each birth, death and layer change, so reading
+    them is O(1). ``recount`` rebuilds them with a full scan of the world to verify them.
+
+    :param tuple layers: The names of the layers of the world
+    """
+    def __init__(self, layers):
+        self.bacteria = collections.Counter()
+        self.plants = collections.Counter()
+        self.layers = dict.fromkeys(layers, 0)
+        self.profile = None
+
+    def bacteria_born(self, name, count=1):
+        """Count new bacteria.
+
+        :param str name: The name of the type of the bacteria
+        :param int count: The number of bacteria
+        """
+        self.bacteria[name] += count
+
+    def bacteria_died(self, name, count=1):
+        """Count dead bacteria.
+
+        :param str name: The name of the type of the bacteria
+        :param int count: The number of bacteria
+        """
+        self.bacteria[name] -= count
+
+    def plant_born(self, name, count=1):
+        """Count new plants.
+
+        :param str name: The name of the type of the plants
+        :param int count: The number of plants
+        """
+        self.plants[name] += count
+
+    def plant_died(self, name, count=1):
+        """Count dead plants.
+
+        :param str name: The name of the type of the plants
+        :param int count: The number of plants
+        """
+        self.plants[name] -= count
+
+    def record_profile(self, record):
+        """Keep the latest record of the instrumentation, usable as its sink.
+
+        :param dict record: The record of a tick, see ``sandbox.instrumentation``
+        """
+        self.profile = record
+
+    def add_to_layer(self, layer, amount):
+        """Count a change of a layer anywhere in the world.
+
+        :param str layer: The name of the layer
+        :param float amount: The amount added, negative if removed
+        """
+        self.layers[layer] += amount
+
+    def get_bacteria_counts(self):
+        """Get the number of living bacteria of each type.
+
+        :rtype: dict
+        """
+        return {name: count for name, count in self.bacteria.items() if count}
+
+    def get_totals(self):
+        """Get a snapshot of every counter.
+
+        :rtype: dict
+        """
+        totals = {'bacteria': self.get_bacteria_counts(),
+                  'plants': {name: count for name, count in self.plants.items() if count}}
+        totals.update(self.layers)
+        return totals
+
+    def recount(self, world):
+        """Rebuild every counter with a full scan of the world.
+
+        :param sandbox.simulate_world.World world: The world object
+        :return: The counters which were off, mapped to their running and recounted values
+        :rtype: dict
+        """
+        bacteria = collections.Counter(world.count_bacteria())
+        plants = collections.Counter(type(plant).__name__ for plant in world.global_plants)
+        layers = {layer: world.get_layer_total(layer) for layer in self.layers}
+
+        mismatches = {}
+        for name in set(self.bacteria) | set(bacteria):
+            if self.bacteria[name] != bacteria[name]:
+                mismatches[name] = (self.bacteria[name], bacteria[name])
+        for name in set(self.plants) | set(plants):
+            if self.plants[name] != plants[name]:
+                mismatches[name] = (self.plants[name], plants[name])
+        for layer, total in layers.items():
+            if not math.isclose(self.layers[layer], total, rel_tol=1e-9, abs_tol=1e-6):
+                mismatches[layer] = (self.layers[layer], total)
+
+        self.bacteria = bacteria
+        self.plants = plants
+        self.layers = layers
+        return mismatches
+
+
+class VerifyStatsObserver(observers.SimulationObserver):
+    """Periodically verify the running statistics of the world with a full recount.
+
+    :param int every_n_ticks: Verify every that many ticks
+    """
+    def __init__(self, every_n_ticks=100):
+        self.every_n_ticks = every_n_ticks
+
+    def on_tick(self, simulation):
+        """Verify the statistics if due.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        :raises RuntimeError: If a counter does not match the recount
+        """
+        if simulation.world.time % self.every_n_ticks:
+            return
+        mismatches = simulation.world.stats.recount(simulation.world)
+        if mismatches:
+            raise RuntimeError('World stats out of sync at tick {}: {}'.format(
+                simulation.world.time, mismatches))
+
+
+class StatsHistory(observers.SimulationObserver):
+    """Record the running statistics of the world after every tick.
+
+    ``series`` maps the name of every counter to its list of values, one per recorded tick, with
+    the bacteria and plant counts named ``bacteria.<type>`` and ``plants.<type>``.
+    """
+    def __init__(self):
+        self.ticks = []
+        self.series = {}
+
+    def on_tick(self, simulation):
+        """Record the statistics of this tick.
+
+        :param sandbox.simulate_world.SimulateWorld simulation: The running simulation
+        """
+        stats = simulation.world.stats
+        values = dict(stats.layers)
+        for name, count in stats.bacteria.items():
+            values['bacteria.' + name] = count
+        for name, count in stats.plants.items():
+            values['plants.' + name] = count
+        for name in set(self.series) | set(values):
+            if name not in self.series:
+                self.series[name] = [0] * len(self.ticks)
+            self.series[name].append(values.get(name, 0))
+        self.ticks.append(simulation.world.time)
@@ -0,0 +1,23 @@
+"""Tests of the lifecycles scheduled by ``sandbox.scheduler``."""
+from sandbox import seeding
+from sandbox import simulate_bacteria
+from sandbox import simulate_plants
+from sandbox import simulate_world
+
+
+def test_compacting_seeded_entities_before_the_first_tick():
+    """Entities seeded and compacted before the first tick are only scheduled once."""
+    world = simulate_world.World(max_x_size=20, max_y_size=20, seed=1)
+    options = simulate_world.SimulationOptions(scheduled_lifecycles=True)
+    simulation = simulate_world.SimulateWorld(world=world, end_time=60, options=options)
+    for entity_type in (simulate_bacteria.NitrogenBacteria, simulate_plants.GrassPlant):
+        x_positions, y_positions = seeding.random_positions(world, 200)
+        seeding.seed_entities(world, entity_type, x_positions, y_positions)
+    simulation.compact_entities()
+
+    simulation.run()
+
+    scheduled = [entity for entity, _ in world.lifecycle_scheduler.wheel
+                 if entity.store_slot is not None]
+    assert len(scheduled) == len(set(scheduled))
+    assert len(scheduled) == len(world.global_plants) + len(world.global_bacteria)
@@ -0,0 +1,30 @@
+"""Tests of the trajectories recorded by ``sandbox.trajectory``."""
+import pytest
+
+from sandbox import observers
+from sandbox import simulate_world
+from sandbox import trajectory
+
+
+class FailingObserver(observers.SimulationObserver):
+    """Fail the run after some ticks."""
+    def __init__(self, ticks):
+        self.ticks = ticks
+
+    def on_tick(self, simulation):
+        if simulation.world.time == self.ticks:
+            raise RuntimeError('Failed at tick {}'.format(self.ticks))
+
+
+def test_recording_a_failing_run(tmp_path):
+    """The frames recorded before a run fails are written and the file is closed."""
+    path = str(tmp_path / 'run.traj')
+    world = simulate_world.World(max_x_size=10, max_y_size=10, seed=1)
+    simulation = simulate_world.SimulateWorld(world=world, end_time=20)
+    recorder = trajectory.TrajectoryRecorder(path)
+
+    with pytest.raises(RuntimeError):
+        simulation.run(observers=[recorder, FailingObserver(5)])
+
+    assert recorder.frames == 6
+    assert trajectory.TrajectoryReader(path).ticks == list(range(6))